@@ -2,45 +2,87 @@ from typing import Generator, Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from supabase import Client
 
+from app.core.security import get_user_id_from_auth_server, user_cache, verify_access_token
 from app.core.supabase import get_supabase_client, get_supabase_admin_client
 from app.schemas.user import UserResponse
 
 security = HTTPBearer()
 
+def get_supabase() -> Client:
+    """
+    Get the shared Supabase client
+    """
+    try:
+        return get_supabase_client()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not initialize Supabase client: {str(e)}"
+        )
+
+async def _get_user_row(supabase: Client, user_id: str) -> UserResponse:
+    response = await run_in_threadpool(
+        supabase.table('users').select('*').eq('id', user_id).execute
+    )
+    user = UserResponse(**response.data[0])
+    user_cache.set(user_id, user)
+    return user
+
 async def get_current_user(
-    token: HTTPAuthorizationCredentials = Depends(security)
+    token: HTTPAuthorizationCredentials = Depends(security),
+    supabase: Client = Depends(get_supabase),
 ) -> UserResponse:
     """
-    Get current authenticated user from Supabase token
+    Get current authenticated user from Supabase token.
+    The token is verified locally, without a call to the auth server, and the
+    profile is served from user_cache when present.
     """
     try:
-        # Verify JWT with Supabase
-        supabase = get_supabase_client()
-        
         try:
-            user_response = supabase.auth.get_user(token.credentials)
+            user_id = await verify_access_token(token.credentials)
         except Exception as auth_error:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"Authentication failed: {str(auth_error)}",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-            
-        user = user_response.user
+
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+        return await _get_user_row(supabase, user_id)
         
-        if not user:
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+async def get_current_user_verified(
+    token: HTTPAuthorizationCredentials = Depends(security),
+    supabase: Client = Depends(get_supabase),
+) -> UserResponse:
+    """
+    Get current authenticated user, checking the token with the Supabase auth
+    server so that signed-out sessions are rejected. Use for sensitive routes.
+    """
+    try:
+        try:
+            user_id = await get_user_id_from_auth_server(token.credentials)
+        except Exception as auth_error:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
+                detail=f"Authentication failed: {str(auth_error)}",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
-        # Get user from Supabase
-        response = supabase.table('users').select('*').eq('id', str(user.id)).execute()
-        return UserResponse(**response.data[0])
-        
+
+        return await _get_user_row(supabase, user_id)
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,8 +100,18 @@ def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def get_current_active_verified_user(
+    current_user: UserResponse = Depends(get_current_user_verified),
+) -> UserResponse:
+    """
+    Verify user is active, with the token checked against the auth server
+    """
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
 def get_current_active_superuser(
-    current_user: UserResponse = Depends(get_current_active_user),
+    current_user: UserResponse = Depends(get_current_active_verified_user),
 ) -> UserResponse:
     """
     Verify user is superuser
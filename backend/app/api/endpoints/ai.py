@@ -1,17 +1,33 @@
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import orjson
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from app.api import deps
+from app.core.config import settings
+from app.core.jobs import get_job_queue
+from app.core.uploads import spool_upload
+from app.schemas.document import StageDocumentBatch
+from app.schemas.job import Job as JobSchema
 from app.schemas.user import UserResponse
 from app.services.ai_service import (
     calculate_product_carbon_footprint,
     call_openai_api,
     decompose_product_materials,
     match_carbon_factors,
-    standardize_bom,
-    standardize_lifecycle_document,
 )
+from app.services.bom_csv_service import count_unparsed_rows
+from app.services.bom_service import standardize_bom_content
+from app.services.document_service import (
+    ingest_documents,
+    ingest_result,
+    iter_standardized_stages,
+    standardize_stage_document,
+)
+from app.services.prompt_service import usage as prompt_usage
+from app.services.spreadsheet_service import SpreadsheetParseError, excel_to_csv
 
 router = APIRouter()
 
@@ -51,22 +67,44 @@ async def test_endpoint():
 @router.post("/bom-standardize")
 async def bom_standardize(
     request: Dict[str, Any],
+    response: Response,
     current_user: UserResponse = Depends(deps.get_current_user),
 ):
     """
     BOM data standardization
+
+    Rows that could not be parsed are kept with their raw text in the AI note
+    column; their number is returned in the X-BOM-Unparsed-Rows header.
     """
     try:
         content = request.get("content", "")
         if not content:
             raise ValueError("BOM content cannot be empty")
 
-        standardized_content = await standardize_bom(content)
+        standardized_content = await standardize_bom_content(content)
+        response.headers["X-BOM-Unparsed-Rows"] = str(count_unparsed_rows(standardized_content))
         return standardized_content
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"BOM standardization failed: {str(e)}")
 
 
+@router.post("/bom-standardize/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_bom_standardize(
+    request: Dict[str, Any],
+    current_user: UserResponse = Depends(deps.get_current_user),
+):
+    """
+    BOM data standardization in the background; poll GET /jobs/{job_id} for the result
+    """
+    content = request.get("content", "")
+    if not content:
+        raise HTTPException(status_code=400, detail="BOM content cannot be empty")
+
+    return await get_job_queue().enqueue(
+        "bom_content_standardize", str(current_user.id), {"content": content}
+    )
+
+
 @router.post("/calculate-carbon-footprint")
 async def calculate_carbon_footprint(
     product_data: Dict[str, Any],
@@ -147,6 +185,14 @@ async def match_carbon_factors_endpoint(
         raise HTTPException(status_code=500, detail=f"Carbon factor matching failed: {str(e)}")
 
 
+@router.get("/prompt-usage")
+def get_prompt_usage(
+    current_user: UserResponse = Depends(deps.get_current_active_superuser),
+):
+    """Get prompt and completion token counts per prompt template in this process (superuser only)"""
+    return prompt_usage.stats()
+
+
 @router.post("/test-openai-proxy", response_model=Dict[str, Any])
 async def test_openai_proxy(request: Dict[str, Any]):
     """
@@ -205,7 +251,7 @@ async def lifecycle_document_standardize(
                 "Invalid lifecycle stage, must be one of: 'manufacturing', 'distribution', 'usage', 'disposal'"
             )
 
-        standardized_content = await standardize_lifecycle_document(content, stage)
+        standardized_content = await standardize_stage_document(content, stage)
         return standardized_content
 
     except Exception as e:
@@ -215,6 +261,85 @@ async def lifecycle_document_standardize(
         raise HTTPException(status_code=500, detail=f"Document standardization failed: {str(e)}")
 
 
+@router.post("/batch-ingest")
+async def batch_ingest(
+    files: List[UploadFile] = File(...),
+    current_user: UserResponse = Depends(deps.get_current_user),
+):
+    """
+    Classify and standardize many documents at once
+
+    Each file (CSV or Excel) is classified as 'bom', 'manufacturing',
+    'distribution', 'usage' or 'disposal' and standardized with the matching
+    pipeline. Returns one result per file, in upload order, with kind,
+    classified_by ('keywords' or 'llm'), standardized_content and error.
+    A file that cannot be read gets its error without affecting the others.
+    """
+    if len(files) > settings.BATCH_INGEST_MAX_FILES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.BATCH_INGEST_MAX_FILES} files can be ingested at once"
+        )
+
+    results: List[Optional[dict]] = [None] * len(files)
+    documents = []
+    readable = []
+    for index, file in enumerate(files):
+        try:
+            upload = await spool_upload(file, settings.BOM_UPLOAD_MAX_MB * 1024 * 1024)
+        except HTTPException as e:
+            results[index] = ingest_result(file.filename, e.detail)
+            continue
+        try:
+            if upload.file_type == "csv":
+                content = await run_in_threadpool(upload.read_text)
+            else:
+                content = await excel_to_csv(upload.path, upload.file_type)
+        except SpreadsheetParseError as e:
+            results[index] = ingest_result(file.filename, str(e))
+            continue
+        finally:
+            upload.cleanup()
+        documents.append((file.filename, content))
+        readable.append(index)
+
+    for index, result in zip(readable, await ingest_documents(documents)):
+        results[index] = result
+    return results
+
+
+@router.post("/lifecycle-document-standardize/batch")
+async def lifecycle_document_standardize_batch(
+    request: StageDocumentBatch,
+    current_user: UserResponse = Depends(deps.get_current_user),
+):
+    """
+    Standardize documents for several lifecycle stages concurrently
+
+    Accepts:
+    - documents: List of {"stage", "content"}; stage is 'bom', 'manufacturing',
+      'distribution', 'usage' or 'disposal'
+
+    Streams NDJSON, one line per document as soon as it is standardized:
+    {"index", "stage", "standardized_content", "error"}. index is the position
+    of the document in the request.
+    """
+    documents = request.documents
+    if not documents:
+        raise HTTPException(status_code=400, detail="At least one document is required")
+
+    for i, document in enumerate(documents):
+        if not document.content:
+            raise HTTPException(status_code=400, detail=f"documents[{i}]: content cannot be empty")
+
+    results = iter_standardized_stages([(document.stage, document.content) for document in documents])
+
+    async def lines():
+        async for result in results:
+            yield orjson.dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/decompose-product")
 async def decompose_product(
     request: Dict[str, Any],
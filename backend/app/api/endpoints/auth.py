@@ -1,8 +1,9 @@
 from typing import Dict
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.core.supabase import get_supabase_client
+from app.core.supabase import create_supabase_client
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.token import Token
 
@@ -14,8 +15,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     Login with username/password and get access token
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.auth.sign_in_with_password({
+        # Sign-in state is stored on the client, so never use the shared one here
+        supabase = create_supabase_client()
+        response = await run_in_threadpool(supabase.auth.sign_in_with_password, {
             "email": form_data.username,
             "password": form_data.password
         })
@@ -46,10 +48,12 @@ async def register(user_data: UserCreate):
     Register new user
     """
     try:
-        supabase = get_supabase_client()
+        supabase = create_supabase_client()
         
         # Check if user already exists in Supabase
-        existing_user = supabase.table('users').select('*').eq('email', user_data.email).execute()
+        existing_user = await run_in_threadpool(
+            supabase.table('users').select('*').eq('email', user_data.email).execute
+        )
         if existing_user.data:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,7 +61,7 @@ async def register(user_data: UserCreate):
             )
         
         # Create user in Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        auth_response = await run_in_threadpool(supabase.auth.sign_up, {
             "email": user_data.email,
             "password": user_data.password,
             "options": {
@@ -84,7 +88,7 @@ async def register(user_data: UserCreate):
             "is_superuser": False
         }
         
-        response = supabase.table('users').insert(user_data_db).execute()
+        response = await run_in_threadpool(supabase.table('users').insert(user_data_db).execute)
         return UserResponse(**response.data[0])
         
     except Exception as e:
@@ -99,8 +103,8 @@ async def logout():
     Logout current user
     """
     try:
-        supabase = get_supabase_client()
-        supabase.auth.sign_out()
+        supabase = create_supabase_client()
+        await run_in_threadpool(supabase.auth.sign_out)
         return {"message": "Successfully logged out"}
     except Exception as e:
         raise HTTPException(
@@ -114,8 +118,8 @@ async def refresh_token(refresh_token: str):
     Refresh access token using refresh token
     """
     try:
-        supabase = get_supabase_client()
-        response = supabase.auth.refresh_session(refresh_token)
+        supabase = create_supabase_client()
+        response = await run_in_threadpool(supabase.auth.refresh_session, refresh_token)
         
         if not response.session:
             raise HTTPException(
@@ -1,11 +1,21 @@
 from typing import List
-from uuid import UUID
+from uuid import UUID, uuid4
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from supabase import Client
 
+from app.core.config import settings
+from app.core.database import asyncpg_enabled
+from app.core.jobs import get_job_queue
 from app.core.security import get_current_active_user
 from app.core.supabase import get_supabase_client
+from app.core.uploads import CONTENT_TYPES, SpooledUpload, spool_upload
 from app.schemas.user import UserResponse
-from app.schemas.bom import BOMFile as BOMFileSchema
+from app.schemas.bom import BOMFile as BOMFileSchema, BOMRow as BOMRowSchema, BOMStandardizationStatus, BOMSummary
+from app.schemas.job import Job as JobSchema
+from app.services import bom_service, pg_repository
+from app.services.bom_service import bom_content_hash
+from app.services.spreadsheet_service import SpreadsheetParseError, excel_to_csv
 
 router = APIRouter()
 
@@ -18,24 +28,48 @@ async def read_bom_files(
     """
     Get all BOM files for current user
     """
+    if asyncpg_enabled():
+        return await pg_repository.get_user_bom_files(current_user.id, skip, limit)
+
     supabase = get_supabase_client()
-    response = supabase.table('bom_files').select('*').eq('user_id', str(current_user.id)).range(skip, skip + limit).execute()
+    response = await run_in_threadpool(
+        supabase.table('bom_files').select('*').eq('user_id', str(current_user.id))
+        .order('updated_at', desc=True).order('id').range(skip, skip + limit - 1).execute
+    )
     return response.data
 
-@router.get("/{bom_id}", response_model=BOMFileSchema)
-async def read_bom_file(
+async def get_bom_file_row(
     bom_id: UUID,
     current_user: UserResponse = Depends(get_current_active_user),
-):
+) -> dict:
     """
-    Get specific BOM file
+    Load a BOM file of the current user.
+    As a dependency it is resolved once per request and shared by its dependants.
     """
     supabase = get_supabase_client()
-    response = supabase.table('bom_files').select('*').eq('id', str(bom_id)).eq('user_id', str(current_user.id)).single().execute()
-    if not response.data:
+    response = await run_in_threadpool(
+        supabase.table('bom_files').select('*').eq('id', str(bom_id)).eq('user_id', str(current_user.id)).maybe_single().execute
+    )
+    if not response or not response.data:
         raise HTTPException(status_code=404, detail="BOM file not found")
     return response.data
 
+@router.get("/{bom_id}", response_model=BOMFileSchema)
+async def read_bom_file(
+    bom_file: dict = Depends(get_bom_file_row),
+):
+    """
+    Get specific BOM file
+    """
+    return bom_file
+
+def _upload_to_storage(supabase: Client, storage_path: str, upload: SpooledUpload):
+    with open(upload.path, "rb") as f:
+        # Content-addressed path, so overwriting only ever writes identical bytes
+        supabase.storage.from_("bom_files").upload(
+            storage_path, f, {"content-type": CONTENT_TYPES[upload.file_type], "upsert": "true"}
+        )
+
 @router.post("/upload", response_model=BOMFileSchema, status_code=status.HTTP_201_CREATED)
 async def create_bom_file(
     file: UploadFile = File(...),
@@ -48,74 +82,147 @@ async def create_bom_file(
     if not file.filename.lower().endswith((".csv", ".xlsx", ".xls")):
         raise HTTPException(status_code=400, detail="Only CSV and Excel files are supported")
 
+    # Copied to a temporary file in chunks; raises 413/400 for oversized or mismatched files
+    upload = await spool_upload(file, settings.BOM_UPLOAD_MAX_MB * 1024 * 1024)
     try:
+        # Excel workbooks are converted to CSV in the parser process pool
+        if upload.file_type == "csv":
+            content = await run_in_threadpool(upload.read_text)
+        else:
+            try:
+                content = await excel_to_csv(upload.path, upload.file_type)
+            except SpreadsheetParseError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
         supabase = get_supabase_client()
-        
-        # Read file content
-        content = await file.read()
-        
-        # Upload file to Supabase Storage
-        storage_path = f"bom_files/{current_user.id}/{file.filename}"
-        storage_response = supabase.storage.from_("bom_files").upload(
-            storage_path,
-            content
-        )
-        
-        if not storage_response.data:
-            raise HTTPException(status_code=500, detail="Failed to upload file to storage")
+        content_hash = bom_content_hash(content)
+
+        # An earlier upload of the same content by this user shares its
+        # stored file and standardized output. Empty content has no hash and
+        # is never treated as a duplicate.
+        duplicate = None
+        if content_hash:
+            duplicate = await run_in_threadpool(
+                supabase.table('bom_files').select('file_path, standardized_content, standardized_content_hash')
+                .eq('user_id', str(current_user.id)).eq('content_hash', content_hash)
+                .order('updated_at', desc=True).limit(1).execute
+            )
+            duplicate = duplicate.data[0] if duplicate.data else None
+
+        if duplicate:
+            storage_path = duplicate['file_path']
+        else:
+            # Upload file to Supabase Storage under its content hash, streamed from the temporary file
+            storage_path = f"bom_files/{current_user.id}/{upload.sha256}.{upload.file_type}"
+            await run_in_threadpool(_upload_to_storage, supabase, storage_path, upload)
             
         # Create BOM file record
         file_data = {
             "user_id": str(current_user.id),
             "title": file.filename,
             "file_path": storage_path,
-            "content": content.decode() if file.filename.endswith('.csv') else "",
-            "file_type": file.filename.split('.')[-1].lower(),
-            "standardized_content": None
+            "content": content,
+            "file_type": upload.file_type,
+            "content_hash": content_hash,
+            "standardized_content": duplicate['standardized_content'] if duplicate else None,
+            "standardized_content_hash": duplicate['standardized_content_hash'] if duplicate else None,
         }
         
-        response = supabase.table('bom_files').insert(file_data).execute()
+        response = await run_in_threadpool(supabase.table('bom_files').insert(file_data).execute)
         return response.data[0]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload BOM file: {str(e)}")
+    finally:
+        upload.cleanup()
 
 @router.post("/{bom_id}/standardize", response_model=BOMFileSchema)
 async def standardize_bom(
-    bom_id: UUID,
-    current_user: UserResponse = Depends(get_current_active_user),
+    force: bool = False,
+    bom_file: dict = Depends(get_bom_file_row),
 ):
     """
-    Standardize BOM file
+    Standardize BOM file and save the result.
+    Returns the saved result without calling the AI service when it is current for the file content, unless `force` is set.
     """
-    supabase = get_supabase_client()
-    
-    # Get BOM file
-    bom_file = supabase.table('bom_files').select('*').eq('id', str(bom_id)).eq('user_id', str(current_user.id)).single().execute()
-    if not bom_file.data:
-        raise HTTPException(status_code=404, detail="BOM file not found")
-        
+    if bom_service.is_standardization_in_progress(bom_file):
+        raise HTTPException(status_code=409, detail="BOM file is already being standardized")
+
     try:
-        # Get file content from storage if needed
-        if not bom_file.data['content']:
-            storage_response = supabase.storage.from_("bom_files").download(bom_file.data['file_path'])
-            content = storage_response.decode()
-        else:
-            content = bom_file.data['content']
-            
-        # TODO: Implement standardization logic here
-        standardized_content = content  # Replace with actual standardization
-        
-        # Update BOM file with standardized content
-        response = supabase.table('bom_files').update({
-            "standardized_content": standardized_content
-        }).eq('id', str(bom_id)).execute()
-        
-        return response.data[0]
-        
+        return await bom_service.standardize_bom_file(bom_file, force=force)
+    except bom_service.BOMFileNotFoundError:
+        raise HTTPException(status_code=404, detail="BOM file not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to standardize BOM file: {str(e)}")
 
+@router.post("/{bom_id}/standardize/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_bom_standardization(
+    bom_id: UUID,
+    force: bool = False,
+    bom_file: dict = Depends(get_bom_file_row),
+):
+    """
+    Standardize BOM file in the background.
+    Poll GET /boms/{bom_id}/standardization or GET /jobs/{job_id} for progress.
+    """
+    # Recorded on the row before the job can start, so polls on any worker see it
+    job_id = str(uuid4())
+    if not await run_in_threadpool(bom_service.queue_bom_standardization, str(bom_id), job_id):
+        raise HTTPException(status_code=409, detail="BOM file is already being standardized")
+    return await get_job_queue().enqueue(
+        "bom_file_standardize", bom_file['user_id'], {"bom_id": str(bom_id), "force": force}, job_id=job_id
+    )
+
+@router.get("/{bom_id}/standardization", response_model=BOMStandardizationStatus)
+async def read_bom_standardization(
+    bom_file: dict = Depends(get_bom_file_row),
+):
+    """
+    Get the status of the latest background standardization of a BOM file
+    """
+    return bom_file
+
+def _require_standardized(bom_file: dict):
+    if not bom_service.is_standardization_current(bom_file):
+        raise HTTPException(status_code=404, detail="BOM file has not been standardized")
+
+@router.get("/{bom_id}/rows", response_model=List[BOMRowSchema])
+async def read_bom_rows(
+    skip: int = 0,
+    limit: int = 100,
+    bom_file: dict = Depends(get_bom_file_row),
+):
+    """
+    Get the parsed rows of the standardized BOM, in file order
+    """
+    _require_standardized(bom_file)
+    supabase = get_supabase_client()
+    response = await run_in_threadpool(
+        supabase.table('bom_rows').select('*').eq('user_id', bom_file['user_id'])
+        .eq('content_hash', bom_file['content_hash'])
+        .order('position').range(skip, skip + limit - 1).execute
+    )
+    return response.data
+
+@router.get("/{bom_id}/summary", response_model=BOMSummary)
+async def read_bom_summary(
+    bom_file: dict = Depends(get_bom_file_row),
+):
+    """
+    Get totals of the standardized BOM: weight, emissions (weight × factor) and a per-material breakdown
+    """
+    _require_standardized(bom_file)
+    supabase = get_supabase_client()
+    response = await run_in_threadpool(
+        supabase.rpc('bom_rows_summary', {
+            'p_user_id': bom_file['user_id'],
+            'p_content_hash': bom_file['content_hash'],
+        }).execute
+    )
+    return response.data
+
 @router.delete("/{bom_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_bom(
     bom_id: UUID,
@@ -125,18 +232,36 @@ async def delete_bom(
     Delete BOM file
     """
     supabase = get_supabase_client()
-    
-    # Get BOM file
-    bom_file = supabase.table('bom_files').select('*').eq('id', str(bom_id)).eq('user_id', str(current_user.id)).single().execute()
+
+    # Delete the record; the deleted row tells us which storage object to remove
+    bom_file = await run_in_threadpool(
+        supabase.table('bom_files').delete().eq('id', str(bom_id)).eq('user_id', str(current_user.id)).execute
+    )
     if not bom_file.data:
         raise HTTPException(status_code=404, detail="BOM file not found")
         
     try:
-        # Delete file from storage
-        supabase.storage.from_("bom_files").remove([bom_file.data['file_path']])
-        
-        # Delete record from database
-        supabase.table('bom_files').delete().eq('id', str(bom_id)).execute()
+        # Delete file from storage once no other BOM file of the user references it
+        file_path = bom_file.data[0]['file_path']
+        references = await run_in_threadpool(
+            supabase.table('bom_files').select('id').eq('user_id', str(current_user.id))
+            .eq('file_path', file_path).limit(1).execute
+        )
+        if not references.data:
+            await run_in_threadpool(supabase.storage.from_("bom_files").remove, [file_path])
+
+        # Parsed rows are shared by the files with the same content
+        content_hash = bom_file.data[0].get('content_hash')
+        if content_hash:
+            references = await run_in_threadpool(
+                supabase.table('bom_files').select('id').eq('user_id', str(current_user.id))
+                .eq('content_hash', content_hash).limit(1).execute
+            )
+            if not references.data:
+                await run_in_threadpool(
+                    supabase.table('bom_rows').delete().eq('user_id', str(current_user.id))
+                    .eq('content_hash', content_hash).execute
+                )
         
         return None
         
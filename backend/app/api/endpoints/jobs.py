@@ -0,0 +1,22 @@
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api import deps
+from app.core.jobs import get_job_queue
+from app.schemas.job import Job as JobSchema
+from app.schemas.user import UserResponse
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobSchema)
+async def read_job(
+    job_id: UUID,
+    current_user: UserResponse = Depends(deps.get_current_user),
+):
+    """
+    Get status, progress and result of a background job
+    """
+    job = await get_job_queue().get(str(job_id))
+    if job is None or job["tenant"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -19,7 +19,7 @@ def get_products(
 ):
     """Get all products"""
     supabase = get_supabase_client()
-    response = supabase.table('products').select('*').range(skip, skip + limit).execute()
+    response = supabase.table('products').select('*').range(skip, skip + limit - 1).execute()
     return response.data
 
 
@@ -52,6 +52,17 @@ def create_product(
     return response.data[0]
 
 
+def _product_write_error(supabase, product_id: UUID, action: str) -> HTTPException:
+    """
+    Explain why a conditional write matched no row.
+    Only runs on the error path, so successful writes need no extra lookup.
+    """
+    product = supabase.table('products').select('user_id').eq('id', str(product_id)).maybe_single().execute()
+    if not product or not product.data:
+        return HTTPException(status_code=404, detail="Product not found")
+    return HTTPException(status_code=403, detail=f"You don't have permission to {action} this product")
+
+
 @router.put("/{product_id}", response_model=Product)
 def update_product(
     product_id: UUID,
@@ -60,19 +71,12 @@ def update_product(
 ):
     """Update product"""
     supabase = get_supabase_client()
-    
-    # Get product
-    product = supabase.table('products').select('*').eq('id', str(product_id)).single().execute()
-    if not product.data:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    # Check if user has permission to update product
-    if product.data['user_id'] != str(current_user.id):
-        raise HTTPException(status_code=403, detail="You don't have permission to update this product")
 
-    # Update product
+    # Update only if the product belongs to the user, in a single round trip
     update_data = product_update.dict(exclude_unset=True)
-    response = supabase.table('products').update(update_data).eq('id', str(product_id)).execute()
+    response = supabase.table('products').update(update_data).eq('id', str(product_id)).eq('user_id', str(current_user.id)).execute()
+    if not response.data:
+        raise _product_write_error(supabase, product_id, "update")
     return response.data[0]
 
 
@@ -83,15 +87,9 @@ def delete_product(
 ):
     """Delete product"""
     supabase = get_supabase_client()
-    
-    # Get product
-    product = supabase.table('products').select('*').eq('id', str(product_id)).single().execute()
-    if not product.data:
-        raise HTTPException(status_code=404, detail="Product not found")
 
-    # Check if user has permission to delete product
-    if product.data['user_id'] != str(current_user.id):
-        raise HTTPException(status_code=403, detail="You don't have permission to delete this product")
-
-    supabase.table('products').delete().eq('id', str(product_id)).execute()
+    # Delete only if the product belongs to the user, in a single round trip
+    response = supabase.table('products').delete().eq('id', str(product_id)).eq('user_id', str(current_user.id)).execute()
+    if not response.data:
+        raise _product_write_error(supabase, product_id, "delete")
     return None
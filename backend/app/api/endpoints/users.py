@@ -4,6 +4,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.api import deps
+from app.core.security import user_cache, user_cache_invalidation
 from app.core.supabase import get_supabase_client, get_supabase_admin_client
 from app.schemas.user import User, UserCreate, UserUpdate, UserResponse
 
@@ -18,7 +19,7 @@ def get_users(
 ):
     """Get all users (superuser only)"""
     supabase = get_supabase_client()
-    response = supabase.table('users').select('*').range(skip, skip + limit).execute()
+    response = supabase.table('users').select('*').range(skip, skip + limit - 1).execute()
     return response.data
 
 
@@ -33,7 +34,7 @@ def get_current_user_info(
 @router.put("/me", response_model=UserResponse)
 def update_current_user(
     user_update: UserUpdate,
-    current_user: UserResponse = Depends(deps.get_current_active_user),
+    current_user: UserResponse = Depends(deps.get_current_active_verified_user),
 ):
     """Update current user"""
     supabase = get_supabase_client()
@@ -41,6 +42,7 @@ def update_current_user(
     # Update user data
     update_data = user_update.dict(exclude_unset=True)
     response = supabase.table('users').update(update_data).eq('id', str(current_user.id)).execute()
+    user_cache_invalidation.invalidate(str(current_user.id))
     
     # Also update user metadata in auth if needed
     if user_update.full_name or user_update.company:
@@ -55,6 +57,14 @@ def update_current_user(
     return response.data[0]
 
 
+@router.get("/cache-stats")
+def get_user_cache_stats(
+    current_user: UserResponse = Depends(deps.get_current_active_superuser),
+):
+    """Get user profile cache statistics of this process (superuser only)"""
+    return user_cache.stats()
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: UUID,
@@ -85,6 +95,7 @@ def update_user(
     # Update user data
     update_data = user_update.dict(exclude_unset=True)
     response = supabase.table('users').update(update_data).eq('id', str(user_id)).execute()
+    user_cache_invalidation.invalidate(str(user_id))
     
     # Also update user metadata in auth if needed
     if user_update.full_name or user_update.company:
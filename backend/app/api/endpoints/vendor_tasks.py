@@ -3,11 +3,14 @@ from typing import List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.api import deps
+from app.core.database import asyncpg_enabled
 from app.core.supabase import get_supabase_client
 from app.schemas.user import UserResponse
 from app.schemas import VendorTask, VendorTaskCreate, VendorTaskUpdate, VendorTaskSubmit
+from app.services import pg_repository
 
 router = APIRouter()
 
@@ -20,33 +23,61 @@ def get_vendor_tasks(
 ):
     """Get all vendor tasks"""
     supabase = get_supabase_client()
-    response = supabase.table('vendor_tasks').select('*').range(skip, skip + limit).execute()
+    response = supabase.table('vendor_tasks').select('*').range(skip, skip + limit - 1).execute()
     return response.data
 
 
 @router.get("/pending", response_model=List[VendorTask])
-def get_pending_tasks(
+async def get_pending_tasks(
     current_user: UserResponse = Depends(deps.get_current_user),
 ):
     """Get current user's pending tasks"""
+    if asyncpg_enabled():
+        return await pg_repository.get_pending_vendor_tasks()
+
     supabase = get_supabase_client()
-    response = supabase.table('vendor_tasks').select('*').eq('status', 'pending').execute()
+    response = await run_in_threadpool(
+        supabase.table('vendor_tasks').select('*').eq('status', 'pending').order('created_at').order('id').execute
+    )
     return response.data
 
 
-@router.get("/{task_id}", response_model=VendorTask)
-def get_vendor_task(
+# Task row plus the owner of its workflow, loaded in one embedded select
+TASK_WITH_OWNER = '*, workflows(user_id)'
+
+
+def get_task_with_owner(
     task_id: UUID,
     current_user: UserResponse = Depends(deps.get_current_user),
-):
-    """Get specific vendor task"""
+) -> dict:
+    """
+    Load a vendor task together with its workflow's owner.
+
+    Used as a dependency: FastAPI resolves it once per request, so the
+    endpoint and any other dependency share the same row instead of
+    fetching it again. Authentication runs first.
+    """
     supabase = get_supabase_client()
-    response = supabase.table('vendor_tasks').select('*').eq('id', str(task_id)).single().execute()
-    if not response.data:
+    response = supabase.table('vendor_tasks').select(TASK_WITH_OWNER).eq('id', str(task_id)).maybe_single().execute()
+    if not response or not response.data:
         raise HTTPException(status_code=404, detail="Vendor task not found")
     return response.data
 
 
+def _task_owner_id(task: dict) -> Optional[str]:
+    workflow = task.get('workflows') or {}
+    return str(workflow['user_id']) if workflow.get('user_id') else None
+
+
+@router.get("/{task_id}", response_model=VendorTask)
+def get_vendor_task(
+    task: dict = Depends(get_task_with_owner),
+    current_user: UserResponse = Depends(deps.get_current_user),
+):
+    """Get specific vendor task"""
+    return task
+
+
 @router.post("/", response_model=VendorTask, status_code=status.HTTP_201_CREATED)
 def create_vendor_task(
     task: VendorTaskCreate,
@@ -56,8 +87,8 @@ def create_vendor_task(
     supabase = get_supabase_client()
     
     # Check if workflow exists
-    workflow = supabase.table('workflows').select('*').eq('id', str(task.workflow_id)).single().execute()
-    if not workflow.data:
+    workflow = supabase.table('workflows').select('user_id').eq('id', str(task.workflow_id)).maybe_single().execute()
+    if not workflow or not workflow.data:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
     # Check if user has permission to create task
@@ -75,26 +106,22 @@ def create_vendor_task(
 def update_vendor_task(
     task_id: UUID,
     task_update: VendorTaskUpdate,
+    task: dict = Depends(get_task_with_owner),
     current_user: UserResponse = Depends(deps.get_current_user),
 ):
     """Update vendor task"""
     supabase = get_supabase_client()
-    
-    # Get task
-    task = supabase.table('vendor_tasks').select('*').eq('id', str(task_id)).single().execute()
-    if not task.data:
-        raise HTTPException(status_code=404, detail="Vendor task not found")
 
     # Check if user has permission to update task
-    workflow = supabase.table('workflows').select('*').eq('id', str(task.data['workflow_id'])).single().execute()
-    if workflow.data and workflow.data['user_id'] != str(current_user.id):
+    owner_id = _task_owner_id(task)
+    if owner_id and owner_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="You don't have permission to update this task")
 
     # Update task
     update_data = task_update.dict(exclude_unset=True)
     
     # Check status and update related fields
-    if task_update.status == "completed" and task.data['status'] != "completed":
+    if task_update.status == "completed" and task['status'] != "completed":
         update_data['updated_at'] = datetime.now().isoformat()
 
     response = supabase.table('vendor_tasks').update(update_data).eq('id', str(task_id)).execute()
@@ -104,19 +131,15 @@ def update_vendor_task(
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_vendor_task(
     task_id: UUID,
+    task: dict = Depends(get_task_with_owner),
     current_user: UserResponse = Depends(deps.get_current_user),
 ):
     """Delete vendor task"""
     supabase = get_supabase_client()
-    
-    # Get task
-    task = supabase.table('vendor_tasks').select('*').eq('id', str(task_id)).single().execute()
-    if not task.data:
-        raise HTTPException(status_code=404, detail="Vendor task not found")
 
     # Check if user has permission to delete task
-    workflow = supabase.table('workflows').select('*').eq('id', str(task.data['workflow_id'])).single().execute()
-    if workflow.data and workflow.data['user_id'] != str(current_user.id):
+    owner_id = _task_owner_id(task)
+    if owner_id and owner_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="You don't have permission to delete this task")
 
     supabase.table('vendor_tasks').delete().eq('id', str(task_id)).execute()
@@ -131,13 +154,8 @@ def submit_task_result(
 ):
     """Submit vendor task result"""
     supabase = get_supabase_client()
-    
-    # Get task
-    task = supabase.table('vendor_tasks').select('*').eq('id', str(task_id)).single().execute()
-    if not task.data:
-        raise HTTPException(status_code=404, detail="Vendor task not found")
 
-    # Update task status to completed
+    # Update task status to completed; an empty result means the task does not exist
     update_data = {
         'status': 'completed',
         'updated_at': datetime.now().isoformat(),
@@ -146,4 +164,6 @@ def submit_task_result(
     }
     
     response = supabase.table('vendor_tasks').update(update_data).eq('id', str(task_id)).execute()
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Vendor task not found")
     return response.data[0]
@@ -1,22 +1,66 @@
-from typing import List
+import gzip
+import zlib
+from typing import Iterable, Iterator, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import asyncpg_enabled
 from app.schemas.user import UserResponse
-from app.schemas.workflow import Workflow, WorkflowCreate, WorkflowUpdate
+from app.schemas.workflow import Workflow, WorkflowClone, WorkflowCreate, WorkflowUpdate
+from app.services import pg_repository
 from app.services.workflow_service import (
+    WorkflowImportError,
+    WorkflowVersionConflict,
     calculate_carbon_footprint,
+    clone_workflow,
     create_workflow,
     delete_workflow,
+    export_user_workflows,
     get_user_workflows,
     get_workflow_by_id,
+    get_workflow_version,
+    import_workflows,
     update_workflow,
 )
 
 router = APIRouter()
 
+
+def _workflow_etag(workflow_id, version: int) -> str:
+    """Build the ETag for a workflow version"""
+    return f'"{workflow_id}:{version}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Check an If-None-Match / If-Match header value against an ETag"""
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def _expected_version(if_match: Optional[str], workflow_id: UUID) -> Optional[int]:
+    """
+    Extract the version a client based its update on from an If-Match header.
+    Returns None when any version is acceptable.
+    """
+    if not if_match or if_match.strip() == '*':
+        return None
+    for value in if_match.split(','):
+        tag = value.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        tag_id, _, tag_version = tag.rpartition(':')
+        if tag_id == str(workflow_id) and tag_version.isdigit():
+            return int(tag_version)
+    raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="ETag does not match workflow")
+
+
 @router.get("/", response_model=List[Workflow])
 async def read_workflows(
     skip: int = 0,
@@ -26,76 +70,185 @@ async def read_workflows(
     """
     Get all workflows for current user
     """
-    workflows = get_user_workflows(current_user.id, skip, limit)
-    # Ensure each workflow has the required fields with proper types
-    for workflow in workflows:
-        workflow['id'] = str(workflow['id']) if workflow.get('id') else None
-        workflow['user_id'] = str(workflow['user_id']) if workflow.get('user_id') else None
-        workflow['data'] = workflow.get('data', {})
-        workflow['nodes'] = workflow.get('nodes', [])
-        workflow['edges'] = workflow.get('edges', [])
-    return workflows
+    if asyncpg_enabled():
+        return await pg_repository.get_user_workflows(current_user.id, skip, limit)
+    return await run_in_threadpool(get_user_workflows, current_user.id, skip, limit)
+
+
+def _gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_workflows_endpoint(
+    compress: bool = False,
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Export all workflows of the current user as NDJSON (one workflow per line),
+    optionally gzip-compressed. The export is streamed page by page.
+    """
+    lines = (orjson.dumps(workflow) + b"\n" for workflow in export_user_workflows(current_user.id))
+    if compress:
+        return StreamingResponse(
+            _gzip_stream(lines),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="workflows.ndjson.gz"'},
+        )
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="workflows.ndjson"'},
+    )
+
+
+class _ImportTooLarge(ValueError):
+    pass
+
+
+def _limited_lines(stream, max_bytes: int) -> Iterator[bytes]:
+    """Lines of a stream, failing once more than max_bytes have been read"""
+    remaining = max_bytes
+    # Bounded reads, so a huge line (or gzip bomb) is never read in one go
+    while line := stream.readline(remaining + 1):
+        remaining -= len(line)
+        if remaining < 0:
+            raise _ImportTooLarge(
+                f"Import file is larger than {max_bytes // (1024 * 1024)} MB once decompressed"
+            )
+        yield line
+
+
+@router.post("/import")
+def import_workflows_endpoint(
+    file: UploadFile = File(...),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Import workflows from an NDJSON export (plain or gzip-compressed).
+    Returns the ids of the imported workflows, the number of rejected lines
+    and the first of their errors.
+
+    The import is not atomic. When it stops part way (unreadable or oversized
+    file, failed insert) the workflows already created are kept, and the error
+    detail lists them under imported / workflow_ids.
+    """
+    # Detect gzip from the magic bytes rather than trusting the file name
+    stream = file.file
+    is_gzip = stream.read(2) == b"\x1f\x8b"
+    stream.seek(0)
+    if is_gzip:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+
+    max_bytes = settings.WORKFLOW_IMPORT_MAX_DECOMPRESSED_MB * 1024 * 1024
+    try:
+        return import_workflows(_limited_lines(stream, max_bytes), current_user.id)
+    except WorkflowImportError as e:
+        if isinstance(e.__cause__, _ImportTooLarge):
+            status_code, message = 413, str(e)
+        elif isinstance(e.__cause__, (OSError, EOFError, zlib.error)):
+            status_code, message = 400, f"Invalid import file: {str(e)}"
+        else:
+            status_code, message = 500, f"Import failed: {str(e)}"
+        raise HTTPException(status_code=status_code, detail={"message": message, **e.result})
 
 @router.get("/{workflow_id}", response_model=Workflow)
 async def read_workflow(
     workflow_id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: UserResponse = Depends(get_current_user),
-) -> dict:
+):
     """
-    Get specific workflow
+    Get specific workflow.
+
+    Supports conditional requests: when If-None-Match carries the current ETag
+    only the version is looked up and 304 Not Modified is returned.
     """
-    workflow = get_workflow_by_id(workflow_id, current_user.id)
+    if if_none_match:
+        version = await run_in_threadpool(get_workflow_version, workflow_id, current_user.id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Workflow not found")
+        etag = _workflow_etag(workflow_id, version)
+        if _etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+            )
+
+    if asyncpg_enabled():
+        workflow = await pg_repository.get_workflow_by_id(workflow_id, current_user.id)
+    else:
+        workflow = await run_in_threadpool(get_workflow_by_id, workflow_id, current_user.id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
-    # Ensure the workflow has the required fields with proper types
-    workflow['id'] = str(workflow['id']) if workflow.get('id') else None
-    workflow['user_id'] = str(workflow['user_id']) if workflow.get('user_id') else None
-    workflow['data'] = workflow.get('data', {})
-    workflow['nodes'] = workflow.get('nodes', [])
-    workflow['edges'] = workflow.get('edges', [])
-    
+
+    response.headers["ETag"] = _workflow_etag(workflow['id'], workflow.get('version', 1))
+    response.headers["Cache-Control"] = "private, no-cache"
     return workflow
 
 @router.post("/", response_model=Workflow, status_code=status.HTTP_201_CREATED)
 async def create_workflow_endpoint(
     workflow: WorkflowCreate,
+    response: Response,
     current_user: UserResponse = Depends(get_current_user),
 ) -> dict:
     """
     Create new workflow
     """
-    result = create_workflow(workflow, current_user.id)
-    # Ensure the result has the required fields with proper types
-    result['id'] = str(result['id']) if result.get('id') else None
-    result['user_id'] = str(result['user_id']) if result.get('user_id') else None
-    result['data'] = result.get('data', {})
-    result['nodes'] = result.get('nodes', [])
-    result['edges'] = result.get('edges', [])
+    result = await run_in_threadpool(create_workflow, workflow, current_user.id)
+    response.headers["ETag"] = _workflow_etag(result['id'], result.get('version', 1))
     return result
 
 @router.put("/{workflow_id}", response_model=Workflow)
 async def update_workflow_endpoint(
     workflow_id: UUID,
     workflow_data: WorkflowUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: UserResponse = Depends(get_current_user),
 ) -> dict:
     """
-    Update workflow
+    Update workflow.
+
+    Honors If-Match: the update is rejected with 412 when the workflow changed
+    since the client fetched the given ETag.
     """
-    workflow = update_workflow(workflow_id, workflow_data, current_user.id)
+    expected_version = _expected_version(if_match, workflow_id)
+    try:
+        workflow = await run_in_threadpool(
+            update_workflow, workflow_id, workflow_data, current_user.id, expected_version
+        )
+    except WorkflowVersionConflict as e:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    
-    # Ensure the workflow has the required fields with proper types
-    workflow['id'] = str(workflow['id']) if workflow.get('id') else None
-    workflow['user_id'] = str(workflow['user_id']) if workflow.get('user_id') else None
-    workflow['data'] = workflow.get('data', {})
-    workflow['nodes'] = workflow.get('nodes', [])
-    workflow['edges'] = workflow.get('edges', [])
-    
+
+    response.headers["ETag"] = _workflow_etag(workflow['id'], workflow.get('version', 1))
     return workflow
 
+@router.post("/{workflow_id}/clone", status_code=status.HTTP_201_CREATED)
+async def clone_workflow_endpoint(
+    workflow_id: UUID,
+    clone: Optional[WorkflowClone] = None,
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Clone one of the user's workflows, or a public template, server-side
+    """
+    new_workflow_id = await run_in_threadpool(
+        clone_workflow, workflow_id, current_user.id, clone.name if clone else None
+    )
+    if not new_workflow_id:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"id": new_workflow_id, "source_workflow_id": str(workflow_id)}
+
 @router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_workflow_endpoint(
     workflow_id: UUID,
@@ -104,7 +257,7 @@ async def delete_workflow_endpoint(
     """
     Delete workflow
     """
-    result = delete_workflow(workflow_id, current_user.id)
+    result = await run_in_threadpool(delete_workflow, workflow_id, current_user.id)
     if not result:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -116,11 +269,11 @@ async def calculate_carbon_footprint_endpoint(
     """
     Calculate workflow's carbon footprint
     """
-    workflow = get_workflow_by_id(workflow_id, current_user.id)
-    if not workflow:
+    # Only an ownership check is needed here, so skip loading nodes and edges
+    if await run_in_threadpool(get_workflow_version, workflow_id, current_user.id) is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
-    total_carbon_footprint = calculate_carbon_footprint(workflow_id)
+    total_carbon_footprint = await run_in_threadpool(calculate_carbon_footprint, workflow_id)
     return {
         "workflow_id": str(workflow_id),
         "total_carbon_footprint": total_carbon_footprint,
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # without redis, invalidation stays within the process
+    redis = aioredis = None
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Keeps hit/miss counters for monitoring.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CacheInvalidation:
+    """
+    Invalidates keys of a per-process TTLCache in every worker process.
+
+    Once started with a Redis URL, invalidate() publishes the key on `channel`
+    and every process drops it from its own cache; without one only this
+    process's cache is invalidated. Pub/sub does not queue messages, so a
+    process clears its whole cache whenever it (re)subscribes. Changes made
+    outside the API are still only picked up when entries expire.
+    """
+
+    def __init__(self, cache: TTLCache, channel: str):
+        self.cache = cache
+        self.channel = channel
+        self._publisher = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, url: Optional[str]):
+        if not url or redis is None or self._task is not None:
+            return
+        self._publisher = redis.Redis.from_url(url)
+        self._task = asyncio.create_task(self._listen(url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+    def invalidate(self, key: str):
+        """Drop `key` here and in the other processes. Blocking; call it from a worker thread."""
+        self.cache.invalidate(key)
+        if self._publisher is not None:
+            try:
+                self._publisher.publish(self.channel, key)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to publish cache invalidation on {self.channel}: {str(e)}")
+
+    async def _listen(self, url: str):
+        client = aioredis.from_url(url)
+        try:
+            while True:
+                try:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(self.channel)
+                        # Invalidations published while unsubscribed were missed
+                        self.cache.clear()
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                self.cache.invalidate(message["data"].decode())
+                except aioredis.RedisError as e:
+                    logger.warning(f"Cache invalidation subscription on {self.channel} lost: {str(e)}")
+                    await asyncio.sleep(5)
+        finally:
+            await client.aclose()
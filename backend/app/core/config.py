@@ -14,9 +14,77 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY: str | None = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    # Access tokens are verified locally: HS256 tokens with the project's JWT
+    # secret, asymmetric ones with the keys published at the JWKS endpoint
+    SUPABASE_JWT_SECRET: str | None = os.getenv("SUPABASE_JWT_SECRET")
+    SUPABASE_JWT_AUDIENCE: str = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    SUPABASE_JWKS_CACHE_SECONDS: int = int(os.getenv("SUPABASE_JWKS_CACHE_SECONDS", "600"))
+    # Resolved user profiles are cached per process. Updates made through the
+    # API invalidate them in every worker (through Redis pub/sub when workers
+    # share Redis); other changes, e.g. is_active set in the database, show up
+    # after the TTL
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # Hot read queries go through PostgREST ("postgrest") or straight to
+    # Postgres over an asyncpg pool ("asyncpg")
+    DATABASE_READ_BACKEND: str = os.getenv("DATABASE_READ_BACKEND", "postgrest")
+    DATABASE_POOL_MIN_SIZE: int = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+    DATABASE_POOL_MAX_SIZE: int = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+    # Set to 0 when DATABASE_URL points at a transaction-mode pooler (pgbouncer,
+    # Supabase port 6543), which cannot keep prepared statements
+    DATABASE_STATEMENT_CACHE_SIZE: int = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
+    
+    # Production server (python -m app.server). SERVER_WORKERS=0 derives the
+    # worker count from the CPUs available to the process. Keep-alive should
+    # exceed the load balancer's idle timeout, and the graceful timeout the
+    # longest LLM call (120s) so deploys drain in-flight requests.
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))
+    SERVER_KEEPALIVE_SECONDS: int = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "75"))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "150"))
+    
+    # Largest accepted BOM upload; bigger requests are rejected with 413
+    BOM_UPLOAD_MAX_MB: int = int(os.getenv("BOM_UPLOAD_MAX_MB", "20"))
+    # Largest workflow import file, as uploaded and once gzip-decompressed
+    WORKFLOW_IMPORT_MAX_MB: int = int(os.getenv("WORKFLOW_IMPORT_MAX_MB", "20"))
+    WORKFLOW_IMPORT_MAX_DECOMPRESSED_MB: int = int(os.getenv("WORKFLOW_IMPORT_MAX_DECOMPRESSED_MB", "200"))
+    
+    # Excel files are parsed in a per-worker process pool. EXCEL_ENGINE is
+    # "auto" (calamine if installed), "calamine" or "openpyxl".
+    EXCEL_ENGINE: str = os.getenv("EXCEL_ENGINE", "auto")
+    SPREADSHEET_PARSE_WORKERS: int = int(os.getenv("SPREADSHEET_PARSE_WORKERS", "2"))
+    SPREADSHEET_PARSE_TIMEOUT_SECONDS: float = float(os.getenv("SPREADSHEET_PARSE_TIMEOUT_SECONDS", "60"))
+    
+    # Background jobs (app/core/jobs.py). "memory" keeps queued jobs in each
+    # worker process and needs a single worker; "redis" shares them between
+    # workers and hosts; "auto" is redis when the server runs several workers.
+    JOB_QUEUE_BACKEND: str = os.getenv("JOB_QUEUE_BACKEND", "auto")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RESULT_TTL_SECONDS: int = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+    # A queued or running BOM standardization without progress for this long is
+    # treated as lost, and the file can be standardized again
+    BOM_STANDARDIZATION_STALE_SECONDS: int = int(os.getenv("BOM_STANDARDIZATION_STALE_SECONDS", "900"))
+    # BOM rows sent to the LLM per request when standardizing in the background
+    BOM_STANDARDIZE_CHUNK_ROWS: int = int(os.getenv("BOM_STANDARDIZE_CHUNK_ROWS", "50"))
+    # Rows per LLM request when standardizing lifecycle stage documents
+    LIFECYCLE_STANDARDIZE_CHUNK_ROWS: int = int(os.getenv("LIFECYCLE_STANDARDIZE_CHUNK_ROWS", "50"))
+    
+    # Most LLM requests in flight per worker process; batch work queues behind it
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    # Context window of the LLM model in tokens; larger inputs are split over several requests
+    LLM_CONTEXT_TOKENS: int = int(os.getenv("LLM_CONTEXT_TOKENS", "16000"))
+    # Most files, and largest total size, accepted by one /ai/batch-ingest request
+    BATCH_INGEST_MAX_FILES: int = int(os.getenv("BATCH_INGEST_MAX_FILES", "50"))
+    BATCH_INGEST_MAX_TOTAL_MB: int = int(os.getenv("BATCH_INGEST_MAX_TOTAL_MB", "100"))
+    
+    # /health/ready probes: per-probe timeout and how long a result is reused
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+    HEALTH_CACHE_SECONDS: float = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-jwt")
@@ -48,8 +116,6 @@ class Settings(BaseSettings):
         if len(self.SUPABASE_KEY) < 20:
             raise ValueError("Invalid SUPABASE_KEY format")
 
-# Initialize settings
+# Initialize settings. Validation runs at application startup (see app.main),
+# so importing modules for tooling or tests does not require a full environment.
 settings = Settings()
-
-# Validate Supabase configuration
-settings.validate_supabase_config() 
\ No newline at end of file
@@ -0,0 +1,70 @@
+from typing import Optional
+
+import orjson
+
+from app.core.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg is only needed for DATABASE_READ_BACKEND=asyncpg
+    asyncpg = None
+
+# Process-wide asyncpg pool, created at startup when the asyncpg read backend is enabled
+_pool: Optional["asyncpg.Pool"] = None
+
+def asyncpg_enabled() -> bool:
+    """
+    Whether hot read queries should use the asyncpg pool
+    """
+    return settings.DATABASE_READ_BACKEND == "asyncpg"
+
+async def _init_connection(connection):
+    # Decode json/jsonb columns (and json_agg results) straight into Python objects
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
+async def init_pool():
+    """
+    Create the asyncpg pool if the asyncpg read backend is enabled
+    """
+    global _pool
+    if not asyncpg_enabled() or _pool is not None:
+        return _pool
+    if asyncpg is None:
+        raise ValueError("DATABASE_READ_BACKEND=asyncpg requires the asyncpg package")
+    if not settings.DATABASE_URL:
+        raise ValueError("DATABASE_URL is not set")
+
+    _pool = await asyncpg.create_pool(
+        settings.DATABASE_URL,
+        min_size=settings.DATABASE_POOL_MIN_SIZE,
+        max_size=settings.DATABASE_POOL_MAX_SIZE,
+        # Statements are prepared once per connection and reused from this cache
+        statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=300,
+        command_timeout=30,
+        init=_init_connection,
+    )
+    return _pool
+
+async def close_pool():
+    """
+    Close the asyncpg pool
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_pool() -> "asyncpg.Pool":
+    """
+    Get the asyncpg pool created by init_pool
+    """
+    if _pool is None:
+        raise ValueError("asyncpg pool is not initialized")
+    return _pool
@@ -0,0 +1,131 @@
+"""
+Dependency probes behind the /health/ready endpoint.
+
+Probes run concurrently, each bounded by HEALTH_PROBE_TIMEOUT_SECONDS, and the
+combined result is cached for HEALTH_CACHE_SECONDS, so frequent load balancer
+checks do not turn into a request to every upstream each time.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+
+from app.core import database
+from app.core.config import settings
+
+OPENAI_MODELS_URL = "https://api.openai.com/v1/models"
+DEEPSEEK_MODELS_URL = "https://api.deepseek.com/models"
+
+Probe = Callable[[httpx.AsyncClient], Awaitable[None]]
+
+
+async def _probe_supabase(client: httpx.AsyncClient):
+    # A one-row PostgREST read goes through the API gateway to the database
+    response = await client.get(
+        f"{settings.SUPABASE_URL}/rest/v1/workflows",
+        params={"select": "id", "limit": "1"},
+        headers={"apikey": settings.SUPABASE_KEY, "Authorization": f"Bearer {settings.SUPABASE_KEY}"},
+    )
+    response.raise_for_status()
+
+
+async def _probe_database(client: httpx.AsyncClient):
+    async with database.get_pool().acquire() as connection:
+        await connection.fetchval("SELECT 1")
+
+
+async def _probe_openai(client: httpx.AsyncClient):
+    response = await client.get(
+        OPENAI_MODELS_URL, headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+    )
+    response.raise_for_status()
+
+
+async def _probe_deepseek(client: httpx.AsyncClient):
+    response = await client.get(
+        DEEPSEEK_MODELS_URL, headers={"Authorization": f"Bearer {settings.DEEPSEEK_API_KEY}"}
+    )
+    response.raise_for_status()
+
+
+def _probes() -> List[Tuple[str, Probe, bool]]:
+    """
+    (name, probe, critical) for every configured dependency. LLM providers are
+    not critical: the AI endpoints fall back to another provider or mock data.
+    """
+    probes = [("supabase", _probe_supabase, True)]
+    if database.asyncpg_enabled():
+        probes.append(("database", _probe_database, True))
+    if settings.OPENAI_API_KEY:
+        probes.append(("openai", _probe_openai, False))
+    if settings.DEEPSEEK_API_KEY:
+        probes.append(("deepseek", _probe_deepseek, False))
+    return probes
+
+
+async def _run_probe(probe: Probe, client: httpx.AsyncClient) -> dict:
+    start = time.perf_counter()
+    result = {"status": "ok"}
+    try:
+        await asyncio.wait_for(probe(client), timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        result = {"status": "timeout"}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+async def _check_dependencies() -> dict:
+    probes = _probes()
+    async with httpx.AsyncClient(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS) as client:
+        results = await asyncio.gather(*(_run_probe(probe, client) for _, probe, _ in probes))
+
+    checks = {}
+    ready = True
+    for (name, _, critical), result in zip(probes, results):
+        result["critical"] = critical
+        checks[name] = result
+        if critical and result["status"] != "ok":
+            ready = False
+
+    return {
+        "status": "ready" if ready else "not_ready",
+        "checked_at": datetime.now(timezone.utc).isoformat(),
+        "checks": checks,
+    }
+
+
+class ReadinessChecker:
+    """
+    Caches the dependency check result; concurrent callers share one run
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._result: Optional[dict] = None
+        self._expires_at = 0.0
+        self._pending: Optional[asyncio.Task] = None
+
+    async def check(self) -> dict:
+        if self._result is not None and time.monotonic() < self._expires_at:
+            return self._result
+
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._refresh())
+        # shield: a caller that disconnects must not cancel the shared run
+        return await asyncio.shield(self._pending)
+
+    async def _refresh(self) -> dict:
+        result = await _check_dependencies()
+        self._result = result
+        self._expires_at = time.monotonic() + self.ttl
+        return result
+
+    def clear(self):
+        self._result = None
+        self._expires_at = 0.0
+
+
+readiness_checker = ReadinessChecker(ttl=settings.HEALTH_CACHE_SECONDS)
@@ -0,0 +1,316 @@
+"""
+Background job queue for long-running work such as BOM standardization.
+
+Endpoints enqueue a job and return its id right away; a pool of async workers
+in each API process runs the registered handler for the job's kind. Workers
+take jobs round-robin across tenants, so one user queueing many files does
+not hold up everyone else. Handlers report progress while they run.
+
+JOB_QUEUE_BACKEND selects where jobs live: "memory" keeps them in the worker
+process (development, single worker), "redis" shares queue and job state
+between processes and hosts. "auto" is redis when the server runs several
+worker processes, since a job kept in one worker's memory is not visible to
+the others.
+"""
+import abc
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import orjson
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is only needed for JOB_QUEUE_BACKEND=redis
+    redis = None
+
+# (job, report_progress(done, total)) -> result
+JobHandler = Callable[[dict, Callable[[int, int], Awaitable[None]]], Awaitable[Any]]
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Pause before a worker tries again after failing to take or run a job, e.g.
+# while Redis is unreachable
+WORKER_RETRY_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_handler(kind: str):
+    """
+    Register the coroutine that runs jobs of `kind`
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+class JobQueue(abc.ABC):
+    """
+    Queue interface. Subclasses store jobs and hand them to workers in
+    tenant round-robin order; running them is shared here.
+    """
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+
+    async def enqueue(self, kind: str, tenant: str, payload: dict, job_id: Optional[str] = None) -> dict:
+        """
+        Queue a job. Pass `job_id` when the id has to be recorded before the job can start.
+        """
+        now = time.time()
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "kind": kind,
+            "tenant": tenant,
+            "payload": payload,
+            "status": "queued",
+            "progress": {"done": 0, "total": 0},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self._push(job)
+        return job
+
+    @abc.abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    async def update(self, job_id: str, **fields) -> Optional[dict]:
+        ...
+
+    @abc.abstractmethod
+    async def _push(self, job: dict):
+        ...
+
+    @abc.abstractmethod
+    async def _next_job_id(self) -> Optional[str]:
+        """Wait for the next job id in tenant round-robin order"""
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        # A worker only ends when it is cancelled: an error taking or running
+        # one job must not leave the queue with one worker fewer
+        while True:
+            try:
+                job_id = await self._next_job_id()
+                job = await self.get(job_id) if job_id else None
+                if job is not None:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker error, retrying in %ss", WORKER_RETRY_SECONDS)
+                await asyncio.sleep(WORKER_RETRY_SECONDS)
+
+    async def _run(self, job: dict):
+        handler = _handlers.get(job["kind"])
+        if handler is None:
+            await self.update(job["id"], status="failed", error=f"No handler for job kind {job['kind']}")
+            return
+
+        async def report_progress(done: int, total: int):
+            await self.update(job["id"], progress={"done": done, "total": total})
+
+        await self.update(job["id"], status="running")
+        try:
+            result = await handler(job, report_progress)
+        except asyncio.CancelledError:
+            await asyncio.shield(self.update(job["id"], status="failed", error="Interrupted by shutdown"))
+            raise
+        except Exception as e:
+            await self.update(job["id"], status="failed", error=str(e))
+        else:
+            await self.update(job["id"], status="succeeded", result=result)
+
+
+class InProcessJobQueue(JobQueue):
+    """
+    Jobs kept in this process. Finished jobs are dropped after JOB_RESULT_TTL_SECONDS.
+    """
+    def __init__(self, workers: int, ttl: float):
+        super().__init__(workers)
+        self.ttl = ttl
+        self._jobs: Dict[str, dict] = {}
+        # tenant -> queued job ids; tenants are served in insertion order, round-robin
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._queued: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it belongs to the running event loop
+        if self._queued is None:
+            self._queued = asyncio.Semaphore(0)
+        return self._queued
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return self._jobs.get(job_id)
+
+    async def update(self, job_id: str, **fields) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+        return job
+
+    async def _push(self, job: dict):
+        self._prune()
+        self._jobs[job["id"]] = job
+        self._queues.setdefault(job["tenant"], deque()).append(job["id"])
+        self._semaphore().release()
+
+    async def _next_job_id(self) -> Optional[str]:
+        await self._semaphore().acquire()
+        tenant, queue = self._queues.popitem(last=False)
+        job_id = queue.popleft()
+        if queue:
+            self._queues[tenant] = queue  # back of the line
+        return job_id
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATUSES and job["updated_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Jobs kept in Redis: one list of job ids per tenant plus a list of tenants
+    with queued work, which workers rotate through. Queueing and taking a job
+    are Lua scripts, so the rotation is never left half-updated by a worker
+    that dies between two commands.
+    """
+    _TENANTS = "jobs:tenants"
+    # One entry per queued job, to wake a waiting worker
+    _READY = "jobs:ready"
+    _QUEUE_PREFIX = "jobs:queue:"
+
+    # KEYS: tenants, tenant queue, ready. ARGV: tenant, job id
+    _PUSH_SCRIPT = """
+        if redis.call('RPUSH', KEYS[2], ARGV[2]) == 1 then
+            redis.call('RPUSH', KEYS[1], ARGV[1])
+        end
+        redis.call('RPUSH', KEYS[3], '1')
+    """
+    # KEYS: tenants. ARGV: queue key prefix. Takes the next tenant's oldest
+    # job and moves the tenant to the back of the line if it has more.
+    _POP_SCRIPT = """
+        local tenant = redis.call('LPOP', KEYS[1])
+        if not tenant then
+            return false
+        end
+        local queue = ARGV[1] .. tenant
+        local job_id = redis.call('LPOP', queue)
+        if redis.call('LLEN', queue) > 0 then
+            redis.call('RPUSH', KEYS[1], tenant)
+        end
+        return job_id
+    """
+
+    def __init__(self, workers: int, ttl: float, url: str):
+        super().__init__(workers)
+        if redis is None:
+            raise ValueError("JOB_QUEUE_BACKEND=redis requires the redis package")
+        self.ttl = int(ttl)
+        self._redis = redis.from_url(url)
+        self._push_script = self._redis.register_script(self._PUSH_SCRIPT)
+        self._pop_script = self._redis.register_script(self._POP_SCRIPT)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"jobs:job:{job_id}"
+
+    @classmethod
+    def _queue_key(cls, tenant: str) -> str:
+        return f"{cls._QUEUE_PREFIX}{tenant}"
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        data = await self._redis.get(self._job_key(job_id))
+        return orjson.loads(data) if data else None
+
+    async def _save(self, job: dict):
+        # Only finished jobs expire: a job still queued or running may wait
+        # longer than the TTL behind other tenants' work
+        ttl = self.ttl if job["status"] in FINISHED_STATUSES else None
+        await self._redis.set(self._job_key(job["id"]), orjson.dumps(job), ex=ttl)
+
+    async def update(self, job_id: str, **fields) -> Optional[dict]:
+        # Only the worker running a job updates it, so read-modify-write is safe
+        job = await self.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+            await self._save(job)
+        return job
+
+    async def _push(self, job: dict):
+        await self._save(job)
+        await self._push_script(
+            keys=[self._TENANTS, self._queue_key(job["tenant"]), self._READY],
+            args=[job["tenant"], job["id"]],
+        )
+
+    async def _next_job_id(self) -> Optional[str]:
+        # Wait for a wake-up, but look for work on timeout too: a worker that
+        # died after taking a wake-up must not leave its job waiting forever
+        await self._redis.blpop(self._READY, timeout=5)
+        job_id = await self._pop_script(keys=[self._TENANTS], args=[self._QUEUE_PREFIX])
+        return job_id.decode() if job_id else None
+
+    async def stop(self):
+        await super().stop()
+        await self._redis.aclose()
+
+
+_queue: Optional[JobQueue] = None
+
+
+def resolve_backend(server_workers: int) -> str:
+    """
+    The job queue backend for a server with `server_workers` processes.
+    "auto" is redis for several workers; "memory" is refused for several
+    workers, as each would only see the jobs it queued itself.
+    """
+    backend = settings.JOB_QUEUE_BACKEND
+    if backend == "auto":
+        return "redis" if server_workers > 1 else "memory"
+    if backend == "memory" and server_workers > 1:
+        raise ValueError(
+            f"JOB_QUEUE_BACKEND=memory cannot be used with {server_workers} worker processes; "
+            "use redis (or auto) and set REDIS_URL"
+        )
+    return backend
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get the process-wide job queue for JOB_QUEUE_BACKEND
+    """
+    global _queue
+    if _queue is None:
+        if resolve_backend(1) == "redis":
+            _queue = RedisJobQueue(settings.JOB_WORKERS, settings.JOB_RESULT_TTL_SECONDS, settings.REDIS_URL)
+        else:
+            _queue = InProcessJobQueue(settings.JOB_WORKERS, settings.JOB_RESULT_TTL_SECONDS)
+    return _queue
@@ -1,13 +1,128 @@
-from typing import Optional
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
 
+from app.core.cache import CacheInvalidation, TTLCache
 from app.core.config import settings
 from app.core.supabase import get_supabase_client
 from app.schemas.user import UserResponse
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+# UserResponse by user id, so authenticated requests skip the users table lookup.
+# Profile updates must go through user_cache_invalidation, which reaches the
+# caches of all worker processes.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+user_cache_invalidation = CacheInvalidation(user_cache, "users:invalidate")
+
+class JWKSCache:
+    """
+    Signing keys published at the Supabase JWKS endpoint, cached by key id.
+
+    Keys are refetched when the cache is older than `ttl` seconds or a token
+    carries an unknown key id, at most once every `min_interval` seconds.
+    """
+
+    def __init__(self, url: str, ttl: int, min_interval: int = 30):
+        self.url = url
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self._keys.get(kid) if kid else None
+
+    def needs_refresh(self, kid: Optional[str]) -> bool:
+        now = time.monotonic()
+        if now - self._attempted_at < self.min_interval:
+            return False
+        return now - self._fetched_at > self.ttl or kid not in self._keys
+
+    def refresh(self, kid: Optional[str] = None):
+        """Fetch the key set. Blocking; call it from a worker thread."""
+        with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if not self.needs_refresh(kid):
+                return
+            self._attempted_at = time.monotonic()
+            try:
+                response = httpx.get(self.url, headers={"apikey": settings.SUPABASE_KEY}, timeout=5.0)
+                response.raise_for_status()
+                keys = {key["kid"]: key for key in response.json().get("keys", []) if key.get("kid")}
+            except Exception as e:
+                # Keep serving the keys we have; tokens we cannot verify fall back to the auth server
+                logger.warning(f"Failed to refresh Supabase JWKS: {str(e)}")
+                return
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+jwks_cache = JWKSCache(
+    f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+    ttl=settings.SUPABASE_JWKS_CACHE_SECONDS,
+)
+
+def _local_signing_key(header: Dict[str, Any]) -> Optional[Any]:
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        return settings.SUPABASE_JWT_SECRET or None
+    if algorithm in ASYMMETRIC_ALGORITHMS:
+        return jwks_cache.get(header.get("kid"))
+    return None
+
+async def get_user_id_from_auth_server(token: str) -> str:
+    """
+    Verify an access token with the Supabase auth server.
+    Unlike local verification this also rejects tokens of signed-out sessions.
+    """
+    supabase = get_supabase_client()
+    # supabase-py is synchronous; keep the round trip off the event loop
+    user_response = await run_in_threadpool(supabase.auth.get_user, token)
+    if not user_response or not user_response.user:
+        raise JWTError("Invalid authentication credentials")
+    return str(user_response.user.id)
+
+async def verify_access_token(token: str) -> str:
+    """
+    Verify a Supabase access token (signature, exp, aud) and return the user id.
+
+    Verification happens locally with SUPABASE_JWT_SECRET or the cached JWKS.
+    Only when no signing key is available does it fall back to the auth server.
+    Raises JWTError for invalid tokens.
+    """
+    header = jwt.get_unverified_header(token)
+    key = _local_signing_key(header)
+    if header.get("alg") in ASYMMETRIC_ALGORITHMS and jwks_cache.needs_refresh(header.get("kid")):
+        await run_in_threadpool(jwks_cache.refresh, header.get("kid"))
+        key = _local_signing_key(header)
+
+    if key is None:
+        return await get_user_id_from_auth_server(token)
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[header["alg"]],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        # The anon and service role keys are signed with the same secret but
+        # carry no aud or sub claim, so both must be present
+        options={"require_aud": True, "require_exp": True, "require_sub": True},
+    )
+    return claims["sub"]
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme)
 ) -> UserResponse:
@@ -21,21 +136,23 @@ async def get_current_user(
     )
 
     try:
-        # Verify JWT with Supabase
-        supabase = get_supabase_client()
-        user_response = supabase.auth.get_user(token)
-        user = user_response.user
-        
-        if not user:
-            raise credentials_exception
-            
+        user_id = await verify_access_token(token)
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
         # Get user from our users table
-        response = supabase.table('users').select('*').eq('id', user.id).single().execute()
+        supabase = get_supabase_client()
+        response = await run_in_threadpool(
+            supabase.table('users').select('*').eq('id', user_id).single().execute
+        )
         if not response.data:
             raise credentials_exception
-            
-        return UserResponse(**response.data)
-        
+
+        user = UserResponse(**response.data)
+        user_cache.set(user_id, user)
+        return user
+
     except Exception as e:
         raise credentials_exception
 
@@ -1,6 +1,14 @@
-from supabase import create_client, Client
+import threading
+from typing import Dict, Optional
+
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 
+# Process-wide clients, created once and reused so every request shares the
+# same HTTP connection pools instead of building new sessions per call.
+_clients: Dict[str, Client] = {}
+_clients_lock = threading.Lock()
+
 def validate_supabase_config():
     """
     Validate Supabase configuration
@@ -14,51 +22,90 @@ def validate_supabase_config():
     if len(settings.SUPABASE_KEY) < 20:  # Basic validation for key format
         raise ValueError("Invalid Supabase anon key format")
 
-def get_supabase_client() -> Client:
+def create_supabase_client(key: Optional[str] = None) -> Client:
     """
-    Get a configured Supabase client.
-    For admin operations, use service_role_key instead of anon key.
+    Create a new, unshared Supabase client.
+
+    Use this for auth flows that store a session on the client (sign in, sign up,
+    refresh, sign out). On a shared client the session would switch the
+    Authorization header for every other request in the process.
     """
     validate_supabase_config()
     try:
         return create_client(
             settings.SUPABASE_URL,
-            settings.SUPABASE_KEY,
+            key or settings.SUPABASE_KEY,
         )
     except Exception as e:
         raise ValueError(f"Failed to create Supabase client: {str(e)}")
 
+def _get_shared_client(name: str, key: str) -> Client:
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = create_client(
+                settings.SUPABASE_URL,
+                key,
+                # Shared clients never hold a user session
+                options=ClientOptions(auto_refresh_token=False, persist_session=False),
+            )
+            _clients[name] = client
+        return client
+
+def get_supabase_client() -> Client:
+    """
+    Get the shared Supabase client (anon key).
+    For admin operations, use get_supabase_admin_client instead.
+    Never call session-storing auth methods on it; see create_supabase_client.
+    """
+    client = _clients.get("anon")
+    if client is not None:
+        return client
+
+    validate_supabase_config()
+    try:
+        return _get_shared_client("anon", settings.SUPABASE_KEY)
+    except Exception as e:
+        raise ValueError(f"Failed to create Supabase client: {str(e)}")
+
 def get_supabase_admin_client() -> Client:
     """
-    Get a Supabase client with admin privileges using service role key.
+    Get the shared Supabase client with admin privileges (service role key).
     Only use this for admin operations that require elevated privileges.
     """
+    client = _clients.get("admin")
+    if client is not None:
+        return client
+
     validate_supabase_config()
     if not settings.SUPABASE_SERVICE_ROLE_KEY:
         raise ValueError("Missing Supabase service role key configuration")
     if len(settings.SUPABASE_SERVICE_ROLE_KEY) < 20:
         raise ValueError("Invalid Supabase service role key format")
-    
+
     try:
-        return create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY,
-        )
+        return _get_shared_client("admin", settings.SUPABASE_SERVICE_ROLE_KEY)
     except Exception as e:
         raise ValueError(f"Failed to create Supabase admin client: {str(e)}")
 
-# Initialize client lazily to allow configuration to be loaded first
+# Default client, kept for backwards compatibility
 supabase = None
 
 def initialize_supabase():
     """
-    Initialize the default Supabase client.
-    Call this after all configurations are loaded.
+    Create the shared Supabase clients.
+    Call this after all configurations are loaded, e.g. at application startup.
     """
     global supabase
     try:
         if supabase is None:
             supabase = get_supabase_client()
+            if settings.SUPABASE_SERVICE_ROLE_KEY:
+                get_supabase_admin_client()
         return supabase
     except Exception as e:
-        raise ValueError(f"Failed to initialize Supabase: {str(e)}") 
\ No newline at end of file
+        raise ValueError(f"Failed to initialize Supabase: {str(e)}")
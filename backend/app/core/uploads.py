@@ -0,0 +1,168 @@
+"""
+Bounded-memory handling of file uploads.
+
+UploadSizeLimitMiddleware rejects oversized upload requests with 413 before
+the multipart body is parsed, or as soon as a body without Content-Length
+exceeds the limit. spool_upload then copies the upload to a temporary file in
+fixed-size chunks while hashing it and checking its format, so memory use per
+upload does not grow with the file size.
+"""
+import codecs
+import hashlib
+import os
+import tempfile
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import ORJSONResponse
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the supported spreadsheet containers
+_XLSX_MAGIC = b"PK\x03\x04"  # Office Open XML is a zip archive
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # OLE2 compound document
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "xls": "application/vnd.ms-excel",
+}
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is too large, the limit is {max_bytes // (1024 * 1024)} MB",
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Caps the request body of POST requests to paths ending in one of `path_suffixes`
+    """
+    def __init__(self, app, max_bytes: int, path_suffixes: Iterable[str] = ("/upload",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_suffixes = tuple(path_suffixes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].endswith(self.path_suffixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Multipart overhead is small, so compare the whole body with the file limit
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            error = _too_large(self.max_bytes)
+            response = ORJSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised while FastAPI reads the form, which turns it into the response
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """
+    Detect the format from the first bytes of a file: "xlsx", "xls", "csv" or None
+    """
+    if head.startswith(_XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(_XLS_MAGIC):
+        return "xls"
+    if b"\x00" not in head:
+        return "csv"
+    return None
+
+
+class SpooledUpload:
+    """
+    An upload copied to a temporary file, with its size, SHA-256 and detected format
+    """
+    def __init__(self, path: str, size: int, sha256: str, file_type: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.file_type = file_type
+
+    def read_text(self) -> str:
+        with open(self.path, "r", encoding="utf-8-sig") as f:
+            return f.read()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_bytes: int,
+    allowed_types: Iterable[str] = CONTENT_TYPES,
+    directory: Optional[str] = None,
+) -> SpooledUpload:
+    """
+    Copy an upload to a temporary file in `directory` chunk by chunk.
+
+    Raises 413 as soon as the size limit is exceeded and 400 when the content
+    is not one of `allowed_types` or does not match the file extension.
+    The caller owns the returned file and must call cleanup() when done.
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower().lstrip(".")
+    digest = hashlib.sha256()
+    # CSV must be UTF-8; validate incrementally instead of decoding the whole file
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    file_type = None
+    size = 0
+
+    spool = tempfile.NamedTemporaryFile(dir=directory, suffix=f".{extension}", delete=False)
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+
+                if file_type is None:
+                    file_type = sniff_file_type(chunk)
+                    is_excel = file_type in ("xlsx", "xls") and extension in ("xlsx", "xls")
+                    if file_type not in allowed_types or (file_type != extension and not is_excel):
+                        raise HTTPException(status_code=400, detail="File content does not match its extension")
+
+                if file_type == "csv":
+                    try:
+                        decoder.decode(chunk)
+                    except UnicodeDecodeError:
+                        raise HTTPException(status_code=400, detail="CSV files must be UTF-8 encoded")
+
+                digest.update(chunk)
+                spool.write(chunk)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+        if file_type == "csv":
+            try:
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                raise HTTPException(status_code=400, detail="CSV files must be UTF-8 encoded")
+    except BaseException:
+        os.remove(spool.name)
+        raise
+
+    return SpooledUpload(spool.name, size, digest.hexdigest(), file_type)
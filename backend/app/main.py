@@ -1,23 +1,51 @@
 import os
+from contextlib import asynccontextmanager
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.core.database import close_pool, init_pool
+from app.core.health import readiness_checker
+from app.core.jobs import get_job_queue
+from app.core.security import user_cache_invalidation
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.services.spreadsheet_service import shutdown_pool as shutdown_spreadsheet_pool
 from app.core.supabase import initialize_supabase
 
-# Initialize Supabase client
-initialize_supabase()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configuration is checked and clients are created here rather than at
+    # import time, so importing the app (workers, tests, tooling) stays cheap
+    settings.validate_supabase_config()
+    initialize_supabase()
+    # asyncpg pool for hot reads, only created when DATABASE_READ_BACKEND=asyncpg
+    await init_pool()
+    # Background job workers (BOM standardization)
+    await get_job_queue().start()
+    # Workers share Redis when they share the job queue; profile updates are
+    # then invalidated in every worker's user cache through it
+    await user_cache_invalidation.start(settings.REDIS_URL if settings.JOB_QUEUE_BACKEND == "redis" else None)
+    yield
+    await user_cache_invalidation.stop()
+    await get_job_queue().stop()
+    await close_pool()
+    # Spreadsheet parser processes, started on the first Excel upload
+    shutdown_spreadsheet_pool()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson is considerably faster than the stdlib encoder on large workflow graphs
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Set up CORS
@@ -29,6 +57,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before their body is parsed. The allowance
+# covers the multipart framing around the file.
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.BOM_UPLOAD_MAX_MB * 1024 * 1024 + 64 * 1024,
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.BATCH_INGEST_MAX_TOTAL_MB * 1024 * 1024 + 64 * 1024,
+    path_suffixes=("/batch-ingest",),
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.WORKFLOW_IMPORT_MAX_MB * 1024 * 1024 + 64 * 1024,
+    path_suffixes=("/workflows/import",),
+)
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -44,26 +89,25 @@ def root():
 
 
 @app.get("/health")
-async def health_check():
+@app.get("/health/live")
+async def liveness_check():
     """
-    Health check endpoint
+    Liveness check: the process is up and its event loop responds. Does no I/O,
+    so container and load balancer checks cost nothing upstream.
     """
-    try:
-        # Test Supabase connection
-        supabase = initialize_supabase()
-        return {
-            "status": "healthy",
-            "version": "1.0.0",
-            "supabase_url": settings.SUPABASE_URL,
-            "database_connected": True
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "version": "1.0.0",
-            "error": str(e),
-            "database_connected": False
-        }
+    return {"status": "healthy", "version": "1.0.0"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness check: concurrent, time-boxed probes of Supabase, the asyncpg
+    pool (if enabled) and the configured LLM providers, cached for a few seconds.
+    Returns 503 when a critical dependency is unavailable.
+    """
+    result = await readiness_checker.check()
+    status_code = 200 if result["status"] == "ready" else 503
+    return ORJSONResponse({"version": "1.0.0", **result}, status_code=status_code)
 
 
 @app.get("/api-test")
@@ -78,4 +122,6 @@ async def api_test():
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
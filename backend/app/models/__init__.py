@@ -1,4 +1,4 @@
-from .bom import BOMFile
+from .bom import BOMFile, BOMRow
 from .product import Product
 from .user import User
 from .vendor_task import VendorTask
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, ForeignKey, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
 from app.models.base import Base, TimestampMixin, UUIDMixin
@@ -7,13 +7,44 @@ from app.models.base import Base, TimestampMixin, UUIDMixin
 
 class BOMFile(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "bom_files"
+    __table_args__ = (
+        Index("ix_bom_files_user_id_updated_at", "user_id", text("updated_at DESC")),
+        Index("ix_bom_files_user_id_content_hash", "user_id", "content_hash"),
+    )
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     content = Column(Text, nullable=False)
     standardized_content = Column(Text)
+    # content_hash the standardized content was produced from
+    standardized_content_hash = Column(String(64))
     file_type = Column(String, nullable=False)  # CSV, Excel
+    content_hash = Column(String(64))  # SHA-256 of the normalized content
+    # Latest background standardization: queued, running, succeeded, failed
+    standardization_status = Column(String)
+    standardization_job_id = Column(UUID(as_uuid=True))
+    standardization_progress = Column(JSONB)  # {"done": chunks, "total": chunks}
+    standardization_error = Column(Text)
+    # Last change of the status or progress; stale queued/running jobs are retried
+    standardization_updated_at = Column(DateTime(timezone=True))
 
     # Relationships
     user = relationship("User", back_populates="bom_files")
+
+
+class BOMRow(Base):
+    """A component of a standardized BOM, shared by a user's files with the same content"""
+    __tablename__ = "bom_rows"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    component_id = Column(String)
+    name = Column(String)
+    material = Column(String)
+    weight_g = Column(Float)
+    qty = Column(Float)
+    supplier = Column(String)
+    emission_factor = Column(Float)  # kgCO2e/kg
+    ai_note = Column(Text)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, String, Text
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -7,6 +7,13 @@ from app.models.base import Base, TimestampMixin, UUIDMixin
 
 class VendorTask(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "vendor_tasks"
+    __table_args__ = (
+        Index(
+            "ix_vendor_tasks_pending_created_at",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
 
     workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.id"), nullable=False)
     product_id = Column(String, nullable=False)  # Product node ID
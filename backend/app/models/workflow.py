@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Boolean, Column, ForeignKey, Float, String, Text
+from sqlalchemy import JSON, Boolean, Column, ForeignKey, Float, Index, Integer, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ from app.models.base import Base, TimestampMixin, UUIDMixin
 
 class Workflow(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "workflows"
+    __table_args__ = (
+        Index("ix_workflows_user_id_updated_at", "user_id", text("updated_at DESC")),
+    )
 
     name = Column(String, index=True, nullable=False)
     description = Column(Text)
@@ -13,6 +16,7 @@ class Workflow(Base, UUIDMixin, TimestampMixin):
     data = Column(JSON, nullable=False)  # Store workflow data as JSON
     is_public = Column(Boolean, default=False, nullable=False)
     total_carbon_footprint = Column(Float, default=0.0, nullable=False)
+    version = Column(Integer, default=1, nullable=False)  # Bumped on every update, exposed as ETag
 
     # Relationships
     user = relationship("User", back_populates="workflows")
@@ -23,8 +27,11 @@ class Workflow(Base, UUIDMixin, TimestampMixin):
 
 class WorkflowNode(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "workflow_nodes"
+    __table_args__ = (
+        Index("ix_workflow_nodes_workflow_id_node_id", "workflow_id", "node_id", unique=True),
+    )
 
-    node_id = Column(String, index=True, nullable=False)  # Frontend-generated node ID
+    node_id = Column(String, nullable=False)  # Frontend-generated node ID
     workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.id"), nullable=False)
     node_type = Column(String, nullable=False)  # Node type (product, manufacturing, distribution, usage, disposal)
     label = Column(String, nullable=False)
@@ -38,8 +45,11 @@ class WorkflowNode(Base, UUIDMixin, TimestampMixin):
 
 class WorkflowEdge(Base, UUIDMixin, TimestampMixin):
     __tablename__ = "workflow_edges"
+    __table_args__ = (
+        Index("ix_workflow_edges_workflow_id_edge_id", "workflow_id", "edge_id", unique=True),
+    )
 
-    edge_id = Column(String, index=True, nullable=False)  # Frontend-generated edge ID
+    edge_id = Column(String, nullable=False)  # Frontend-generated edge ID
     workflow_id = Column(UUID(as_uuid=True), ForeignKey("workflows.id"), nullable=False)
     source = Column(String, nullable=False)  # Source node ID
     target = Column(String, nullable=False)  # Target node ID
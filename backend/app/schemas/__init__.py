@@ -3,4 +3,6 @@ from .user import User, UserCreate, UserUpdate
 from .product import Product, ProductCreate, ProductUpdate
 from .workflow import Workflow, WorkflowCreate, WorkflowUpdate
 from .vendor_task import VendorTask, VendorTaskCreate, VendorTaskUpdate, VendorTaskSubmit
-from .bom import BOMFile, BOMFileCreate
+from .bom import BOMFile, BOMFileCreate, BOMRow, BOMSummary
+from .job import Job, JobProgress
+from .document import StageDocument, StageDocumentBatch
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict
 
@@ -21,5 +21,52 @@ class BOMFileCreate(BOMFileBase):
 class BOMFile(BOMFileBase):
     id: UUID
     user_id: UUID
+    content_hash: Optional[str] = None
+    standardized_content_hash: Optional[str] = None
+    standardization_status: Optional[str] = None
+    standardization_job_id: Optional[UUID] = None
+    standardization_progress: Optional[Dict[str, int]] = None
+    standardization_error: Optional[str] = None
+    standardization_updated_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+
+class BOMStandardizationStatus(BaseModel):
+    id: UUID
+    standardization_status: Optional[str] = None
+    standardization_job_id: Optional[UUID] = None
+    standardization_progress: Optional[Dict[str, int]] = None
+    standardization_error: Optional[str] = None
+    standardization_updated_at: Optional[datetime] = None
+
+
+class BOMRow(BaseModel):
+    position: int
+    component_id: Optional[str] = None
+    name: Optional[str] = None
+    material: Optional[str] = None
+    weight_g: Optional[float] = None
+    qty: Optional[float] = None
+    supplier: Optional[str] = None
+    emission_factor: Optional[float] = None
+    ai_note: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BOMMaterialSummary(BaseModel):
+    material: Optional[str] = None
+    row_count: int
+    total_weight_g: float
+    total_emissions_kgco2e: float
+
+
+class BOMSummary(BaseModel):
+    row_count: int
+    total_weight_g: float
+    total_emissions_kgco2e: float
+    rows_missing_weight: int
+    rows_missing_factor: int
+    rows_unparsed: int = 0
+    by_material: List[BOMMaterialSummary]
@@ -0,0 +1,14 @@
+from typing import List, Literal
+from pydantic import BaseModel
+
+# Lifecycle stages a document can be standardized for (document_service.DOCUMENT_KINDS)
+Stage = Literal["bom", "manufacturing", "distribution", "usage", "disposal"]
+
+
+class StageDocument(BaseModel):
+    stage: Stage
+    content: str
+
+
+class StageDocumentBatch(BaseModel):
+    documents: List[StageDocument]
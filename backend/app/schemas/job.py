@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+
+class JobProgress(BaseModel):
+    done: int = 0
+    total: int = 0
+
+
+class Job(BaseModel):
+    id: UUID
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    progress: JobProgress
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -25,6 +25,10 @@ class WorkflowUpdate(WorkflowBase):
     data: Optional[Dict] = None
 
 
+class WorkflowClone(BaseModel):
+    name: Optional[str] = None
+
+
 class WorkflowNodeBase(BaseModel):
     node_id: str
     node_type: str
@@ -109,6 +113,7 @@ class Workflow(WorkflowBase):
     user_id: Union[UUID, str]
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1
     nodes: List[WorkflowNode] = []
     edges: List[WorkflowEdge] = []
 
@@ -0,0 +1,100 @@
+"""
+Production entry point: gunicorn supervising uvicorn workers.
+
+    python -m app.server
+
+For local development keep using `uvicorn app.main:app --reload`.
+"""
+import os
+import warnings
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.config import settings
+from app.core.jobs import resolve_backend
+
+with warnings.catch_warnings():
+    # uvicorn.workers is deprecated in favour of the uvicorn-worker package but
+    # still ships with the pinned uvicorn
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from uvicorn.workers import UvicornWorker
+
+
+# Time kept after the request drain for cancelling requests and lifespan shutdown
+SHUTDOWN_MARGIN_SECONDS = 5
+
+
+class ESGUvicornWorker(UvicornWorker):
+    """
+    uvicorn worker that drains in-flight requests on shutdown
+    """
+    # "auto" picks uvloop and httptools when installed (see requirements.txt)
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # On SIGTERM uvicorn stops accepting connections and waits this long
+        # for running requests (LLM calls) before cancelling them. It must end
+        # before gunicorn kills the worker at graceful_timeout, leaving time to
+        # cancel the requests and run the lifespan shutdown.
+        self.config.timeout_graceful_shutdown = max(
+            self.cfg.graceful_timeout - SHUTDOWN_MARGIN_SECONDS, 1
+        )
+
+
+def default_workers() -> int:
+    """
+    One async worker per CPU available to this process (respects cgroup/affinity limits)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    return max(cpus, 1)
+
+
+def get_options() -> dict:
+    """
+    gunicorn settings derived from the application settings
+    """
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.SERVER_WORKERS or default_workers(),
+        "worker_class": "app.server.ESGUvicornWorker",
+        # Import the application once in the master so workers share its
+        # modules and module-level constants copy-on-write. Network clients
+        # are created per worker in the lifespan handler, after the fork.
+        "preload_app": True,
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        # Heartbeat timeout only; async workers keep notifying while requests run
+        "timeout": 60,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def main():
+    options = get_options()
+    # Workers fork from this process, so they all see the resolved backend
+    settings.JOB_QUEUE_BACKEND = resolve_backend(options["workers"])
+    Server(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,25 @@
+import asyncio
 import copy
+import json
 import logging
 import random
 import re
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
-import pandas as pd
 from fastapi import HTTPException
-import numpy as np
 
 from app.core.config import settings
+from app.services.bom_csv_service import STANDARD_HEADER
+from app.services.prompt_service import (
+    PromptTemplate,
+    batch_by_tokens,
+    count_message_tokens,
+    count_tokens,
+    register_template,
+    usage as prompt_usage,
+)
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +45,17 @@ OPENAI_MODEL = "gpt-3.5-turbo"  # 修正为可用的OpenAI模型
 DEEPSEEK_MODEL = "deepseek-chat"
 
 
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _llm_slots() -> asyncio.Semaphore:
+    """本进程共享的LLM并发限制（在事件循环中首次使用时创建）"""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _llm_semaphore
+
+
 # 根据当前API服务获取URL和模型
 def get_api_config():
     if API_SERVICE == "openai":
@@ -89,14 +109,21 @@ def get_mock_response(prompt: str = None) -> str:
     return random.choice(responses)
 
 
+class LLMUnavailableError(RuntimeError):
+    """LLM调用失败（未配置密钥、请求出错或响应不成功），且没有降级到模拟响应"""
+
+
 async def call_openai_api(
     messages: List[Dict[str, str]],
     model: str = None,
     temperature: float = 0.7,
     max_tokens: int = 2000,
+    fallback: bool = True,
 ) -> Dict[str, Any]:
     """
-    调用AI API处理请求
+    调用AI API处理请求。
+    调用失败时默认降级为模拟响应；fallback=False 时抛出 LLMUnavailableError，
+    用于结果会被保存的调用，避免把模拟数据当作真实结果
     """
     # 根据配置获取API信息
     api_url, default_model, api_key = get_api_config()
@@ -143,6 +170,8 @@ async def call_openai_api(
     # 记录API密钥是否存在
     if not api_key:
         logger.error(f"{API_SERVICE} API密钥未设置")
+        if not fallback:
+            raise LLMUnavailableError(f"{API_SERVICE} API密钥未设置")
         if AUTO_FALLBACK:
             logger.info("由于API密钥未设置，自动降级到模拟模式")
             return get_mock_response_as_json(messages, model)
@@ -167,9 +196,11 @@ async def call_openai_api(
     try:
         async with httpx.AsyncClient() as client:
             logger.info(f"开始调用DeepSeek API - 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            response = await client.post(
-                url, json=payload, headers=headers, timeout=120.0
-            )  # 增加到120秒
+            # 并发的LLM请求数受 LLM_MAX_CONCURRENCY 限制，多余的请求在此排队
+            async with _llm_slots():
+                response = await client.post(
+                    url, json=payload, headers=headers, timeout=120.0
+                )  # 增加到120秒
             logger.info(f"DeepSeek API调用完成 - 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
             # 记录响应状态
@@ -179,6 +210,8 @@ async def call_openai_api(
             if not response.is_success:
                 error_detail = response.text
                 logger.error(f"API调用失败: {response.status_code}, 详情: {error_detail}")
+                if not fallback:
+                    raise LLMUnavailableError(f"API调用失败: {response.status_code}")
                 logger.info("由于API调用失败，自动降级到模拟模式")
 
                 # 使用模拟响应
@@ -215,18 +248,26 @@ async def call_openai_api(
             json_response = response.json()
             logger.info("API调用成功")
             return json_response
+    except LLMUnavailableError:
+        raise
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP错误: {e}")
+        if not fallback:
+            raise LLMUnavailableError(f"HTTP错误: {e}") from e
         # 发生HTTP错误时自动降级到模拟模式
         logger.info("由于HTTP错误，自动降级到模拟模式")
         return get_mock_response_as_json(messages, model)
     except httpx.RequestError as e:
         logger.error(f"网络请求错误: {e}")
+        if not fallback:
+            raise LLMUnavailableError(f"网络请求错误: {e}") from e
         # 发生请求错误时自动降级到模拟模式
         logger.info("由于网络请求错误，自动降级到模拟模式")
         return get_mock_response_as_json(messages, model)
     except Exception as e:
         logger.error(f"其他错误: {e}")
+        if not fallback:
+            raise LLMUnavailableError(f"其他错误: {e}") from e
         # 发生任何其他错误时自动降级到模拟模式
         logger.info("由于未知错误，自动降级到模拟模式")
         return get_mock_response_as_json(messages, model)
@@ -263,27 +304,66 @@ def get_mock_response_as_json(
     }
 
 
-async def standardize_bom(original_content: str) -> str:
+async def complete_prompt(template: PromptTemplate, fallback: bool = True, **values: str) -> str:
     """
-    使用DeepSeek API标准化BOM内容
+    用注册的提示词模板调用LLM并返回回复内容，记录本次调用的prompt/completion token数。
+    fallback=False 时调用失败抛出 LLMUnavailableError，而不是返回模拟响应
     """
-    # 检查输入数据大小
-    content_size = len(original_content)
-    logger.info(f"开始BOM标准化处理 - 输入数据大小: {content_size} 字节")
+    messages = template.render(**values)
+    estimated_tokens = count_message_tokens(messages)
+    response = await call_openai_api(
+        messages, temperature=template.temperature, max_tokens=template.max_tokens, fallback=fallback
+    )
 
-    # 如果数据过大，可能需要分段处理
-    if content_size > 10000:  # 10KB
-        logger.warning(f"BOM数据较大 ({content_size} 字节)，处理可能需要较长时间")
+    tokens = response.get("usage") or {}
+    prompt_tokens = tokens.get("prompt_tokens", 0)
+    completion_tokens = tokens.get("completion_tokens", 0)
+    prompt_usage.record(template.name, prompt_tokens, completion_tokens, estimated_tokens)
+    logger.info(
+        f"{template.name}: prompt_tokens={prompt_tokens}（估算 {estimated_tokens}）, "
+        f"completion_tokens={completion_tokens}"
+    )
 
-    # 更新标准表头，包含重量(g)列和AI估算列
-    standard_bom_header = "组件ID,组件名称,材料类型,重量(g),数量,供应商,碳排放因子(kgCO2e/kg),AI估算"
+    choice = response["choices"][0]
+    if choice.get("finish_reason") == "length":
+        logger.warning(f"{template.name}: 回复达到 max_tokens={template.max_tokens}，内容被截断")
+    return choice["message"]["content"].strip()
 
-    # 构建增强版的提示词
-    prompt = f"""
+
+# BOM标准化提示词
+BOM_STANDARDIZE_PROMPT = register_template(
+    "bom_standardize",
+    system="""
+    你是一个专业的BOM规范化和材料科学专家，能够将不同格式的BOM数据转换为标准格式，并能根据材料名称推算其单位重量。
+
+    你的主要任务是：
+    1. 识别原始数据中已有的信息并映射到标准格式
+    2. 确保输出格式包含"重量(g)"列和"AI估算"列
+    3. 如果原始数据中有重量信息，填入"重量(g)"列
+    4. 如果原始数据中没有重量信息但有数量信息：
+       - 根据材料名称和类型推算单位重量(g/单位)
+       - 计算总重量 = 单位重量 × 数量
+       - 将总重量填入"重量(g)"列
+       - 在"AI估算"列中注明单位重量、数量、总重量和估算依据
+    5. 保留原始数据的完整性，不添加不存在的信息
+    6. 对于原始数据中不存在的字段，在输出中保留为空
+    7. 不要推测或估算碳排放因子等其他数值
+
+    在推算材料重量时，请基于以下原则：
+    1. 使用材料科学知识和工业标准
+    2. 考虑材料的典型密度和常见规格
+    3. 提供合理的单位重量估算
+    4. 计算总重量 = 单位重量 × 数量
+    5. 简要说明估算依据
+    6. 请务必保证重量（g）, 每行都有值, 且推算正确
+
+    所有输出必须是结构化的CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+    """,
+    user=f"""
     你是一个BOM（物料清单）规范化专家。我将提供一个原始BOM文件内容，请帮我将其转换为标准格式。
 
     标准格式要求：
-    1. 包含以下字段：{standard_bom_header}
+    1. 包含以下字段：{",".join(STANDARD_HEADER)}
     2. 通过语义理解识别原始数据中对应的信息
     3. 对于材料类型，仅当原始数据明确包含此信息时才填写，否则保留空值
     4. 原始数据中如果有重量信息，请填入"重量(g)"列
@@ -313,59 +393,41 @@ async def standardize_bom(original_content: str) -> str:
     - 特别是碳排放因子等计算值，除非原始数据中明确包含，否则不应自行填充
 
     原始BOM内容：
-    {original_content}
+    $content
 
     请输出标准化后的BOM内容，必须是CSV格式，包含表头和所有字段。对于原始数据中没有的字段，请保留为空：
-    """
+    """,
+    temperature=0.2,
+    max_tokens=4000,
+    # 输出比输入多出标准列和AI估算说明
+    output_ratio=2.5,
+)
 
-    # 增强系统提示
-    system_prompt = """
-    你是一个专业的BOM规范化和材料科学专家，能够将不同格式的BOM数据转换为标准格式，并能根据材料名称推算其单位重量。
 
-    你的主要任务是：
-    1. 识别原始数据中已有的信息并映射到标准格式
-    2. 确保输出格式包含"重量(g)"列和"AI估算"列
-    3. 如果原始数据中有重量信息，填入"重量(g)"列
-    4. 如果原始数据中没有重量信息但有数量信息：
-       - 根据材料名称和类型推算单位重量(g/单位)
-       - 计算总重量 = 单位重量 × 数量
-       - 将总重量填入"重量(g)"列
-       - 在"AI估算"列中注明单位重量、数量、总重量和估算依据
-    5. 保留原始数据的完整性，不添加不存在的信息
-    6. 对于原始数据中不存在的字段，在输出中保留为空
-    7. 不要推测或估算碳排放因子等其他数值
-
-    在推算材料重量时，请基于以下原则：
-    1. 使用材料科学知识和工业标准
-    2. 考虑材料的典型密度和常见规格
-    3. 提供合理的单位重量估算
-    4. 计算总重量 = 单位重量 × 数量
-    5. 简要说明估算依据
-    6. 请务必保证重量（g）, 每行都有值, 且推算正确
-
-    所有输出必须是结构化的CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+async def standardize_bom(original_content: str, fallback: bool = True) -> str:
+    """
+    使用DeepSeek API标准化BOM内容。
+    调用失败时返回模拟数据；fallback=False 时抛出异常（结果要保存时使用）
     """
+    # 检查输入数据大小
+    content_tokens = count_tokens(original_content)
+    logger.info(f"开始BOM标准化处理 - 输入数据大小: {len(original_content)} 字节, 约 {content_tokens} tokens")
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": prompt},
-    ]
+    # 超出单次请求预算的内容应先经 bom_service.split_bom_content 分块
+    if content_tokens > BOM_STANDARDIZE_PROMPT.input_budget():
+        logger.warning(
+            f"BOM数据超出单次请求的token预算 ({BOM_STANDARDIZE_PROMPT.input_budget()})，输出可能被截断"
+        )
 
     try:
         start_time = time.time()
         logger.info(f"开始处理BOM标准化和重量推算 - 开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # 获取API配置
-        api_url, model, api_key = get_api_config()
         logger.info(f"使用API服务: {API_SERVICE}")
-        logger.info(f"使用API密钥: {api_key[:10]}...")
-        logger.info(f"发送请求到API: {api_url}")
-        logger.info(f"请求模型: {model}")
-        logger.info(f"消息数量: {len(messages)}")
 
         # 调用API获取响应
-        response = await call_openai_api(messages, temperature=0.2, max_tokens=4000)
-        standardized_bom = response["choices"][0]["message"]["content"].strip()
+        standardized_bom = await complete_prompt(
+            BOM_STANDARDIZE_PROMPT, fallback=fallback, content=original_content
+        )
 
         end_time = time.time()
         logger.info(f"BOM标准化和重量推算成功 - 完成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -375,8 +437,46 @@ async def standardize_bom(original_content: str) -> str:
 
     except Exception as e:
         logger.error(f"BOM标准化和重量推算失败: {e}")
+        if not fallback:
+            raise
         # 返回模拟数据作为回退
-        return get_mock_response(prompt)
+        return get_mock_response(BOM_STANDARDIZE_PROMPT.render_user(content=original_content))
+
+
+# 修复无法解析的BOM行的提示词
+BOM_REPAIR_PROMPT = register_template(
+    "bom_repair",
+    system="你是一个CSV数据修复助手，只输出符合要求的CSV数据。",
+    user=f"""
+    以下是BOM标准化结果中格式有误的 $count 行。请按标准表头修正每一行：
+    {",".join(STANDARD_HEADER)}
+
+    要求：
+    1. 每个输入行输出一行，顺序不变，不要合并、拆分或新增行
+    2. 列数必须与表头一致；包含逗号的字段用双引号括起来
+    3. 重量(g)、数量、碳排放因子列只填写数字，没有数值时留空
+    4. 不要改动原有数据的含义，不要补充原始行中不存在的信息
+
+    格式有误的行：
+    $rows
+
+    只输出CSV（包含表头），不要添加任何解释：
+    """,
+    temperature=0.0,
+    max_tokens=2000,
+)
+
+
+async def repair_bom_rows(failed_rows: List[Tuple[str, str]]) -> str:
+    """
+    重新生成标准化输出中无法解析的BOM行，只发送这些行。
+    failed_rows 为 (原始行, 错误原因)，返回带标准表头的CSV。调用失败时抛出异常，不返回模拟数据
+    """
+    rows = "\n".join(
+        f"{i}. {line}  （问题：{reason}）" for i, (line, reason) in enumerate(failed_rows, start=1)
+    )
+    logger.info(f"重新生成 {len(failed_rows)} 行无法解析的BOM数据")
+    return await complete_prompt(BOM_REPAIR_PROMPT, fallback=False, count=str(len(failed_rows)), rows=rows)
 
 
 async def calculate_product_carbon_footprint(product_data: Dict[str, Any]) -> float:
@@ -423,6 +523,47 @@ async def calculate_product_carbon_footprint(product_data: Dict[str, Any]) -> fl
         return random.uniform(10.0, 30.0)
 
 
+# 碳排放因子匹配提示词，$products 为每行一个产品的列表
+CARBON_FACTOR_PROMPT = register_template(
+    "carbon_factors",
+    system="你是一位材料科学和碳足迹专家，熟悉各种材料、产品和生产工艺的碳排放因子。请帮助用户确定产品在不同生命週期阶段的碳排放因子。",
+    user="""
+    请为以下$stage阶段的产品提供准确的碳排放因子(carbon factor)数据。
+
+    对每个产品，请提供：
+    1. 碳排放因子(单位: kg CO2e/kg)
+    2. 碳排放因子的数据来源或依据
+
+    产品列表:
+    $products
+
+    请以JSON格式回答，格式如下：
+    ```json
+    [
+      {
+        "id": "产品ID",
+        "carbonFactor": 数值,
+        "carbonFactorUnit": "kg CO2e/kg",
+        "dataSource": "数据来源描述"
+      },
+      ...
+    ]
+    ```
+
+    请确保每个产品都有确切的碳排放因子数值，以及可信的数据来源。如果无法确定精确值，请提供合理的估计值并注明。
+    只返回JSON格式的结果，不要添加其他解释。
+    """,
+    temperature=0.2,  # 降低温度以获得更确定的回答
+    max_tokens=4000,
+    # 每个产品的JSON结果比产品行长
+    output_ratio=3.0,
+)
+
+
+def _carbon_factor_product_line(number: int, node: Dict[str, Any]) -> str:
+    return f"产品 {number}: ID={node.get('id')}, 名称={node.get('productName', '')}, 材料={node.get('material', '')}"
+
+
 async def match_carbon_factors(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     为产品节点匹配碳排放因子，使用DeepSeek API
@@ -463,182 +604,117 @@ async def match_carbon_factors(nodes: List[Dict[str, Any]]) -> List[Dict[str, An
         # 添加索引以便之后能找回对应节点
         lifecycle_groups[stage].append((idx, node))
 
-    # 为每个生命週期阶段批量处理节点
-    for stage, node_group in lifecycle_groups.items():
-        if not node_group:
-            continue
-
-        # 准备向DeepSeek发送的产品列表和相关信息
-        products_info = []
-        for idx, node in node_group:
-            product_info = {
-                "id": node.get("id"),
-                "name": node.get("productName", ""),
-                "material": node.get("material", ""),
-                "weight": node.get("weight", 0),
-                "stage": node.get("lifecycleStage", "原材料"),
-            }
-            products_info.append(product_info)
-
-        # 构建提示信息
-        system_message = {
-            "role": "system",
-            "content": "你是一位材料科学和碳足迹专家，熟悉各种材料、产品和生产工艺的碳排放因子。请帮助用户确定产品在不同生命週期阶段的碳排放因子。",
-        }
-
-        user_message_content = f"""
-        请为以下{stage}阶段的产品提供准确的碳排放因子(carbon factor)数据。
-
-        对每个产品，请提供：
-        1. 碳排放因子(单位: kg CO2e/kg)
-        2. 碳排放因子的数据来源或依据
-
-        产品列表:
-        """
-
-        # 添加产品信息到提示中
-        for i, (_, product) in enumerate(node_group):
-            user_message_content += f"""
-            产品 {i+1}:
-            - 名称: {product.get('productName', '')}
-            - 材料: {product.get('material', '')}
-            - 阶段: {product.get('lifecycleStage', '原材料')}
-            """
-
-        user_message_content += """
-        请以JSON格式回答，格式如下：
-        ```json
-        [
-          {
-            "id": "产品ID",
-            "carbonFactor": 数值,
-            "carbonFactorUnit": "kg CO2e/kg",
-            "dataSource": "数据来源描述"
-          },
-          ...
-        ]
-        ```
-
-        请确保每个产品都有确切的碳排放因子数值，以及可信的数据来源。如果无法确定精确值，请提供合理的估计值并注明。
-        只返回JSON格式的结果，不要添加其他解释。
-        """
+    # 节点较多的阶段分成多批，每批的提示词和回复都在token预算内
+    budget = CARBON_FACTOR_PROMPT.input_budget()
+    batches = [
+        (stage, node_group)
+        for stage, group in lifecycle_groups.items()
+        for node_group in batch_by_tokens(
+            group, lambda item: count_tokens(_carbon_factor_product_line(len(group), item[1])) + 1, budget
+        )
+    ]
 
-        user_message = {"role": "user", "content": user_message_content}
+    # 为每个生命週期阶段批量处理节点
+    for stage, node_group in batches:
+        products = "\n".join(
+            _carbon_factor_product_line(i, node) for i, (_, node) in enumerate(node_group, start=1)
+        )
 
         # 调用DeepSeek API
         try:
             logger.info(f"向DeepSeek API发送{len(node_group)}个{stage}阶段的产品信息")
-            response = await call_openai_api(
-                messages=[system_message, user_message],
-                temperature=0.2,  # 降低温度以获得更确定的回答
-                max_tokens=4000,  # 增加最大token数以处理多个产品
-            )
+            content = await complete_prompt(CARBON_FACTOR_PROMPT, stage=stage, products=products)
+
+            # 尝试找到JSON部分
+            json_match = re.search(r"```json\s*([\s\S]*?)\s*```", content)
+            json_str = json_match.group(1) if json_match else content
 
-            # 解析API返回的结果
-            if response and "choices" in response and len(response["choices"]) > 0:
-                content = response["choices"][0]["message"]["content"]
-
-                # 从回应中提取JSON部分
-                import json
-                import re
-
-                # 尝试找到JSON部分
-                json_match = re.search(r"```json\s*([\s\S]*?)\s*```", content)
-                json_str = json_match.group(1) if json_match else content
-
-                # 尝试解析JSON
-                try:
-                    results = json.loads(json_str)
-                    logger.info(f"成功解析DeepSeek API返回的JSON数据，包含{len(results)}个产品")
-
-                    # 更新节点数据
-                    for result in results:
-                        # 查找对应节点
-                        node_id = result.get("id")
-                        original_indices = [
-                            idx
-                            for idx, node in node_group
-                            if str(node.get("id")) == str(node_id)
-                        ]
-
-                        if original_indices:
-                            original_index = original_indices[0]
-
-                            # 更新产品碳排放因子
-                            updated_nodes[original_index]["carbonFactor"] = float(
-                                result.get("carbonFactor", 0)
-                            )
-                            updated_nodes[original_index][
-                                "carbonFactorUnit"
-                            ] = result.get("carbonFactorUnit", "kg CO2e/kg")
-                            updated_nodes[original_index][
-                                "dataSource"
-                            ] = f"AI生成 - DeepSeek ({result.get('dataSource', '专家估算')})"
-
-                            logger.info(
-                                f"节点 {node_id} 已更新碳因子为 {updated_nodes[original_index]['carbonFactor']} 来源: {updated_nodes[original_index]['dataSource']}"
-                            )
-                        else:
-                            # 尝试使用索引匹配
-                            for i, (idx, node) in enumerate(node_group):
-                                if i < len(results):
-                                    updated_nodes[idx]["carbonFactor"] = float(
-                                        results[i].get("carbonFactor", 0)
-                                    )
-                                    updated_nodes[idx]["carbonFactorUnit"] = results[
-                                        i
-                                    ].get("carbonFactorUnit", "kg CO2e/kg")
-                                    updated_nodes[idx][
-                                        "dataSource"
-                                    ] = f"AI生成 - DeepSeek ({results[i].get('dataSource', '专家估算')})"
-
-                                    logger.info(
-                                        f"节点 {node.get('id')} 已通过索引匹配更新碳因子为 {updated_nodes[idx]['carbonFactor']}"
-                                    )
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"解析DeepSeek API返回的JSON时出错: {str(e)}")
-                    # 如果JSON解析失败，尝试从文本中提取信息
-                    pattern = r"产品\s*\d+\s*[：:]\s*(\d+\.\d+)"
-                    matches = re.findall(pattern, content)
-
-                    if matches and len(matches) <= len(node_group):
-                        for i, (idx, _) in enumerate(node_group):
-                            if i < len(matches):
-                                try:
-                                    carbon_factor = float(matches[i])
-                                    updated_nodes[idx]["carbonFactor"] = carbon_factor
-                                    updated_nodes[idx][
-                                        "carbonFactorUnit"
-                                    ] = "kg CO2e/kg"
-                                    updated_nodes[idx][
-                                        "dataSource"
-                                    ] = "AI生成 - DeepSeek (文本提取)"
-                                    logger.info(
-                                        f"从文本中提取节点 {updated_nodes[idx].get('id')} 的碳因子: {carbon_factor}"
-                                    )
-                                except ValueError:
-                                    logger.error(f"将提取的值转换为浮点数时出错: {matches[i]}")
-                                    updated_nodes[idx]["carbonFactor"] = 0
-                                    updated_nodes[idx][
-                                        "carbonFactorUnit"
-                                    ] = "kg CO2e/kg"
-                                    updated_nodes[idx][
-                                        "dataSource"
-                                    ] = "需要人工介入 - API返回解析失败"
+            # 尝试解析JSON
+            try:
+                results = json.loads(json_str)
+                logger.info(f"成功解析DeepSeek API返回的JSON数据，包含{len(results)}个产品")
+
+                # 更新节点数据
+                for result in results:
+                    # 查找对应节点
+                    node_id = result.get("id")
+                    original_indices = [
+                        idx
+                        for idx, node in node_group
+                        if str(node.get("id")) == str(node_id)
+                    ]
+
+                    if original_indices:
+                        original_index = original_indices[0]
+
+                        # 更新产品碳排放因子
+                        updated_nodes[original_index]["carbonFactor"] = float(
+                            result.get("carbonFactor", 0)
+                        )
+                        updated_nodes[original_index][
+                            "carbonFactorUnit"
+                        ] = result.get("carbonFactorUnit", "kg CO2e/kg")
+                        updated_nodes[original_index][
+                            "dataSource"
+                        ] = f"AI生成 - DeepSeek ({result.get('dataSource', '专家估算')})"
+
+                        logger.info(
+                            f"节点 {node_id} 已更新碳因子为 {updated_nodes[original_index]['carbonFactor']} 来源: {updated_nodes[original_index]['dataSource']}"
+                        )
                     else:
-                        # 如果文本提取也失败，标记所有节点需要人工介入
-                        for idx, _ in node_group:
-                            updated_nodes[idx]["carbonFactor"] = 0
-                            updated_nodes[idx]["carbonFactorUnit"] = "kg CO2e/kg"
-                            updated_nodes[idx]["dataSource"] = "需要人工介入 - API返回解析失败"
-            else:
-                logger.error(f"DeepSeek API返回的响应格式不正确: {response}")
-                # 标记所有节点需要人工介入
-                for idx, _ in node_group:
-                    updated_nodes[idx]["carbonFactor"] = 0
-                    updated_nodes[idx]["carbonFactorUnit"] = "kg CO2e/kg"
-                    updated_nodes[idx]["dataSource"] = "需要人工介入 - API响应格式错误"
+                        # 尝试使用索引匹配
+                        for i, (idx, node) in enumerate(node_group):
+                            if i < len(results):
+                                updated_nodes[idx]["carbonFactor"] = float(
+                                    results[i].get("carbonFactor", 0)
+                                )
+                                updated_nodes[idx]["carbonFactorUnit"] = results[
+                                    i
+                                ].get("carbonFactorUnit", "kg CO2e/kg")
+                                updated_nodes[idx][
+                                    "dataSource"
+                                ] = f"AI生成 - DeepSeek ({results[i].get('dataSource', '专家估算')})"
+
+                                logger.info(
+                                    f"节点 {node.get('id')} 已通过索引匹配更新碳因子为 {updated_nodes[idx]['carbonFactor']}"
+                                )
+
+            except json.JSONDecodeError as e:
+                logger.error(f"解析DeepSeek API返回的JSON时出错: {str(e)}")
+                # 如果JSON解析失败，尝试从文本中提取信息
+                pattern = r"产品\s*\d+\s*[：:]\s*(\d+\.\d+)"
+                matches = re.findall(pattern, content)
+
+                if matches and len(matches) <= len(node_group):
+                    for i, (idx, _) in enumerate(node_group):
+                        if i < len(matches):
+                            try:
+                                carbon_factor = float(matches[i])
+                                updated_nodes[idx]["carbonFactor"] = carbon_factor
+                                updated_nodes[idx][
+                                    "carbonFactorUnit"
+                                ] = "kg CO2e/kg"
+                                updated_nodes[idx][
+                                    "dataSource"
+                                ] = "AI生成 - DeepSeek (文本提取)"
+                                logger.info(
+                                    f"从文本中提取节点 {updated_nodes[idx].get('id')} 的碳因子: {carbon_factor}"
+                                )
+                            except ValueError:
+                                logger.error(f"将提取的值转换为浮点数时出错: {matches[i]}")
+                                updated_nodes[idx]["carbonFactor"] = 0
+                                updated_nodes[idx][
+                                    "carbonFactorUnit"
+                                ] = "kg CO2e/kg"
+                                updated_nodes[idx][
+                                    "dataSource"
+                                ] = "需要人工介入 - API返回解析失败"
+                else:
+                    # 如果文本提取也失败，标记所有节点需要人工介入
+                    for idx, _ in node_group:
+                        updated_nodes[idx]["carbonFactor"] = 0
+                        updated_nodes[idx]["carbonFactorUnit"] = "kg CO2e/kg"
+                        updated_nodes[idx]["dataSource"] = "需要人工介入 - API返回解析失败"
 
         except Exception as e:
             logger.error(f"调用DeepSeek API时出错: {str(e)}")
@@ -651,6 +727,181 @@ async def match_carbon_factors(nodes: List[Dict[str, Any]]) -> List[Dict[str, An
     return updated_nodes
 
 
+def get_stage_name(stage: str) -> str:
+    """
+    获取生命週期阶段的中文名称
+    """
+    stage_names = {
+        "manufacturing": "生产制造",
+        "distribution": "分销存储",
+        "usage": "产品使用",
+        "disposal": "废弃处置",
+    }
+    return stage_names.get(stage, "未知阶段")
+
+
+# 生命周期各阶段的标准表头
+LIFECYCLE_STAGE_HEADERS = {
+    "manufacturing": "工序ID,工序名称,能源类型,能源消耗(kWh),工艺效率(%),废物产生量(kg),水资源消耗(L),回收材料使用比例(%),设备利用率(%)",
+    "distribution": "物流ID,运输物品, 运输方式, 重量(kg), 起点,终点,运输距离(km),车辆类型,燃料类型,燃油效率(km/L),装载因子(%),是否冷藏,包装材料,包装重量(kg),仓库能源消耗(kWh),存储时间(天)",
+    "usage": "使用ID,产品寿命(年),每次使用能源消耗(kWh),每次使用水资源消耗(L),消耗品,消耗品重量(kg),使用频率(次/年),维护频率(次/年),维修率(%),用户行为影响(1-10),效率降级率(%/年)",
+    "disposal": "处置ID,回收率(%),填埋比例(%),焚烧比例(%),堆肥比例(%),重复使用比例(%),有害废物含量(%),生物降解性(%),处置能源回收(kWh/kg),到处置设施的运输距离(km),处置方法",
+}
+
+# 生命周期各阶段的系统提示词
+LIFECYCLE_STAGE_SYSTEM_PROMPTS = {
+    "manufacturing": """
+你是一个专业的生产制造数据标准化专家。你的任务是将各种格式的生产数据转换为标准格式。
+
+你需要从原始数据中识别以下信息:
+1. 工序ID - 每个制造工序的唯一标识符
+2. 工序名称 - 制造工序的名称
+3. 能源类型 - 使用的能源类型(电力、天然气、煤等)
+4. 能源消耗(kWh) - 每个工序的能源消耗量
+5. 工艺效率(%) - 工艺效率百分比
+6. 废物产生量(kg) - 产生的废物重量
+7. 水资源消耗(L) - 使用的水资源量
+8. 回收材料使用比例(%) - 使用回收材料的百分比
+9. 设备利用率(%) - 设备的使用效率
+
+请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
+输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+""",
+    "distribution": """
+你是一个专业的物流与分销数据标准化专家。你的任务是将各种格式的物流数据转换为标准格式。
+
+你需要从原始数据中识别以下信息:
+1. 物流ID - 每个物流环节的唯一标识符
+2. 运输物品 - 运输的物品
+3. 运输方式 - 运输模式(公路、铁路、海运、空运)
+4. 重量(kg) - 运输物品的重量
+4. 起点 - 运输起始位置
+5. 终点 - 运输目的地
+6. 运输距离(km) - 运输距离
+7. 车辆类型 - 使用的车辆类型
+8. 燃料类型 - 使用的燃料类型
+9. 燃油效率(km/L) - 车辆的燃油效率
+10. 装载因子(%) - 车辆的装载比例
+11. 是否冷藏 - 是/否
+12. 包装材料 - 使用的包装材料
+13. 包装重量(kg) - 包装材料的重量
+14. 仓库能源消耗(kWh) - 仓储过程中的能源消耗
+15. 存储时间(天) - 产品的存储时间
+
+特别注意：
+- 如果原始数据只提供起点和终点，但没有运输距离，请保留为空，不要推算距离
+- 如果原始数据只提供运输距离，但没有起点和终点，请保留为空，不要推测位置
+
+请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
+输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+""",
+    "usage": """
+你是一个专业的产品使用阶段数据标准化专家。你的任务是将各种格式的产品使用数据转换为标准格式。
+
+你需要从原始数据中识别以下信息:
+1. 使用ID - 每个使用场景的唯一标识符
+2. 产品寿命(年) - 产品的使用寿命
+3. 每次使用能源消耗(kWh) - 每次使用产品消耗的能源
+4. 每次使用水资源消耗(L) - 每次使用产品消耗的水资源
+5. 消耗品 - 使用过程中需要的消耗品
+6. 消耗品重量(kg) - 消耗品的重量
+7. 使用频率(次/年) - 产品的使用频率
+8. 维护频率(次/年) - 产品需要维护的频率
+9. 维修率(%) - 产品需要维修的可能性
+10. 用户行为影响(1-10) - 用户行为对产品影响的程度
+11. 效率降级率(%/年) - 产品效率每年下降的比率
+
+请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
+输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+""",
+    "disposal": """
+你是一个专业的废弃处置数据标准化专家。你的任务是将各种格式的废弃处置数据转换为标准格式。
+
+你需要从原始数据中识别以下信息:
+1. 处置ID - 每个处置环节的唯一标识符
+2. 回收率(%) - 产品被回收的比例
+3. 填埋比例(%) - 产品被填埋的比例
+4. 焚烧比例(%) - 产品被焚烧的比例
+5. 堆肥比例(%) - 产品被堆肥的比例
+6. 重复使用比例(%) - 产品被重复使用的比例
+7. 有害废物含量(%) - 有害废物的含量
+8. 生物降解性(%) - 产品的生物降解性
+9. 处置能源回收(kWh/kg) - 处置过程中回收的能源
+10. 到处置设施的运输距离(km) - 运输到处置设施的距离
+11. 处置方法 - 使用的处置方法
+
+请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
+输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+""",
+}
+
+# 未知阶段使用的通用表头和系统提示词
+DEFAULT_STAGE_HEADER = "ID,名称,类型,数值,单位,备注"
+DEFAULT_STAGE_SYSTEM_PROMPT = """
+你是一个专业的数据标准化专家。你的任务是将各种格式的数据转换为标准格式。
+
+你需要从原始数据中识别以下信息:
+1. ID - 每个项目的唯一标识符
+2. 名称 - 项目名称
+3. 类型 - 项目类型
+4. 数值 - 相关数值
+5. 单位 - 数值的单位
+6. 备注 - 其他相关信息
+
+请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
+输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
+"""
+
+
+# 生命周期阶段文件标准化的用户提示词，{stage_name}和{header}在注册时填入
+_LIFECYCLE_USER_PROMPT = """
+我将提供一个与{stage_name}阶段相关的原始数据文件内容，请帮我将其转换为标准格式。
+
+标准格式要求：
+1. 包含以下字段：{header}
+2. 通过语义理解识别原始数据中对应的信息
+3. 严格保留原始数据中的所有值，不要自行估算或填充缺失数据
+4. 保持数据的完整性，不要遗漏任何项目
+5. 对于数值型字段，维持原始精度
+
+注意：
+- 对于原始数据中不存在的信息，请在输出中保留为空，不要生成或推测任何值
+- 只返回处理后的数据，不要添加任何解释或额外文本
+
+原始文件内容：
+$content
+
+请输出标准化后的内容，必须是CSV格式，包含表头和所有字段：
+"""
+
+
+def _register_lifecycle_prompt(name: str, stage: str, header: str, system_prompt: str) -> PromptTemplate:
+    return register_template(
+        name,
+        system=system_prompt,
+        user=_LIFECYCLE_USER_PROMPT.format(stage_name=get_stage_name(stage), header=header),
+        temperature=0.2,
+        max_tokens=2000,
+        # 输出补齐了标准表头的所有列
+        output_ratio=1.5,
+    )
+
+
+# 各阶段的提示词模板
+LIFECYCLE_STAGE_PROMPTS = {
+    stage: _register_lifecycle_prompt(f"lifecycle_{stage}", stage, header, LIFECYCLE_STAGE_SYSTEM_PROMPTS[stage])
+    for stage, header in LIFECYCLE_STAGE_HEADERS.items()
+}
+DEFAULT_STAGE_PROMPT = _register_lifecycle_prompt(
+    "lifecycle_default", "", DEFAULT_STAGE_HEADER, DEFAULT_STAGE_SYSTEM_PROMPT
+)
+
+
+def lifecycle_stage_prompt(stage: str) -> PromptTemplate:
+    """生命周期阶段的提示词模板，未知阶段使用通用模板"""
+    return LIFECYCLE_STAGE_PROMPTS.get(stage, DEFAULT_STAGE_PROMPT)
+
+
 async def standardize_lifecycle_document(content: str, stage: str) -> str:
     """
     标准化与生命週期阶段相关的文件
@@ -666,164 +917,21 @@ async def standardize_lifecycle_document(content: str, stage: str) -> str:
     content_size = len(content)
     logger.info(f"开始{stage}阶段文件标准化处理 - 输入数据大小: {content_size} 字节")
 
-    # 根据生命週期阶段选择对应的标准化提示词和表头
-    if stage == "manufacturing":
-        # 生产制造阶段
-        standard_header = (
-            "工序ID,工序名称,能源类型,能源消耗(kWh),工艺效率(%),废物产生量(kg),水资源消耗(L),回收材料使用比例(%),设备利用率(%)"
-        )
-        system_prompt = """
-        你是一个专业的生产制造数据标准化专家。你的任务是将各种格式的生产数据转换为标准格式。
-
-        你需要从原始数据中识别以下信息:
-        1. 工序ID - 每个制造工序的唯一标识符
-        2. 工序名称 - 制造工序的名称
-        3. 能源类型 - 使用的能源类型(电力、天然气、煤等)
-        4. 能源消耗(kWh) - 每个工序的能源消耗量
-        5. 工艺效率(%) - 工艺效率百分比
-        6. 废物产生量(kg) - 产生的废物重量
-        7. 水资源消耗(L) - 使用的水资源量
-        8. 回收材料使用比例(%) - 使用回收材料的百分比
-        9. 设备利用率(%) - 设备的使用效率
-
-        请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
-        输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
-        """
-
-    elif stage == "distribution":
-        # 分销存储阶段
-        standard_header = "物流ID,运输物品, 运输方式, 重量(kg), 起点,终点,运输距离(km),车辆类型,燃料类型,燃油效率(km/L),装载因子(%),是否冷藏,包装材料,包装重量(kg),仓库能源消耗(kWh),存储时间(天)"
-        system_prompt = """
-        你是一个专业的物流与分销数据标准化专家。你的任务是将各种格式的物流数据转换为标准格式。
-
-        你需要从原始数据中识别以下信息:
-        1. 物流ID - 每个物流环节的唯一标识符
-        2. 运输物品 - 运输的物品
-        3. 运输方式 - 运输模式(公路、铁路、海运、空运)
-        4. 重量(kg) - 运输物品的重量
-        4. 起点 - 运输起始位置
-        5. 终点 - 运输目的地
-        6. 运输距离(km) - 运输距离
-        7. 车辆类型 - 使用的车辆类型
-        8. 燃料类型 - 使用的燃料类型
-        9. 燃油效率(km/L) - 车辆的燃油效率
-        10. 装载因子(%) - 车辆的装载比例
-        11. 是否冷藏 - 是/否
-        12. 包装材料 - 使用的包装材料
-        13. 包装重量(kg) - 包装材料的重量
-        14. 仓库能源消耗(kWh) - 仓储过程中的能源消耗
-        15. 存储时间(天) - 产品的存储时间
-
-        特别注意：
-        - 如果原始数据只提供起点和终点，但没有运输距离，请保留为空，不要推算距离
-        - 如果原始数据只提供运输距离，但没有起点和终点，请保留为空，不要推测位置
-
-        请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
-        输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
-        """
-
-    elif stage == "usage":
-        # 产品使用阶段
-        standard_header = "使用ID,产品寿命(年),每次使用能源消耗(kWh),每次使用水资源消耗(L),消耗品,消耗品重量(kg),使用频率(次/年),维护频率(次/年),维修率(%),用户行为影响(1-10),效率降级率(%/年)"
-        system_prompt = """
-        你是一个专业的产品使用阶段数据标准化专家。你的任务是将各种格式的产品使用数据转换为标准格式。
-
-        你需要从原始数据中识别以下信息:
-        1. 使用ID - 每个使用场景的唯一标识符
-        2. 产品寿命(年) - 产品的使用寿命
-        3. 每次使用能源消耗(kWh) - 每次使用产品消耗的能源
-        4. 每次使用水资源消耗(L) - 每次使用产品消耗的水资源
-        5. 消耗品 - 使用过程中需要的消耗品
-        6. 消耗品重量(kg) - 消耗品的重量
-        7. 使用频率(次/年) - 产品的使用频率
-        8. 维护频率(次/年) - 产品需要维护的频率
-        9. 维修率(%) - 产品需要维修的可能性
-        10. 用户行为影响(1-10) - 用户行为对产品影响的程度
-        11. 效率降级率(%/年) - 产品效率每年下降的比率
-
-        请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
-        输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
-        """
-
-    elif stage == "disposal":
-        # 废弃处置阶段
-        standard_header = "处置ID,回收率(%),填埋比例(%),焚烧比例(%),堆肥比例(%),重复使用比例(%),有害废物含量(%),生物降解性(%),处置能源回收(kWh/kg),到处置设施的运输距离(km),处置方法"
-        system_prompt = """
-        你是一个专业的废弃处置数据标准化专家。你的任务是将各种格式的废弃处置数据转换为标准格式。
-
-        你需要从原始数据中识别以下信息:
-        1. 处置ID - 每个处置环节的唯一标识符
-        2. 回收率(%) - 产品被回收的比例
-        3. 填埋比例(%) - 产品被填埋的比例
-        4. 焚烧比例(%) - 产品被焚烧的比例
-        5. 堆肥比例(%) - 产品被堆肥的比例
-        6. 重复使用比例(%) - 产品被重复使用的比例
-        7. 有害废物含量(%) - 有害废物的含量
-        8. 生物降解性(%) - 产品的生物降解性
-        9. 处置能源回收(kWh/kg) - 处置过程中回收的能源
-        10. 到处置设施的运输距离(km) - 运输到处置设施的距离
-        11. 处置方法 - 使用的处置方法
-
-        请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
-        输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
-        """
-    else:
-        # 默认情况 - 通用标准化
-        standard_header = "ID,名称,类型,数值,单位,备注"
-        system_prompt = """
-        你是一个专业的数据标准化专家。你的任务是将各种格式的数据转换为标准格式。
-
-        你需要从原始数据中识别以下信息:
-        1. ID - 每个项目的唯一标识符
-        2. 名称 - 项目名称
-        3. 类型 - 项目类型
-        4. 数值 - 相关数值
-        5. 单位 - 数值的单位
-        6. 备注 - 其他相关信息
-
-        请严格按照标准表头格式输出，对于原始数据中不存在的字段，请在输出中保留为空，不要生成或推测任何值。
-        输出必须是CSV格式，只返回处理后的数据，不要添加任何解释或额外文本。
-        """
-
-    # 构建用户提示词
-    user_prompt = f"""
-    我将提供一个与{get_stage_name(stage)}阶段相关的原始数据文件内容，请帮我将其转换为标准格式。
-
-    标准格式要求：
-    1. 包含以下字段：{standard_header}
-    2. 通过语义理解识别原始数据中对应的信息
-    3. 严格保留原始数据中的所有值，不要自行估算或填充缺失数据
-    4. 保持数据的完整性，不要遗漏任何项目
-    5. 对于数值型字段，维持原始精度
-
-    注意：
-    - 对于原始数据中不存在的信息，请在输出中保留为空，不要生成或推测任何值
-    - 只返回处理后的数据，不要添加任何解释或额外文本
-
-    原始文件内容：
-    {content}
-
-    请输出标准化后的内容，必须是CSV格式，包含表头和所有字段：
-    """
+    # 根据生命週期阶段选择对应的提示词模板和表头
+    prompt = lifecycle_stage_prompt(stage)
+    standard_header = LIFECYCLE_STAGE_HEADERS.get(stage, DEFAULT_STAGE_HEADER)
 
-    # 构建API请求
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
-    ]
+    # 超出单次请求预算的内容应先经 document_service.standardize_stage_document 分块
+    if count_tokens(content) > prompt.input_budget():
+        logger.warning(f"{stage}阶段文件超出单次请求的token预算 ({prompt.input_budget()})，输出可能被截断")
 
     try:
         start_time = time.time()
         logger.info(f"开始处理{stage}阶段文件标准化 - 开始时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # 获取API配置
-        api_url, model, api_key = get_api_config()
         logger.info(f"使用API服务: {API_SERVICE}")
-        logger.info(f"使用API模型: {model}")
 
         # 调用API获取响应
-        response = await call_openai_api(messages, temperature=0.2)
-        standardized_content = response["choices"][0]["message"]["content"].strip()
+        standardized_content = await complete_prompt(prompt, content=content)
 
         end_time = time.time()
         logger.info(f"{stage}阶段文件标准化成功 - 完成时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -837,17 +945,36 @@ async def standardize_lifecycle_document(content: str, stage: str) -> str:
         return f"{standard_header}\n[标准化处理失败 - 请稍后重试]"
 
 
-def get_stage_name(stage: str) -> str:
+# 文档分类提示词
+DOCUMENT_CLASSIFY_PROMPT = register_template(
+    "document_classify",
+    system="你是一个ESG数据文档分类助手。",
+    user="""
+    请判断下面这个文件属于哪一类数据，只回答类别代码，不要添加任何其他文字。
+
+    类别代码：
+    - bom：产品组成、原材料、零部件及其重量或数量
+    - manufacturing：生产制造工序、能源消耗、废物和水资源
+    - distribution：运输、物流、仓储
+    - usage：产品使用阶段的能耗、寿命、维护
+    - disposal：回收、填埋、焚烧等废弃处置
+
+    文件名：$filename
+    文件开头：
+    $sample
+    """,
+    temperature=0.0,
+    max_tokens=10,
+)
+
+
+async def classify_document(filename: str, sample: str, kinds: List[str]) -> Optional[str]:
     """
-    获取生命週期阶段的中文名称
+    用LLM判断文档属于哪一类（BOM或某个生命周期阶段），只发送文件名和开头部分。
+    无法判断时返回 None
     """
-    stage_names = {
-        "manufacturing": "生产制造",
-        "distribution": "分销存储",
-        "usage": "产品使用",
-        "disposal": "废弃处置",
-    }
-    return stage_names.get(stage, "未知阶段")
+    answer = (await complete_prompt(DOCUMENT_CLASSIFY_PROMPT, filename=filename, sample=sample)).lower()
+    return next((kind for kind in kinds if kind in answer), None)
 
 
 async def decompose_product_materials(product_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,267 @@
+"""
+Extraction and validation of the BOM CSV produced by the LLM.
+
+LLM output wraps the CSV in code fences and commentary, varies the header
+wording, leaves commas in supplier names unquoted and drops trailing empty
+cells. parse_bom_csv reads the output line by line in a single pass: it skips
+fences and commentary, maps the header onto the standard columns, coerces the
+numeric columns and repairs malformed rows where the fix is unambiguous. Rows
+that cannot be repaired are returned as failures, so only those need to be
+sent back to the LLM.
+"""
+import csv
+import io
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Standard BOM columns (the header ai_service.standardize_bom asks for) and their bom_rows fields
+BOM_COLUMNS = {
+    "组件ID": "component_id",
+    "组件名称": "name",
+    "材料类型": "material",
+    "重量(g)": "weight_g",
+    "数量": "qty",
+    "供应商": "supplier",
+    "碳排放因子(kgCO2e/kg)": "emission_factor",
+    "AI估算": "ai_note",
+}
+STANDARD_HEADER = list(BOM_COLUMNS)
+FIELDS = list(BOM_COLUMNS.values())
+NUMERIC_FIELDS = ("weight_g", "qty", "emission_factor")
+
+# Other header spellings seen in LLM output
+_HEADER_ALIASES = {
+    "id": "component_id",
+    "组件编号": "component_id",
+    "名称": "name",
+    "材料": "material",
+    "材质": "material",
+    "重量": "weight_g",
+    "重量g": "weight_g",
+    "数量(个)": "qty",
+    "碳排放因子": "emission_factor",
+    "排放因子": "emission_factor",
+    "ai估算": "ai_note",
+    "备注": "ai_note",
+}
+
+# ai_note of a row that could be neither parsed nor repaired: this prefix, then
+# the row as the LLM wrote it. The row is kept so nothing is silently dropped.
+# Matched by bom_rows_summary (migration 010).
+UNPARSED_ROW_NOTE = "无法解析的原始行: "
+
+# Text fields that may absorb unquoted commas, most likely first
+_MERGE_CANDIDATES = ("supplier", "ai_note", "name", "material", "component_id")
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+# Units a weight may be written in, as factors to grams. Any other unit in a
+# weight cell makes the row fail rather than be saved with the wrong magnitude.
+WEIGHT_UNITS = {
+    "": 1.0,
+    "g": 1.0,
+    "克": 1.0,
+    "kg": 1000.0,
+    "千克": 1000.0,
+    "公斤": 1000.0,
+    "mg": 0.001,
+    "毫克": 0.001,
+}
+_FIELD_UNITS = {"weight_g": WEIGHT_UNITS}
+
+
+def to_number(value: str, units: Optional[Dict[str, float]] = None) -> Optional[float]:
+    """
+    The number in a cell, ignoring thousands separators; None when there is none.
+
+    Without `units` any unit after the number is ignored. With `units` the unit
+    is converted by its factor, and a unit not in `units` gives None.
+    """
+    value = value.replace(",", "")
+    match = _NUMBER.search(value)
+    if not match:
+        return None
+    if units is None:
+        return float(match.group())
+    factor = units.get(value[match.end():].strip().lower())
+    return float(match.group()) * factor if factor is not None else None
+
+
+def _header_key(cell: str) -> str:
+    # Full-width brackets and spaces vary between responses
+    return cell.replace("（", "(").replace("）", ")").replace(" ", "").strip()
+
+
+def _header_field(cell: str) -> Optional[str]:
+    key = _header_key(cell)
+    return BOM_COLUMNS.get(key) or _HEADER_ALIASES.get(key.lower())
+
+
+class BOMRowError:
+    """A row that could not be parsed. `slot` is where it belongs among the parsed rows."""
+    def __init__(self, slot: int, line: str, reason: str):
+        self.slot = slot
+        self.line = line
+        self.reason = reason
+
+
+class ParsedBOMCSV:
+    """Parsed rows in file order, with the rows that failed and how many were repaired"""
+    def __init__(self):
+        self.rows: List[Dict] = []
+        self.failed: List[BOMRowError] = []
+        self.repaired = 0
+
+
+def unparsed_row(line: str) -> Dict:
+    """A row standing in for an unparseable line, with the line in ai_note"""
+    row = dict.fromkeys(FIELDS)
+    row["ai_note"] = UNPARSED_ROW_NOTE + line
+    return row
+
+
+def is_unparsed_row(row: Dict) -> bool:
+    return (row.get("ai_note") or "").startswith(UNPARSED_ROW_NOTE)
+
+
+def count_unparsed_rows(standardized_content: str) -> int:
+    """Rows of standardized BOM CSV that hold an unparseable line"""
+    return sum(is_unparsed_row(row) for row in parse_bom_csv(standardized_content.splitlines()).rows)
+
+
+def _is_kept_unparsed(cells: List[str], filled: List[str]) -> bool:
+    # A rendered unparsed_row has a single filled cell but is not commentary
+    return len(cells) > 1 and len(filled) == 1 and filled[0].startswith(UNPARSED_ROW_NOTE)
+
+
+def _is_short_commentary(cells: List[str], fields: List[Optional[str]]) -> bool:
+    # A sentence with a comma or two, e.g. "Note: weights are estimates, please
+    # verify.": at most half the columns and no number anywhere
+    return len(cells) <= len(fields) // 2 and not any(to_number(cell) is not None for cell in cells)
+
+
+def _csv_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            continue  # code fence, with or without a language tag
+        yield line
+
+
+def _to_row(fields: List[Optional[str]], cells: List[str]) -> Optional[Dict]:
+    """Map cells onto fields; None when a numeric column holds no number"""
+    row = dict.fromkeys(FIELDS)
+    for field, value in zip(fields, cells):
+        value = value.strip()
+        if field is None or not value:
+            continue
+        if field in NUMERIC_FIELDS:
+            number = to_number(value, _FIELD_UNITS.get(field))
+            if number is None:
+                return None
+            row[field] = number
+        else:
+            row[field] = value
+    return row
+
+
+def _has_number(row: Optional[Dict]) -> bool:
+    return row is not None and any(row[field] is not None for field in NUMERIC_FIELDS)
+
+
+def _repair(fields: List[Optional[str]], cells: List[str]) -> Optional[Dict]:
+    """
+    Fix a row with the wrong number of cells: extra cells are unquoted commas
+    inside one text field, missing cells are trailing empties. Returns None
+    unless exactly one repair gives valid numeric columns, at least one of
+    them filled; text with commas but no numbers is commentary, not a row.
+    """
+    extra = len(cells) - len(fields)
+    if extra < 0:
+        row = _to_row(fields, cells + [""] * -extra)
+        return row if _has_number(row) else None
+
+    candidates = []
+    for field in _MERGE_CANDIDATES:
+        if field not in fields:
+            continue
+        i = fields.index(field)
+        merged = cells[:i] + [",".join(cells[i:i + extra + 1])] + cells[i + extra + 1:]
+        row = _to_row(fields, merged)
+        if _has_number(row) and row not in candidates:
+            candidates.append(row)
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def parse_bom_csv(lines: Iterable[str]) -> ParsedBOMCSV:
+    """
+    Parse LLM BOM output, given as an iterable of lines (a whole response
+    split into lines, or lines as they stream in).
+
+    The header is the first record naming at least two standard columns.
+    Before it, only records with exactly the standard number of columns are
+    read (in standard column order); anything else is commentary, even when
+    it contains commas. Single-cell records are commentary and skipped, as
+    are repeated headers; rows kept by unparsed_row are read back as rows.
+    """
+    result = ParsedBOMCSV()
+    fields: Optional[List[Optional[str]]] = None
+    header: Optional[List[str]] = None
+
+    for cells in csv.reader(_csv_lines(lines)):
+        filled = [cell for cell in cells if cell.strip()]
+        if len(filled) <= 1 and not _is_kept_unparsed(cells, filled):
+            continue  # blank line or commentary
+
+        if fields is None:
+            mapped = [_header_field(cell) for cell in cells]
+            if sum(field is not None for field in mapped) >= 2:
+                fields, header = mapped, [_header_key(cell) for cell in cells]
+                continue
+            if len(cells) != len(FIELDS):
+                continue  # commentary before the header, e.g. "Here is the BOM, with ..."
+        elif header and [_header_key(cell) for cell in cells] == header:
+            continue  # header repeated by a later chunk
+
+        row_fields = fields or FIELDS
+        if _is_short_commentary(cells, row_fields):
+            continue
+        row = _to_row(row_fields, cells) if len(cells) == len(row_fields) else None
+        if row is None and len(cells) != len(row_fields):
+            row = _repair(row_fields, cells)
+            if row is not None:
+                result.repaired += 1
+        if row is None:
+            reason = (
+                f"expected {len(row_fields)} columns, got {len(cells)}"
+                if len(cells) != len(row_fields) else "numeric column without a number"
+            )
+            result.failed.append(BOMRowError(len(result.rows), _format_line(cells), reason))
+            continue
+
+        row["position"] = len(result.rows)
+        result.rows.append(row)
+    return result
+
+
+def _format_line(cells: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(cells)
+    return buffer.getvalue()
+
+
+def _format_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def render_bom_csv(rows: Iterable[Dict]) -> str:
+    """CSV text of rows under the standard header"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(STANDARD_HEADER)
+    for row in rows:
+        writer.writerow([_format_cell(row.get(field)) for field in FIELDS])
+    return buffer.getvalue().rstrip("\n")
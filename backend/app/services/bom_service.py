@@ -1,14 +1,374 @@
+import asyncio
+import csv
+import hashlib
+import io
+import logging
 import os
+import re
+import tempfile
 import uuid
-from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
-import pandas as pd
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.jobs import register_handler
+from app.core.supabase import get_supabase_client
+from app.core.uploads import sniff_file_type, spool_upload
 from app.models.bom import BOMFile
 from app.schemas.bom import BOMFileCreate
-from app.services.ai_service import standardize_bom
+from app.services.ai_service import BOM_STANDARDIZE_PROMPT, repair_bom_rows, standardize_bom
+from app.services.bom_csv_service import (
+    ParsedBOMCSV,
+    count_unparsed_rows,
+    parse_bom_csv,
+    render_bom_csv,
+    unparsed_row,
+)
+from app.services.prompt_service import batch_by_tokens, count_tokens
+from app.services.spreadsheet_service import SHEET_MARKER, SpreadsheetParseError, excel_to_csv
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_WHITESPACE = re.compile(r"[ \t]+(?=\n|$)")
+
+
+class BOMFileNotFoundError(LookupError):
+    """BOM文件不存在，或在处理过程中被删除"""
+
+
+def normalize_bom_content(content: str) -> str:
+    """规范化BOM文本：去掉BOM头、统一换行符、去掉行尾空白和首尾空行"""
+    # 与迁移005中回填content_hash的SQL保持一致
+    content = content.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")
+    return _TRAILING_WHITESPACE.sub("", content).strip("\n")
+
+
+def bom_content_hash(content: str) -> Optional[str]:
+    """
+    规范化内容的SHA-256，用于识别同一用户重复上传的BOM文件。
+    内容为空时返回 None：空内容（如无法读取的文件）不能互相视为重复
+    """
+    normalized = normalize_bom_content(content)
+    if not normalized:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _sheet_sections(content: str) -> List[Tuple[str, str]]:
+    """
+    把多工作表Excel转换的内容按工作表分开，返回 (标记行, CSV内容)；
+    普通CSV只有一段，标记行为空
+    """
+    sections = []
+    marker, lines = "", []
+    for line in content.split("\n"):
+        if line.startswith(SHEET_MARKER):
+            if marker or any(lines):
+                sections.append((marker, "\n".join(lines)))
+            marker, lines = line, []
+        else:
+            lines.append(line)
+    sections.append((marker, "\n".join(lines)))
+    return sections
+
+
+def split_bom_content(content: str, rows_per_chunk: int, token_budget: Optional[int] = None) -> List[str]:
+    """
+    按行把BOM内容切分为多个CSV块，每块都带表头。
+    给出 token_budget 时，每块（含表头）同时不超过该token数。
+    多工作表的内容按工作表分别切分，每块以该工作表的标记行和它自己的表头开头
+    """
+    chunks = []
+    for marker, text in _sheet_sections(normalize_bom_content(content)):
+        records = [row for row in csv.reader(io.StringIO(text)) if any(row)]
+        if not records:
+            continue
+
+        header, rows = records[0], records[1:]
+        if token_budget is None:
+            batches = [rows[start:start + rows_per_chunk] for start in range(0, len(rows), rows_per_chunk)]
+        else:
+            batches = batch_by_tokens(
+                rows,
+                lambda row: count_tokens(",".join(row)) + 1,
+                token_budget - count_tokens(marker) - count_tokens(",".join(header)),
+                max_items=rows_per_chunk,
+            )
+
+        for batch in batches or [[]]:
+            buffer = io.StringIO()
+            if marker:
+                buffer.write(marker + "\n")
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(header)
+            writer.writerows(batch)
+            chunks.append(buffer.getvalue())
+
+    # 不需要切分时保留原始内容
+    return chunks if len(chunks) > 1 else [content]
+
+
+def parse_standardized_bom(content: str) -> List[dict]:
+    """把标准化后的BOM CSV解析为 bom_rows 行，无法解析的行被跳过"""
+    return parse_bom_csv(content.splitlines()).rows
+
+
+async def save_bom_rows(user_id: str, content_hash: str, standardized_content: str) -> int:
+    """解析标准化结果并替换该内容的 bom_rows，返回行数"""
+    rows = parse_standardized_bom(standardized_content)
+    supabase = get_supabase_client()
+    await run_in_threadpool(
+        supabase.rpc("replace_bom_rows", {
+            "p_user_id": user_id,
+            "p_content_hash": content_hash,
+            "p_rows": rows,
+        }).execute
+    )
+    return len(rows)
+
+
+async def _repair_failed_rows(parsed: ParsedBOMCSV) -> List[dict]:
+    """
+    只把本地无法修复的行交给AI重新生成，修复后的行放回原来的位置。
+    AI没有逐行修复时（行数不符、输出无法解析或调用失败），这些行按原文保留在 ai_note 中并标记，不会被丢弃
+    """
+    try:
+        response = await repair_bom_rows([(error.line, error.reason) for error in parsed.failed])
+        repaired = parse_bom_csv(response.splitlines()).rows
+    except Exception as e:
+        logger.warning(f"AI修复BOM行失败: {e}")
+        repaired = []
+    if len(repaired) != len(parsed.failed):
+        # 行数不符时无法确定修复结果与原始行的对应关系
+        logger.warning(f"AI修复了 {len(repaired)} 行，需要修复 {len(parsed.failed)} 行；未修复的行按原文保留")
+        repaired = [unparsed_row(error.line) for error in parsed.failed]
+
+    by_slot: Dict[int, List[dict]] = {}
+    for error, row in zip(parsed.failed, repaired):
+        by_slot.setdefault(error.slot, []).append(row)
+
+    rows = []
+    for slot in range(len(parsed.rows) + 1):
+        rows.extend(by_slot.get(slot, []))
+        if slot < len(parsed.rows):
+            rows.append(parsed.rows[slot])
+    return rows
+
+
+async def standardize_bom_content(
+    content: str,
+    report_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    fallback: bool = True,
+) -> str:
+    """
+    分块调用AI标准化BOM内容，每完成一块报告一次进度。块的行数和token数都有上限，
+    保证提示词放得进上下文窗口、输出不超过 max_tokens。
+    各块并发处理（并发数由AI服务的LLM并发限制控制），结果按原顺序合并。
+    fallback=False 时AI调用失败直接抛出异常，不使用模拟数据（结果要保存时使用）。
+    每块的输出在本地解析和修复，只有仍然无法解析的行再交给AI；结果使用标准表头。
+    """
+    chunks = split_bom_content(
+        content, settings.BOM_STANDARDIZE_CHUNK_ROWS, BOM_STANDARDIZE_PROMPT.input_budget()
+    )
+    done = 0
+
+    async def run(chunk: str) -> List[dict]:
+        nonlocal done
+        parsed = parse_bom_csv((await standardize_bom(chunk, fallback=fallback)).splitlines())
+        rows = await _repair_failed_rows(parsed) if parsed.failed else parsed.rows
+        done += 1
+        if report_progress:
+            await report_progress(done, len(chunks))
+        return rows
+
+    # 任意一块失败时取消其余块，不再为注定失败的结果继续调用AI
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run(chunk)) for chunk in chunks]
+    except ExceptionGroup as e:
+        raise e.exceptions[0]
+    return render_bom_csv([row for task in tasks for row in task.result()])
+
+
+def _update_bom_standardization(bom_id: str, values: dict):
+    supabase = get_supabase_client()
+    values = {**values, "standardization_updated_at": datetime.now(timezone.utc).isoformat()}
+    supabase.table("bom_files").update(values).eq("id", bom_id).execute()
+
+
+def is_standardization_in_progress(bom_file: dict) -> bool:
+    """
+    后台标准化是否正在排队或运行。状态超过 BOM_STANDARDIZATION_STALE_SECONDS
+    没有更新时视为任务已丢失（如 worker 被终止），可以重新标准化
+    """
+    if bom_file.get("standardization_status") not in ("queued", "running"):
+        return False
+    updated_at = bom_file.get("standardization_updated_at")
+    if not updated_at:
+        return False
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    age = datetime.now(timezone.utc) - updated_at
+    return age.total_seconds() < settings.BOM_STANDARDIZATION_STALE_SECONDS
+
+
+def queue_bom_standardization(bom_id: str, job_id: str) -> bool:
+    """
+    将BOM文件标记为排队中并记录任务ID。检查和更新在同一条UPDATE中完成：
+    只有状态不是排队/运行中（或已超过 BOM_STANDARDIZATION_STALE_SECONDS）时才更新，
+    同时提交的两个请求只有一个能成功。返回是否更新成功
+    """
+    now = datetime.now(timezone.utc)
+    stale = (now - timedelta(seconds=settings.BOM_STANDARDIZATION_STALE_SECONDS)).isoformat()
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("bom_files").update({
+            "standardization_status": "queued",
+            "standardization_job_id": job_id,
+            "standardization_progress": {"done": 0, "total": 0},
+            "standardization_error": None,
+            "standardization_updated_at": now.isoformat(),
+        })
+        .eq("id", bom_id)
+        .or_(
+            "standardization_status.is.null,"
+            "standardization_status.not.in.(queued,running),"
+            "standardization_updated_at.is.null,"
+            f'standardization_updated_at.lt."{stale}"'
+        )
+        .execute()
+    )
+    return bool(response.data)
+
+
+def is_standardization_current(bom_file: dict) -> bool:
+    """标准化结果是否由当前内容生成"""
+    return bool(
+        bom_file.get("standardized_content")
+        and bom_file.get("content_hash")
+        and bom_file.get("standardized_content_hash") == bom_file["content_hash"]
+    )
+
+
+def _write_temp_file(data: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(data)
+    return f.name
+
+
+async def _load_bom_content(bom_file: dict) -> str:
+    """
+    BOM文件内容，记录中没有时从存储下载。
+    早期上传的Excel文件没有保存内容，下载后按上传时的方式转换为CSV
+    """
+    if bom_file.get("content"):
+        return bom_file["content"]
+    supabase = get_supabase_client()
+    data = await run_in_threadpool(supabase.storage.from_("bom_files").download, bom_file["file_path"])
+    file_type = sniff_file_type(data)
+    if file_type not in ("xlsx", "xls"):
+        return data.decode("utf-8-sig")
+
+    path = await run_in_threadpool(_write_temp_file, data, f".{file_type}")
+    try:
+        return await excel_to_csv(path, file_type)
+    finally:
+        os.remove(path)
+
+
+async def standardize_bom_file(
+    bom_file: dict,
+    report_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    force: bool = False,
+) -> dict:
+    """
+    标准化BOM文件并保存结果，返回更新后的记录。
+
+    结果由该用户内容相同的所有BOM文件共享；已有结果由当前内容生成时
+    直接返回，不再调用AI（force=True 时重新生成）。
+    """
+    bom_id = str(bom_file["id"])
+    if not force and is_standardization_current(bom_file):
+        if bom_file.get("standardization_status") in (None, "succeeded"):
+            return bom_file
+        # 后台任务排队时结果已经是最新的
+        values = {"standardization_status": "succeeded", "standardization_error": None}
+        await run_in_threadpool(_update_bom_standardization, bom_id, values)
+        return {**bom_file, **values}
+
+    async def progress(done: int, total: int):
+        if report_progress:
+            await report_progress(done, total)
+        await run_in_threadpool(
+            _update_bom_standardization, bom_id, {"standardization_progress": {"done": done, "total": total}}
+        )
+
+    await run_in_threadpool(
+        _update_bom_standardization, bom_id, {"standardization_status": "running", "standardization_error": None}
+    )
+    try:
+        content = await _load_bom_content(bom_file)
+        standardized_content = await standardize_bom_content(content, progress, fallback=False)
+    except BaseException as e:
+        await run_in_threadpool(
+            _update_bom_standardization,
+            bom_id,
+            {"standardization_status": "failed", "standardization_error": str(e) or type(e).__name__},
+        )
+        raise
+
+    supabase = get_supabase_client()
+    query = supabase.table("bom_files").update({
+        "standardized_content": standardized_content,
+        "standardized_content_hash": bom_file.get("content_hash"),
+        "standardization_status": "succeeded",
+        "standardization_error": None,
+        "standardization_updated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("user_id", str(bom_file["user_id"]))
+    if bom_file.get("content_hash"):
+        query = query.eq("content_hash", bom_file["content_hash"])
+        # 解析一次，保存为 bom_rows，供分页和汇总查询使用
+        await save_bom_rows(str(bom_file["user_id"]), bom_file["content_hash"], standardized_content)
+    else:
+        query = query.eq("id", bom_id)
+    response = await run_in_threadpool(query.execute)
+    unparsed = count_unparsed_rows(standardized_content)
+    if unparsed:
+        logger.warning(f"BOM文件 {bom_id} 有 {unparsed} 行无法解析，已按原文保留")
+    updated = next((row for row in response.data if row["id"] == bom_id), None)
+    if updated is None:
+        # 标准化期间文件被删除
+        raise BOMFileNotFoundError("BOM file not found")
+    return updated
+
+
+@register_handler("bom_file_standardize")
+async def run_bom_file_standardization(job: dict, report_progress) -> dict:
+    """后台任务：标准化一个BOM文件，进度和结果保存在 bom_files 行上"""
+    bom_id = job["payload"]["bom_id"]
+    supabase = get_supabase_client()
+    response = await run_in_threadpool(
+        supabase.table("bom_files").select("*")
+        .eq("id", bom_id).eq("user_id", job["tenant"]).maybe_single().execute
+    )
+    if not response or not response.data:
+        raise BOMFileNotFoundError("BOM file not found")
+
+    bom_file = await standardize_bom_file(response.data, report_progress, force=job["payload"].get("force", False))
+    return {"bom_id": bom_id, "unparsed_rows": count_unparsed_rows(bom_file["standardized_content"] or "")}
+
+
+@register_handler("bom_content_standardize")
+async def run_bom_content_standardization(job: dict, report_progress) -> dict:
+    """后台任务：标准化请求中提交的BOM内容，结果（及无法解析的行数）保存在任务上"""
+    standardized_content = await standardize_bom_content(
+        job["payload"]["content"], report_progress, fallback=False
+    )
+    return {"standardized_content": standardized_content, "unparsed_rows": count_unparsed_rows(standardized_content)}
 
 
 def get_bom_file_by_id(
@@ -40,30 +400,36 @@ async def upload_bom_file(db: Session, file: UploadFile, user_id: int) -> BOMFil
     upload_dir = "uploads/bom_files"
     os.makedirs(upload_dir, exist_ok=True)
 
-    # 获取文件扩展名
-    file_extension = os.path.splitext(file.filename)[1]
+    # 分块写入临时文件（同时计算哈希、检查格式和大小）
+    upload = await spool_upload(
+        file, settings.BOM_UPLOAD_MAX_MB * 1024 * 1024, directory=upload_dir
+    )
 
-    # 生成唯一文件名
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
+    # 读取文件内容（转换为文本）。无法解析的文件不保存，返回400
+    if upload.file_type == "csv":
+        file_content = upload.read_text()
+    else:
+        # 在进程池中解析Excel文件，避免阻塞事件循环
+        try:
+            file_content = await excel_to_csv(upload.path, upload.file_type)
+        except SpreadsheetParseError as e:
+            upload.cleanup()
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # 保存文件
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # 解析成功后再移动到唯一文件名
+    file_extension = f".{upload.file_type}"
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4()}{file_extension}")
+    os.replace(upload.path, file_path)
+    upload.path = file_path
 
-    # 读取文件内容（转换为文本）
-    file_content = ""
-    if file_extension.lower() in [".csv"]:
-        file_content = content.decode("utf-8")
-    elif file_extension.lower() in [".xlsx", ".xls"]:
-        # 使用pandas读取Excel文件
-        try:
-            df = pd.read_excel(file_path)
-            file_content = df.to_csv(index=False)
-        except Exception as e:
-            print(f"读取Excel文件失败: {e}")
-            file_content = "Error reading Excel file"
+    # 同一用户上传过相同内容时，直接复用其标准化结果
+    content_hash = bom_content_hash(file_content)
+    duplicate = (
+        db.query(BOMFile)
+        .filter(BOMFile.user_id == user_id, BOMFile.content_hash == content_hash)
+        .order_by(BOMFile.updated_at.desc())
+        .first()
+    ) if content_hash else None
 
     # 创建BOM文件记录
     db_bom_file = BOMFile(
@@ -72,6 +438,9 @@ async def upload_bom_file(db: Session, file: UploadFile, user_id: int) -> BOMFil
         file_path=file_path,
         content=file_content,
         file_type=file_extension.lower().replace(".", ""),
+        content_hash=content_hash,
+        standardized_content=duplicate.standardized_content if duplicate else None,
+        standardized_content_hash=duplicate.standardized_content_hash if duplicate else None,
     )
 
     db.add(db_bom_file)
@@ -81,25 +450,6 @@ async def upload_bom_file(db: Session, file: UploadFile, user_id: int) -> BOMFil
     return db_bom_file
 
 
-async def standardize_bom_file(
-    db: Session, bom_id: int, user_id: int
-) -> Optional[BOMFile]:
-    """标准化BOM文件内容"""
-    db_bom_file = get_bom_file_by_id(db, bom_id, user_id)
-    if not db_bom_file:
-        return None
-
-    # 使用AI服务标准化BOM内容（现在包含重量推算功能）
-    standardized_content = await standardize_bom(db_bom_file.content)
-
-    # 更新BOM文件记录
-    db_bom_file.standardized_content = standardized_content
-    db.commit()
-    db.refresh(db_bom_file)
-
-    return db_bom_file
-
-
 def delete_bom_file(db: Session, bom_id: int, user_id: int) -> bool:
     """删除BOM文件"""
     db_bom_file = get_bom_file_by_id(db, bom_id, user_id)
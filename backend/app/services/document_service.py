@@ -0,0 +1,193 @@
+"""
+Batch ingestion and standardization of product lifecycle documents.
+
+Dropped documents are classified as a BOM or a lifecycle stage document and
+standardized with the matching pipeline; documents whose stage is already
+known are standardized concurrently, with results yielded as they finish.
+
+Classification first scores keywords in the file name and header lines,
+which costs nothing; only files whose scores are ambiguous are sent to the
+LLM. All files are processed concurrently; the number of LLM requests in
+flight is bounded by ai_service's LLM_MAX_CONCURRENCY limiter, so a large
+batch queues there instead of opening one request per file.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import ai_service, bom_service
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_KINDS = ["bom", "manufacturing", "distribution", "usage", "disposal"]
+
+# Lower-case keywords typical of each kind's column names
+_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "bom": (
+        "bom", "物料", "材料", "原料", "组件", "零件", "部件", "规格", "供应商",
+        "material", "component", "part", "supplier",
+    ),
+    "manufacturing": (
+        "工序", "工艺", "生产", "制造", "能耗", "能源消耗", "电力", "kwh", "设备", "废物", "水资源",
+        "process", "manufactur", "energy", "electricity",
+    ),
+    "distribution": (
+        "运输", "物流", "配送", "距离", "起点", "终点", "车辆", "燃油", "仓库", "仓储", "装载",
+        "transport", "logistic", "shipping", "distance", "vehicle", "warehouse",
+    ),
+    "usage": (
+        "使用", "寿命", "频率", "维护", "维修", "消耗品", "用户",
+        "usage", "lifetime", "lifespan", "maintenance",
+    ),
+    "disposal": (
+        "处置", "废弃", "回收", "填埋", "焚烧", "堆肥", "降解",
+        "disposal", "recycl", "landfill", "incinerat", "compost",
+    ),
+}
+
+# Lines of a file scored for keywords (the header, plus a title line or a sheet marker)
+_HEADER_LINES = 3
+_HEADER_CHARS = 4096
+# Characters of a file sent to the LLM when the keywords are ambiguous
+_LLM_SAMPLE_CHARS = 1500
+
+
+def keyword_scores(filename: str, content: str) -> Dict[str, int]:
+    """Number of each kind's keywords found in the file name and header lines"""
+    header = [line for line in content[:_HEADER_CHARS].splitlines() if line.strip()][:_HEADER_LINES]
+    text = "\n".join([filename, *header]).lower()
+    return {kind: sum(keyword in text for keyword in keywords) for kind, keywords in _KEYWORDS.items()}
+
+
+def classify_by_keywords(filename: str, content: str) -> Optional[str]:
+    """
+    The kind whose keywords clearly dominate, or None when the scores are
+    ambiguous: at least two hits and at least twice the runner-up.
+    """
+    scores = keyword_scores(filename, content)
+    (best, best_score), (_, second_score) = sorted(scores.items(), key=lambda item: -item[1])[:2]
+    if best_score >= 2 and best_score >= 2 * second_score:
+        return best
+    return None
+
+
+async def classify_document(filename: str, content: str) -> Tuple[Optional[str], str]:
+    """
+    (kind, method) for a document; method is "keywords" or "llm". The kind is
+    None when neither the keywords nor the LLM give an answer.
+    """
+    kind = classify_by_keywords(filename, content)
+    if kind:
+        return kind, "keywords"
+
+    kind = await ai_service.classify_document(filename, content[:_LLM_SAMPLE_CHARS], DOCUMENT_KINDS)
+    if kind:
+        return kind, "llm"
+
+    # Fall back to the best keyword match, if any keyword matched at all
+    scores = keyword_scores(filename, content)
+    best = max(scores, key=scores.get)
+    return (best if scores[best] else None), "keywords"
+
+
+def _header_key(line: str) -> str:
+    return line.replace(" ", "").strip()
+
+
+def merge_stage_chunks(header: str, outputs: List[str]) -> str:
+    """
+    Join the LLM outputs of a document's chunks under one standard header,
+    dropping code fences and the header each chunk repeats
+    """
+    header_first_cell = _header_key(header.split(",")[0])
+    lines = [header]
+    for output in outputs:
+        chunk_lines = [
+            line for line in output.strip().splitlines()
+            if line.strip() and not line.lstrip().startswith("```")
+        ]
+        # Header wording can vary a little between responses; compare the first column
+        if chunk_lines and _header_key(chunk_lines[0].split(",")[0]) == header_first_cell:
+            chunk_lines = chunk_lines[1:]
+        lines.extend(chunk_lines)
+    return "\n".join(lines)
+
+
+async def standardize_stage_document(content: str, stage: str) -> str:
+    """
+    Standardize a document for one lifecycle stage ('bom' or a stage of
+    standardize_lifecycle_document). Large documents are split into chunks of
+    rows, small enough for the stage prompt's token budget, that are
+    standardized concurrently, so a stage takes about as long as its slowest
+    chunk while the LLM limiter has free slots.
+    """
+    if stage == "bom":
+        return await bom_service.standardize_bom_content(content)
+
+    chunks = bom_service.split_bom_content(
+        content,
+        settings.LIFECYCLE_STANDARDIZE_CHUNK_ROWS,
+        ai_service.lifecycle_stage_prompt(stage).input_budget(),
+    )
+    outputs = await asyncio.gather(
+        *(ai_service.standardize_lifecycle_document(chunk, stage) for chunk in chunks)
+    )
+    if len(outputs) == 1:
+        return outputs[0]
+    header = ai_service.LIFECYCLE_STAGE_HEADERS.get(stage, ai_service.DEFAULT_STAGE_HEADER)
+    return merge_stage_chunks(header, outputs)
+
+
+async def iter_standardized_stages(documents: List[Tuple[str, str]]) -> AsyncIterator[dict]:
+    """
+    Standardize (stage, content) documents concurrently and yield each result
+    as soon as it is ready: {"index", "stage", "standardized_content", "error"}.
+    Total time is that of the slowest document, not the sum.
+    """
+    async def run(index: int, stage: str, content: str) -> dict:
+        result = {"index": index, "stage": stage, "standardized_content": None, "error": None}
+        try:
+            result["standardized_content"] = await standardize_stage_document(content, stage)
+        except Exception as e:
+            logger.error(f"{stage}阶段文档标准化失败: {e}")
+            result["error"] = str(e)
+        return result
+
+    tasks = [asyncio.ensure_future(run(i, stage, content)) for i, (stage, content) in enumerate(documents)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away before all results were sent
+        for task in tasks:
+            task.cancel()
+
+
+def ingest_result(filename: str, error: Optional[str] = None) -> dict:
+    """The result entry of one ingested file, before classification"""
+    return {"filename": filename, "kind": None, "classified_by": None, "standardized_content": None, "error": error}
+
+
+async def ingest_document(filename: str, content: str) -> dict:
+    """Classify a document and standardize it with the pipeline for its kind"""
+    result = ingest_result(filename)
+    try:
+        kind, method = await classify_document(filename, content)
+        result.update(kind=kind, classified_by=method)
+        if kind is None:
+            result["error"] = "Could not determine the document type"
+        else:
+            result["standardized_content"] = await standardize_stage_document(content, kind)
+    except Exception as e:
+        logger.error(f"文档 {filename} 处理失败: {e}")
+        result["error"] = str(e)
+    return result
+
+
+async def ingest_documents(documents: List[Tuple[str, str]]) -> List[dict]:
+    """
+    Ingest (filename, content) pairs concurrently; results are in input order.
+    A failing document reports its error without affecting the others.
+    """
+    return await asyncio.gather(*(ingest_document(filename, content) for filename, content in documents))
@@ -0,0 +1,76 @@
+"""
+Hot read queries served directly from Postgres over the asyncpg pool.
+
+Used instead of the PostgREST path when DATABASE_READ_BACKEND=asyncpg. Each
+query is a fixed SQL string, so asyncpg prepares it once per connection and
+reuses it from the statement cache. Rows are returned in the same shape as
+the PostgREST-based services.
+"""
+from typing import List, Optional
+from uuid import UUID
+
+from app.core.database import get_pool
+from app.services.workflow_service import _normalize_workflow
+
+# Nodes and edges are aggregated in the same statement, like the PostgREST embedded select
+_WORKFLOW_WITH_GRAPH_SQL = """
+    SELECT w.*,
+           COALESCE((SELECT json_agg(n) FROM workflow_nodes n WHERE n.workflow_id = w.id), '[]'::json)
+               AS workflow_nodes,
+           COALESCE((SELECT json_agg(e) FROM workflow_edges e WHERE e.workflow_id = w.id), '[]'::json)
+               AS workflow_edges
+    FROM workflows w
+"""
+
+USER_WORKFLOWS_SQL = _WORKFLOW_WITH_GRAPH_SQL + """
+    WHERE w.user_id = $1
+    ORDER BY w.updated_at DESC, w.id
+    OFFSET $2 LIMIT $3
+"""
+
+WORKFLOW_BY_ID_SQL = _WORKFLOW_WITH_GRAPH_SQL + """
+    WHERE w.id = $1 AND w.user_id = $2
+"""
+
+USER_BOM_FILES_SQL = """
+    SELECT * FROM bom_files
+    WHERE user_id = $1
+    ORDER BY updated_at DESC, id
+    OFFSET $2 LIMIT $3
+"""
+
+PENDING_VENDOR_TASKS_SQL = """
+    SELECT * FROM vendor_tasks
+    WHERE status = 'pending'
+    ORDER BY created_at, id
+"""
+
+
+async def get_user_workflows(user_id: UUID, skip: int = 0, limit: int = 100) -> List[dict]:
+    """Get all workflows for user, including nodes and edges"""
+    async with get_pool().acquire() as connection:
+        rows = await connection.fetch(USER_WORKFLOWS_SQL, UUID(str(user_id)), skip, limit)
+    return [_normalize_workflow(dict(row)) for row in rows]
+
+
+async def get_workflow_by_id(workflow_id: UUID, user_id: UUID) -> Optional[dict]:
+    """Get workflow by ID, including nodes and edges"""
+    async with get_pool().acquire() as connection:
+        row = await connection.fetchrow(WORKFLOW_BY_ID_SQL, UUID(str(workflow_id)), UUID(str(user_id)))
+    if row is None:
+        return None
+    return _normalize_workflow(dict(row))
+
+
+async def get_user_bom_files(user_id: UUID, skip: int = 0, limit: int = 100) -> List[dict]:
+    """Get all BOM files for user"""
+    async with get_pool().acquire() as connection:
+        rows = await connection.fetch(USER_BOM_FILES_SQL, UUID(str(user_id)), skip, limit)
+    return [dict(row) for row in rows]
+
+
+async def get_pending_vendor_tasks() -> List[dict]:
+    """Get all pending vendor tasks"""
+    async with get_pool().acquire() as connection:
+        rows = await connection.fetch(PENDING_VENDOR_TASKS_SQL)
+    return [dict(row) for row in rows]
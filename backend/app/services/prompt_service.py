@@ -0,0 +1,201 @@
+"""
+Prompt templates for the LLM calls in ai_service.
+
+Templates are registered once at import. Registration compacts the text,
+removing the source indentation and repeated blank lines that would otherwise
+be paid for as tokens on every call, and splits it into literal parts and
+$placeholders, so rendering is a join. Each template knows its own token
+cost and the completion budget of its calls, which gives the token budget left
+for the inputs; callers use it to split large inputs into several calls.
+
+Tokens are counted with tiktoken when it is installed and its encoding can be
+loaded (on the first count, not at import); otherwise they are estimated from the text (one token per CJK
+character, one per four other characters), which errs on the high side.
+"""
+import logging
+import re
+import textwrap
+import threading
+from functools import cached_property, lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Tokens each chat message costs on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# $name placeholders; names are ASCII so "$stage阶段" reads as $stage
+_PLACEHOLDER = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
+_TRAILING_WHITESPACE = re.compile(r"[ \t]+(?=\n|$)")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def compact(text: str) -> str:
+    """Text without its common indentation, trailing spaces and repeated blank lines"""
+    text = _TRAILING_WHITESPACE.sub("", textwrap.dedent(text))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # the encoding is downloaded on first use
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text: exact with tiktoken, otherwise a high-side estimate"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens of chat messages"""
+    return sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def batch_by_tokens(
+    items: Sequence[T],
+    tokens_of: Callable[[T], int],
+    budget: int,
+    max_items: Optional[int] = None,
+) -> List[List[T]]:
+    """
+    Split items, in order, into batches of at most `budget` tokens (and at
+    most `max_items` items). An item over the budget on its own gets a batch
+    to itself.
+    """
+    batches: List[List[T]] = []
+    batch: List[T] = []
+    used = 0
+    for item in items:
+        tokens = tokens_of(item)
+        if batch and (used + tokens > budget or (max_items and len(batch) >= max_items)):
+            batches.append(batch)
+            batch, used = [], 0
+        if tokens > budget:
+            logger.warning(f"Prompt input of {tokens} tokens exceeds the budget of {budget}")
+        batch.append(item)
+        used += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class PromptTemplate:
+    """
+    A compacted system and user prompt with $placeholders in the user prompt,
+    and the sampling options of its calls.
+
+    `output_ratio` is the expected completion tokens per input token: the
+    inputs of one call are limited so their output fits in `max_tokens`.
+    """
+    def __init__(
+        self,
+        name: str,
+        system: str,
+        user: str,
+        temperature: float = 0.2,
+        max_tokens: int = 2000,
+        output_ratio: float = 1.0,
+    ):
+        self.name = name
+        self.system = compact(system)
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.output_ratio = output_ratio
+        # Alternating literal text and placeholder names, starting with text
+        self._parts = _PLACEHOLDER.split(compact(user))
+        self.fields = self._parts[1::2]
+
+    @cached_property
+    def fixed_tokens(self) -> int:
+        """
+        Tokens of the template text. Counted on first use rather than at
+        registration, so importing the app does not load the tokenizer.
+        """
+        return (
+            count_tokens(self.system)
+            + count_tokens("".join(self._parts[::2]))
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+
+    def render_user(self, **values: str) -> str:
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            parts[i] = str(values[parts[i]])
+        return "".join(parts)
+
+    def render(self, **values: str) -> List[Dict[str, str]]:
+        """Chat messages with the placeholders filled in"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render_user(**values)},
+        ]
+
+    def input_budget(self, context_tokens: Optional[int] = None) -> int:
+        """
+        Tokens left for placeholder values in one call: what fits in the
+        context window next to the template and the completion, and no more
+        than the completion budget can answer
+        """
+        context_tokens = context_tokens or settings.LLM_CONTEXT_TOKENS
+        context_room = context_tokens - self.max_tokens - self.fixed_tokens
+        return max(1, min(context_room, int(self.max_tokens / self.output_ratio)))
+
+
+class PromptUsage:
+    """Token counts of the calls made with each template in this process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, prompt_tokens: int, completion_tokens: int, estimated_prompt_tokens: int):
+        with self._lock:
+            counts = self._templates.setdefault(name, {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_prompt_tokens": 0,
+            })
+            counts["calls"] += 1
+            counts["prompt_tokens"] += prompt_tokens
+            counts["completion_tokens"] += completion_tokens
+            counts["estimated_prompt_tokens"] += estimated_prompt_tokens
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._templates.items()}
+
+
+usage = PromptUsage()
+
+_templates: Dict[str, PromptTemplate] = {}
+
+
+def register_template(name: str, system: str, user: str, **options) -> PromptTemplate:
+    """Compile a template and make it available under `name`"""
+    template = PromptTemplate(name, system, user, **options)
+    _templates[name] = template
+    return template
+
+
+def get_template(name: str) -> PromptTemplate:
+    return _templates[name]
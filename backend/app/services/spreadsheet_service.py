@@ -0,0 +1,131 @@
+"""
+Excel parsing in a bounded process pool.
+
+pandas holds the GIL while it parses a workbook, so parsing in the event loop
+or a thread stalls every other request in the worker. Workbooks are converted
+to CSV text in separate processes instead; each call is time-boxed, and a
+workbook that runs over the limit has its process killed.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+from typing import Optional
+
+from app.core.config import settings
+
+# First line of each sheet's block when a workbook has several non-empty sheets
+SHEET_MARKER = "# sheet: "
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class SpreadsheetParseError(ValueError):
+    """Raised when a workbook cannot be read or takes too long to parse"""
+
+
+def _warm_up():
+    # Pay the pandas import once per pool process, not on the first upload
+    import pandas  # noqa: F401
+
+
+def _excel_engine(file_type: str) -> Optional[str]:
+    """
+    pandas engine for EXCEL_ENGINE. "auto" prefers calamine (Rust, reads xlsx
+    and xls) and otherwise leaves the choice to pandas (openpyxl in read-only
+    mode for xlsx, xlrd for xls).
+    """
+    engine = settings.EXCEL_ENGINE
+    if engine == "auto":
+        return "calamine" if find_spec("python_calamine") else None
+    if engine == "openpyxl" and file_type == "xls":
+        return None  # openpyxl cannot read the legacy format
+    return engine
+
+
+def _workbook_to_csv(path: str, file_type: str) -> str:
+    """
+    Convert every non-empty sheet of a workbook to CSV. Runs in a pool process.
+    """
+    import pandas as pd
+
+    sheets = pd.read_excel(path, sheet_name=None, engine=_excel_engine(file_type))
+    sheets = {name: df for name, df in sheets.items() if not df.dropna(how="all").empty}
+    if len(sheets) <= 1:
+        return next(iter(sheets.values())).to_csv(index=False) if sheets else ""
+
+    # Several sheets: one CSV block per sheet, each headed by the sheet name.
+    # Sheets can have different columns, so each block keeps its own header.
+    return "\n".join(f"{SHEET_MARKER}{name}\n{df.to_csv(index=False)}" for name, df in sheets.items())
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and thread pools is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.SPREADSHEET_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+    return _pool
+
+
+def _kill_pool(pool: ProcessPoolExecutor):
+    """
+    Terminate the processes of a pool (e.g. one stuck on a huge workbook); the next call starts a new pool
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """
+    Stop the pool processes, e.g. at application shutdown
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def excel_to_csv(path: str, file_type: str) -> str:
+    """
+    Convert an Excel workbook to CSV text in the process pool.
+
+    Waits for a free pool process, so a burst of uploads queues here instead
+    of piling work onto the pool. Raises SpreadsheetParseError on unreadable
+    files and after SPREADSHEET_PARSE_TIMEOUT_SECONDS.
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.SPREADSHEET_PARSE_WORKERS)
+
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        # A second attempt covers calls that were running when another call's
+        # timeout killed the pool
+        for attempt in range(2):
+            pool = _get_pool()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(pool, _workbook_to_csv, path, file_type),
+                    timeout=settings.SPREADSHEET_PARSE_TIMEOUT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                _kill_pool(pool)
+                raise SpreadsheetParseError(
+                    f"Parsing the workbook took longer than {settings.SPREADSHEET_PARSE_TIMEOUT_SECONDS:g}s"
+                )
+            except BrokenProcessPool:
+                _kill_pool(pool)
+                if attempt:
+                    raise SpreadsheetParseError("Spreadsheet parser process crashed")
+            except Exception as e:
+                raise SpreadsheetParseError(f"Failed to read Excel file: {str(e)}")
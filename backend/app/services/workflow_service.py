@@ -1,5 +1,8 @@
-from typing import List, Optional
-from uuid import UUID
+import json
+from typing import Iterable, Iterator, List, Optional
+from uuid import UUID, uuid4
+
+from postgrest.types import ReturnMethod
 
 from app.core.supabase import get_supabase_client
 from app.schemas.workflow import (
@@ -13,75 +16,153 @@ from app.schemas.workflow import (
 )
 
 
+class WorkflowVersionConflict(ValueError):
+    """Raised when a workflow update is based on a stale version"""
+
+
+class WorkflowImportError(Exception):
+    """Raised when an import stops part way; `result` lists what was imported before"""
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
+
+
+def _normalize_graph_row(row: dict) -> dict:
+    """Stringify the ids of a workflow node or edge row in place"""
+    row['id'] = str(row['id']) if row.get('id') else None
+    row['workflow_id'] = str(row['workflow_id']) if row.get('workflow_id') else None
+    return row
+
+
+def _normalize_workflow(
+    row: dict,
+    nodes: Optional[List[dict]] = None,
+    edges: Optional[List[dict]] = None,
+) -> dict:
+    """
+    Convert a Supabase workflow row into the API shape in a single pass.
+
+    Embedded ``workflow_nodes`` / ``workflow_edges`` are moved to ``nodes`` /
+    ``edges`` unless explicit lists are given. Rows are normalized here, at the
+    data-access boundary, so endpoints can return them unchanged.
+    """
+    row['id'] = str(row['id'])
+    row['user_id'] = str(row['user_id'])
+    if row.get('data') is None:
+        row['data'] = {}
+
+    embedded_nodes = row.pop('workflow_nodes', None)
+    embedded_edges = row.pop('workflow_edges', None)
+    if nodes is None:
+        nodes = embedded_nodes or []
+    if edges is None:
+        edges = embedded_edges or []
+    row['nodes'] = [_normalize_graph_row(node) for node in nodes]
+    row['edges'] = [_normalize_graph_row(edge) for edge in edges]
+    return row
+
+
+def get_workflow_version(workflow_id: UUID, user_id: UUID) -> Optional[int]:
+    """Get the current version of a workflow without loading nodes and edges"""
+    supabase = get_supabase_client()
+    response = supabase.table('workflows').select('version').eq('id', str(workflow_id)).eq('user_id', str(user_id)).maybe_single().execute()
+    if not response or not response.data:
+        return None
+    return response.data.get('version', 1)
+
+
+# Embedded select so a workflow and its graph come back in a single PostgREST request
+WORKFLOW_WITH_GRAPH = '*, workflow_nodes(*), workflow_edges(*)'
+
+
 def get_workflow_by_id(workflow_id: UUID, user_id: UUID) -> Optional[dict]:
-    """Get workflow by ID"""
+    """Get workflow by ID, including nodes and edges, in one round trip"""
     supabase = get_supabase_client()
     
-    # Get workflow
-    workflow_response = supabase.table('workflows').select('*').eq('id', str(workflow_id)).single().execute()
-    if not workflow_response.data:
+    workflow_response = (
+        supabase.table('workflows')
+        .select(WORKFLOW_WITH_GRAPH)
+        .eq('id', str(workflow_id))
+        .eq('user_id', str(user_id))
+        .maybe_single()
+        .execute()
+    )
+    if not workflow_response or not workflow_response.data:
         return None
         
-    result = workflow_response.data
-    result['id'] = str(result['id'])
-    result['user_id'] = str(result['user_id'])
-    
-    # Get nodes
-    nodes_response = supabase.table('workflow_nodes').select('*').eq('workflow_id', str(workflow_id)).execute()
-    nodes = []
-    for node in nodes_response.data:
-        node['id'] = str(node['id'])
-        node['workflow_id'] = str(node['workflow_id'])
-        nodes.append(node)
-    result['nodes'] = nodes
-    
-    # Get edges
-    edges_response = supabase.table('workflow_edges').select('*').eq('workflow_id', str(workflow_id)).execute()
-    edges = []
-    for edge in edges_response.data:
-        edge['id'] = str(edge['id'])
-        edge['workflow_id'] = str(edge['workflow_id'])
-        edges.append(edge)
-    result['edges'] = edges
-    
-    return result
+    return _normalize_workflow(workflow_response.data)
 
 
 def get_user_workflows(user_id: UUID, skip: int = 0, limit: int = 100) -> List[dict]:
-    """Get all workflows for user"""
+    """Get all workflows for user, including nodes and edges, in one round trip"""
     supabase = get_supabase_client()
     
-    # Get workflows
-    workflows_response = supabase.table('workflows').select('*').eq('user_id', str(user_id)).range(skip, skip + limit).execute()
+    workflows_response = (
+        supabase.table('workflows')
+        .select(WORKFLOW_WITH_GRAPH)
+        .eq('user_id', str(user_id))
+        .order('updated_at', desc=True)
+        .order('id')
+        .range(skip, skip + limit - 1)
+        .execute()
+    )
     
-    print(f"Workflows response: {workflows_response}")
-    
-    results = []
-    for workflow in workflows_response.data:
-        workflow['id'] = str(workflow['id'])
-        workflow['user_id'] = str(workflow['user_id'])
-        
-        # Get nodes for this workflow
-        nodes_response = supabase.table('workflow_nodes').select('*').eq('workflow_id', workflow['id']).execute()
-        nodes = []
-        for node in nodes_response.data:
-            node['id'] = str(node['id'])
-            node['workflow_id'] = str(node['workflow_id'])
-            nodes.append(node)
-        workflow['nodes'] = nodes
-        
-        # Get edges for this workflow
-        edges_response = supabase.table('workflow_edges').select('*').eq('workflow_id', workflow['id']).execute()
-        edges = []
-        for edge in edges_response.data:
-            edge['id'] = str(edge['id'])
-            edge['workflow_id'] = str(edge['workflow_id'])
-            edges.append(edge)
-        workflow['edges'] = edges
-        
-        results.append(workflow)
-    
-    return results
+    return [_normalize_workflow(workflow) for workflow in workflows_response.data]
+
+
+def _field(item, name: str, default=None):
+    """Read a field from either a dict or a model instance"""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _extract_node_rows(nodes, workflow_id: str) -> List[dict]:
+    """
+    Build workflow_nodes rows from frontend (React Flow) or stored node shapes.
+    Nodes without an ID are skipped; for duplicate IDs the last node wins, as
+    (workflow_id, node_id) is unique.
+    """
+    rows = {}
+    for node in nodes or []:
+        node_id = _field(node, 'node_id') or _field(node, 'id')
+        if not node_id:
+            continue  # Skip nodes without an ID
+
+        position = _field(node, 'position') or {}
+        rows[str(node_id)] = {
+            'workflow_id': workflow_id,
+            'node_id': str(node_id),
+            'node_type': _field(node, 'type') or _field(node, 'node_type') or 'default',
+            'label': _field(node, 'label', ''),
+            'position_x': _field(node, 'position_x', _field(position, 'x', 0)),
+            'position_y': _field(node, 'position_y', _field(position, 'y', 0)),
+            'data': _field(node, 'data') or {},
+        }
+    return list(rows.values())
+
+
+def _extract_edge_rows(edges, workflow_id: str) -> List[dict]:
+    """
+    Build workflow_edges rows from frontend (React Flow) or stored edge shapes.
+    Edges without an ID, source or target are skipped; for duplicate IDs the
+    last edge wins, as (workflow_id, edge_id) is unique.
+    """
+    rows = {}
+    for edge in edges or []:
+        edge_id = _field(edge, 'edge_id') or _field(edge, 'id')
+        source = _field(edge, 'source')
+        target = _field(edge, 'target')
+        if not edge_id or not source or not target:
+            continue  # Skip edges without required fields
+
+        rows[str(edge_id)] = {
+            'workflow_id': workflow_id,
+            'edge_id': str(edge_id),
+            'source': str(source),
+            'target': str(target),
+        }
+    return list(rows.values())
 
 
 def create_workflow(workflow: WorkflowCreate, user_id: UUID) -> dict:
@@ -104,126 +185,75 @@ def create_workflow(workflow: WorkflowCreate, user_id: UUID) -> dict:
         raise ValueError("Failed to create workflow")
     
     result = workflow_response.data[0]
-    result['id'] = str(result['id'])
-    result['user_id'] = str(result['user_id'])
-    workflow_id = result['id']
+    workflow_id = str(result['id'])
     
-    # Create nodes if any
-    nodes_data = []
-    if workflow.nodes:
-        for node in workflow.nodes:
-            # Handle both dictionary and model cases
-            if isinstance(node, dict):
-                node_id = node.get('id') or node.get('node_id')
-                node_type = node.get('type') or node.get('node_type')
-                label = node.get('label', '')
-                position = node.get('position', {})
-                if isinstance(position, dict):
-                    position_x = position.get('x', 0)
-                    position_y = position.get('y', 0)
-                else:
-                    position_x = getattr(position, 'x', 0)
-                    position_y = getattr(position, 'y', 0)
-                data = node.get('data', {})
-            else:
-                node_id = getattr(node, 'id', None) or getattr(node, 'node_id', None)
-                node_type = getattr(node, 'type', None) or getattr(node, 'node_type', None)
-                label = getattr(node, 'label', '')
-                position = getattr(node, 'position', {})
-                if isinstance(position, dict):
-                    position_x = position.get('x', 0)
-                    position_y = position.get('y', 0)
-                else:
-                    position_x = getattr(position, 'x', 0)
-                    position_y = getattr(position, 'y', 0)
-                data = getattr(node, 'data', {})
-
-            if not node_id:
-                continue  # Skip nodes without an ID
-
-            node_data = {
-                'workflow_id': workflow_id,
-                'node_id': str(node_id),
-                'node_type': node_type or 'default',
-                'label': label,
-                'position_x': position_x,
-                'position_y': position_y,
-                'data': data
-            }
-            nodes_data.append(node_data)
-        
-        if nodes_data:
-            nodes_response = supabase.table('workflow_nodes').insert(nodes_data).execute()
-            # Convert IDs to strings in node response
-            nodes = []
-            for node in nodes_response.data:
-                node['id'] = str(node['id'])
-                node['workflow_id'] = str(node['workflow_id'])
-                nodes.append(node)
-            result['nodes'] = nodes
-    else:
-        result['nodes'] = []
+    # Create nodes and edges if any
+    nodes = []
+    nodes_data = _extract_node_rows(workflow.nodes, workflow_id)
+    if nodes_data:
+        nodes = supabase.table('workflow_nodes').insert(nodes_data).execute().data
     
-    # Create edges if any
-    edges_data = []
-    if workflow.edges:
-        for edge in workflow.edges:
-            # Handle both dictionary and model cases
-            if isinstance(edge, dict):
-                edge_id = edge.get('id') or edge.get('edge_id')
-                source = edge.get('source')
-                target = edge.get('target')
-            else:
-                edge_id = getattr(edge, 'id', None) or getattr(edge, 'edge_id', None)
-                source = getattr(edge, 'source', None)
-                target = getattr(edge, 'target', None)
-
-            if not edge_id or not source or not target:
-                continue  # Skip edges without required fields
-
-            edge_data = {
-                'workflow_id': workflow_id,
-                'edge_id': str(edge_id),
-                'source': str(source),
-                'target': str(target)
-            }
-            edges_data.append(edge_data)
-        
-        if edges_data:
-            edges_response = supabase.table('workflow_edges').insert(edges_data).execute()
-            # Convert IDs to strings in edge response
-            edges = []
-            for edge in edges_response.data:
-                edge['id'] = str(edge['id'])
-                edge['workflow_id'] = str(edge['workflow_id'])
-                edges.append(edge)
-            result['edges'] = edges
-    else:
-        result['edges'] = []
+    edges = []
+    edges_data = _extract_edge_rows(workflow.edges, workflow_id)
+    if edges_data:
+        edges = supabase.table('workflow_edges').insert(edges_data).execute().data
     
-    return result
+    return _normalize_workflow(result, nodes, edges)
+
 
+def update_workflow(
+    workflow_id: UUID,
+    workflow_data: WorkflowUpdate,
+    user_id: UUID,
+    expected_version: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Update workflow.
 
-def update_workflow(workflow_id: UUID, workflow_data: WorkflowUpdate, user_id: UUID) -> Optional[dict]:
-    """Update workflow"""
+    If ``expected_version`` is given the update only succeeds when it matches the
+    stored version. The version is bumped with a compare-and-swap on the version
+    column, so concurrent writers are detected even without ``expected_version``.
+    """
     supabase = get_supabase_client()
-    
-    # Check if workflow exists and belongs to user
-    existing = supabase.table('workflows').select('*').eq('id', str(workflow_id)).eq('user_id', str(user_id)).single().execute()
-    if not existing.data:
-        return None
-    
-    # Update workflow
+
     update_data = {k: v for k, v in workflow_data.dict(exclude_unset=True).items() 
                   if k not in ('nodes', 'edges')}
+
+    if expected_version is None:
+        # Check if workflow exists and belongs to user
+        current_version = get_workflow_version(workflow_id, user_id)
+        if current_version is None:
+            return None
+    else:
+        # The client told us which version it read, so go straight to the
+        # conditional update and only look the workflow up if it fails
+        current_version = expected_version
+    
+    # Update workflow
+    update_data['version'] = current_version + 1
     
-    workflow_response = supabase.table('workflows').update(update_data).eq('id', str(workflow_id)).execute()
+    workflow_response = (
+        supabase.table('workflows')
+        .update(update_data)
+        .eq('id', str(workflow_id))
+        .eq('user_id', str(user_id))
+        .eq('version', current_version)
+        .execute()
+    )
     if not workflow_response.data:
-        return None
+        if expected_version is not None:
+            stored_version = get_workflow_version(workflow_id, user_id)
+            if stored_version is None:
+                return None
+            raise WorkflowVersionConflict(
+                f"Workflow version mismatch: expected {expected_version}, current {stored_version}"
+            )
+        # Another writer bumped the version between our read and our write
+        raise WorkflowVersionConflict(
+            f"Workflow was modified concurrently (version {current_version} is stale)"
+        )
         
     result = workflow_response.data[0]
-    result['id'] = str(result['id'])
-    result['user_id'] = str(result['user_id'])
     
     # Update nodes if provided
     if workflow_data.nodes is not None:
@@ -231,68 +261,12 @@ def update_workflow(workflow_id: UUID, workflow_data: WorkflowUpdate, user_id: U
         supabase.table('workflow_nodes').delete().eq('workflow_id', str(workflow_id)).execute()
         
         # Create new nodes
-        nodes_data = []
-        for node in workflow_data.nodes:
-            # Handle both dictionary and model cases
-            if isinstance(node, dict):
-                node_id = node.get('id') or node.get('node_id')
-                node_type = node.get('type') or node.get('node_type')
-                label = node.get('label', '')
-                position = node.get('position', {})
-                if isinstance(position, dict):
-                    position_x = position.get('x', 0)
-                    position_y = position.get('y', 0)
-                else:
-                    position_x = getattr(position, 'x', 0)
-                    position_y = getattr(position, 'y', 0)
-                data = node.get('data', {})
-            else:
-                node_id = getattr(node, 'id', None) or getattr(node, 'node_id', None)
-                node_type = getattr(node, 'type', None) or getattr(node, 'node_type', None)
-                label = getattr(node, 'label', '')
-                position = getattr(node, 'position', {})
-                if isinstance(position, dict):
-                    position_x = position.get('x', 0)
-                    position_y = position.get('y', 0)
-                else:
-                    position_x = getattr(position, 'x', 0)
-                    position_y = getattr(position, 'y', 0)
-                data = getattr(node, 'data', {})
-
-            if not node_id:
-                continue  # Skip nodes without an ID
-
-            node_data = {
-                'workflow_id': str(workflow_id),
-                'node_id': str(node_id),
-                'node_type': node_type or 'default',
-                'label': label,
-                'position_x': position_x,
-                'position_y': position_y,
-                'data': data
-            }
-            nodes_data.append(node_data)
-        
+        nodes_data = _extract_node_rows(workflow_data.nodes, str(workflow_id))
+        nodes = []
         if nodes_data:
-            nodes_response = supabase.table('workflow_nodes').insert(nodes_data).execute()
-            # Convert IDs to strings in node response
-            nodes = []
-            for node in nodes_response.data:
-                node['id'] = str(node['id'])
-                node['workflow_id'] = str(node['workflow_id'])
-                nodes.append(node)
-            result['nodes'] = nodes
-        else:
-            result['nodes'] = []
+            nodes = supabase.table('workflow_nodes').insert(nodes_data).execute().data
     else:
-        # Get existing nodes
-        nodes_response = supabase.table('workflow_nodes').select('*').eq('workflow_id', str(workflow_id)).execute()
-        nodes = []
-        for node in nodes_response.data:
-            node['id'] = str(node['id'])
-            node['workflow_id'] = str(node['workflow_id'])
-            nodes.append(node)
-        result['nodes'] = nodes
+        nodes = None
     
     # Update edges if provided
     if workflow_data.edges is not None:
@@ -300,51 +274,37 @@ def update_workflow(workflow_id: UUID, workflow_data: WorkflowUpdate, user_id: U
         supabase.table('workflow_edges').delete().eq('workflow_id', str(workflow_id)).execute()
         
         # Create new edges
-        edges_data = []
-        for edge in workflow_data.edges:
-            # Handle both dictionary and model cases
-            if isinstance(edge, dict):
-                edge_id = edge.get('id') or edge.get('edge_id')
-                source = edge.get('source')
-                target = edge.get('target')
-            else:
-                edge_id = getattr(edge, 'id', None) or getattr(edge, 'edge_id', None)
-                source = getattr(edge, 'source', None)
-                target = getattr(edge, 'target', None)
-
-            if not edge_id or not source or not target:
-                continue  # Skip edges without required fields
-
-            edge_data = {
-                'workflow_id': str(workflow_id),
-                'edge_id': str(edge_id),
-                'source': str(source),
-                'target': str(target)
-            }
-            edges_data.append(edge_data)
-        
+        edges_data = _extract_edge_rows(workflow_data.edges, str(workflow_id))
+        edges = []
         if edges_data:
-            edges_response = supabase.table('workflow_edges').insert(edges_data).execute()
-            # Convert IDs to strings in edge response
-            edges = []
-            for edge in edges_response.data:
-                edge['id'] = str(edge['id'])
-                edge['workflow_id'] = str(edge['workflow_id'])
-                edges.append(edge)
-            result['edges'] = edges
-        else:
-            result['edges'] = []
+            edges = supabase.table('workflow_edges').insert(edges_data).execute().data
     else:
-        # Get existing edges
-        edges_response = supabase.table('workflow_edges').select('*').eq('workflow_id', str(workflow_id)).execute()
-        edges = []
-        for edge in edges_response.data:
-            edge['id'] = str(edge['id'])
-            edge['workflow_id'] = str(edge['workflow_id'])
-            edges.append(edge)
-        result['edges'] = edges
+        edges = None
+
+    # Load whatever part of the graph was left untouched in one embedded select
+    embeds = [name for name, rows in (('workflow_nodes(*)', nodes), ('workflow_edges(*)', edges)) if rows is None]
+    if embeds:
+        graph = supabase.table('workflows').select(', '.join(embeds)).eq('id', str(workflow_id)).single().execute().data
+        if nodes is None:
+            nodes = graph.get('workflow_nodes') or []
+        if edges is None:
+            edges = graph.get('workflow_edges') or []
     
-    return result
+    return _normalize_workflow(result, nodes, edges)
+
+
+def clone_workflow(workflow_id: UUID, user_id: UUID, name: Optional[str] = None) -> Optional[str]:
+    """
+    Clone a workflow with its nodes and edges inside the database.
+    Returns the new workflow ID, or None if the source is not accessible.
+    """
+    supabase = get_supabase_client()
+    response = supabase.rpc('clone_workflow', {
+        'source_workflow_id': str(workflow_id),
+        'new_owner_id': str(user_id),
+        'new_name': name,
+    }).execute()
+    return str(response.data) if response.data else None
 
 
 def delete_workflow(workflow_id: UUID, user_id: UUID) -> bool:
@@ -360,6 +320,133 @@ def delete_workflow(workflow_id: UUID, user_id: UUID) -> bool:
     return bool(response.data)
 
 
+# Bulk import/export tuning: workflows per page/batch and graph rows per insert
+WORKFLOW_BATCH_SIZE = 50
+GRAPH_INSERT_CHUNK_SIZE = 1000
+# Rejected lines reported in detail by an import; the rest are only counted
+MAX_IMPORT_ERRORS = 100
+
+
+def export_user_workflows(user_id: UUID, batch_size: int = WORKFLOW_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yield all workflows of a user with their nodes and edges.
+    Workflows are fetched one page at a time, so memory stays bounded by the page size.
+    """
+    supabase = get_supabase_client()
+    offset = 0
+    while True:
+        response = (
+            supabase.table('workflows')
+            .select(WORKFLOW_WITH_GRAPH)
+            .eq('user_id', str(user_id))
+            .order('id')
+            .range(offset, offset + batch_size - 1)
+            .execute()
+        )
+        for row in response.data:
+            yield _normalize_workflow(row)
+        if len(response.data) < batch_size:
+            break
+        offset += batch_size
+
+
+def _insert_in_chunks(supabase, table: str, rows: List[dict]) -> None:
+    """Multi-row insert without returning the inserted rows"""
+    for start in range(0, len(rows), GRAPH_INSERT_CHUNK_SIZE):
+        supabase.table(table).insert(
+            rows[start:start + GRAPH_INSERT_CHUNK_SIZE], returning=ReturnMethod.minimal
+        ).execute()
+
+
+def _import_workflow_batch(supabase, records: List[dict], user_id: UUID, created: List[str]) -> None:
+    """
+    Insert a batch of exported workflow records with one insert per table.
+    The ids of the inserted workflows are appended to `created`.
+    """
+    workflows_data = []
+    nodes_data = []
+    edges_data = []
+    for record in records:
+        # Ids are assigned here so nodes and edges can reference their workflow
+        # without reading the inserted workflows back
+        workflow_id = str(uuid4())
+        workflows_data.append({
+            'id': workflow_id,
+            'name': record['name'],
+            'description': record.get('description'),
+            'user_id': str(user_id),
+            'data': record.get('data') or {},
+            'is_public': bool(record.get('is_public', False)),
+            'total_carbon_footprint': record.get('total_carbon_footprint') or 0.0,
+        })
+        nodes_data.extend(_extract_node_rows(record.get('nodes'), workflow_id))
+        edges_data.extend(_extract_edge_rows(record.get('edges'), workflow_id))
+
+    _insert_in_chunks(supabase, 'workflows', workflows_data)
+    created.extend(workflow['id'] for workflow in workflows_data)
+    _insert_in_chunks(supabase, 'workflow_nodes', nodes_data)
+    _insert_in_chunks(supabase, 'workflow_edges', edges_data)
+
+
+def import_workflows(
+    lines: Iterable[bytes],
+    user_id: UUID,
+    batch_size: int = WORKFLOW_BATCH_SIZE,
+    max_errors: int = MAX_IMPORT_ERRORS,
+) -> dict:
+    """
+    Create workflows from NDJSON lines (one exported workflow per line).
+
+    Lines are consumed lazily and written in batches of ``batch_size`` workflows,
+    so memory stays bounded regardless of the input size. Invalid lines are
+    skipped and counted, and the first ``max_errors`` of them are reported,
+    instead of aborting the import.
+
+    Each batch is committed as it is written, so the import is not atomic: when
+    reading the input or an insert fails, the workflows created so far are kept
+    and WorkflowImportError carries their ids.
+    """
+    supabase = get_supabase_client()
+    created: List[str] = []
+    errors = []
+    rejected = 0
+    batch = []
+
+    def reject(line_number: int, error: str):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < max_errors:
+            errors.append({'line': line_number, 'error': error})
+
+    def result() -> dict:
+        return {'imported': len(created), 'workflow_ids': created, 'rejected': rejected, 'errors': errors}
+
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                reject(line_number, f"Invalid JSON: {str(e)}")
+                continue
+            if not isinstance(record, dict) or not record.get('name'):
+                reject(line_number, "Workflow record must have a name")
+                continue
+
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _import_workflow_batch(supabase, batch, user_id, created)
+                batch = []
+
+        if batch:
+            _import_workflow_batch(supabase, batch, user_id, created)
+    except Exception as e:
+        raise WorkflowImportError(str(e), result()) from e
+
+    return result()
+
+
 def calculate_carbon_footprint(workflow_id: UUID) -> float:
     """Calculate total carbon footprint for workflow"""
     # This is a placeholder implementation
@@ -373,10 +460,7 @@ def create_workflow_node(node: WorkflowNodeCreate, workflow_id: UUID) -> dict:
     node_data = node.model_dump()
     node_data['workflow_id'] = str(workflow_id)
     response = supabase.table('workflow_nodes').insert(node_data).execute()
-    result = response.data[0]
-    result['id'] = str(result['id']) if result.get('id') else None
-    result['workflow_id'] = str(result['workflow_id']) if result.get('workflow_id') else None
-    return result
+    return _normalize_graph_row(response.data[0])
 
 
 def update_workflow_node(node_id: UUID, node_data: WorkflowNodeUpdate) -> Optional[dict]:
@@ -386,10 +470,7 @@ def update_workflow_node(node_id: UUID, node_data: WorkflowNodeUpdate) -> Option
     response = supabase.table('workflow_nodes').update(update_data).eq('id', str(node_id)).execute()
     if not response.data:
         return None
-    result = response.data[0]
-    result['id'] = str(result['id']) if result.get('id') else None
-    result['workflow_id'] = str(result['workflow_id']) if result.get('workflow_id') else None
-    return result
+    return _normalize_graph_row(response.data[0])
 
 
 def create_workflow_edge(edge: WorkflowEdgeCreate, workflow_id: UUID) -> dict:
@@ -398,10 +479,7 @@ def create_workflow_edge(edge: WorkflowEdgeCreate, workflow_id: UUID) -> dict:
     edge_data = edge.model_dump()
     edge_data['workflow_id'] = str(workflow_id)
     response = supabase.table('workflow_edges').insert(edge_data).execute()
-    result = response.data[0]
-    result['id'] = str(result['id']) if result.get('id') else None
-    result['workflow_id'] = str(result['workflow_id']) if result.get('workflow_id') else None
-    return result
+    return _normalize_graph_row(response.data[0])
 
 
 def update_workflow_edge(edge_id: UUID, edge_data: WorkflowEdgeUpdate) -> Optional[dict]:
@@ -411,7 +489,4 @@ def update_workflow_edge(edge_id: UUID, edge_data: WorkflowEdgeUpdate) -> Option
     response = supabase.table('workflow_edges').update(update_data).eq('id', str(edge_id)).execute()
     if not response.data:
         return None
-    result = response.data[0]
-    result['id'] = str(result['id']) if result.get('id') else None
-    result['workflow_id'] = str(result['workflow_id']) if result.get('workflow_id') else None
-    return result
+    return _normalize_graph_row(response.data[0])
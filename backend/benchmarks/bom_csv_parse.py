@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark parsing of LLM BOM output with bom_csv_service.parse_bom_csv.
+
+Builds synthetic LLM responses (code fence, commentary, unquoted commas in
+supplier names, dropped trailing cells, unparseable weights) at growing sizes
+and reports the parse time per row, which should stay flat as rows grow.
+
+Usage (from the backend directory):
+    python -m benchmarks.bom_csv_parse --rows 1000 10000 100000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from app.services.bom_csv_service import STANDARD_HEADER, parse_bom_csv
+
+
+def build_response(row_count: int) -> str:
+    """A response shaped like real LLM output, with a mix of malformed rows"""
+    lines = ["好的，以下是标准化后的BOM：", "```csv", ",".join(STANDARD_HEADER)]
+    for i in range(row_count):
+        if i % 10 == 0:
+            lines.append(f"{i},零件{i},钢,{i * 1.5},2,ACME, Inc.,1.8,")  # unquoted comma
+        elif i % 10 == 1:
+            lines.append(f"{i},零件{i},铝,{i}.25,1,供应商{i}")  # trailing cells dropped
+        elif i % 50 == 2:
+            lines.append(f"{i},零件{i},铝,未知,1,,,")  # fails, re-asked to the LLM
+        else:
+            lines.append(f'{i},零件{i},塑料,"1,{i:03d}.5",3,供应商{i},2.4,"单位重量: 2g, 数量: 3"')
+    lines += ["```", "以上数据中部分重量为估算值。"]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for row_count in args.rows:
+        response = build_response(row_count)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = parse_bom_csv(response.splitlines())
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        print(
+            f"rows={row_count:<7d} median={median * 1000:.1f}ms "
+            f"per_row={median / row_count * 1e6:.2f}us "
+            f"parsed={len(result.rows)} repaired={result.repaired} failed={len(result.failed)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
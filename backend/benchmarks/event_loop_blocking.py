@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Load test showing how blocking Supabase calls affect concurrent requests.
+
+Fires concurrent GET /api/v1/workflows/ requests whose data access is
+simulated with a blocking sleep (the supabase-py client is synchronous),
+while a probe measures how late the event loop wakes up a task that sleeps
+for 10ms, standing in for an LLM stream sharing the loop. Runs twice: with the blocking call made
+directly on the event loop (previous behavior) and offloaded to the thread
+pool (current behavior).
+
+Usage (from the backend directory):
+    python -m benchmarks.event_loop_blocking --requests 50 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# The app validates its settings on import; no request below reaches Supabase
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+# supabase-py only accepts JWT-shaped keys
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark")
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/benchmark")
+
+import httpx
+
+from app.api import deps
+from app.api.endpoints import workflows
+from app.main import app
+from app.schemas.user import UserResponse
+
+USER = UserResponse(id="00000000-0000-0000-0000-000000000001", email="bench@example.com")
+
+
+async def _run_inline(func, *args, **kwargs):
+    """Previous behavior: call the blocking function on the event loop"""
+    return func(*args, **kwargs)
+
+
+def _slow_workflows(latency: float):
+    def get_user_workflows(user_id, skip=0, limit=100):
+        time.sleep(latency)
+        return []
+    return get_user_workflows
+
+
+async def _probe(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(mode: str, request_count: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        stop = asyncio.Event()
+        lags = []
+        probe = asyncio.create_task(_probe(stop, lags))
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get("/api/v1/workflows/") for _ in range(request_count))
+        )
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe
+    assert all(response.status_code == 200 for response in responses)
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "lag_median": statistics.median(lags),
+        "lag_max": max(lags),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="simulated DB round trip in seconds")
+    args = parser.parse_args()
+
+    app.dependency_overrides[deps.get_current_user] = lambda: USER
+    workflows.get_user_workflows = _slow_workflows(args.latency)
+    offload = workflows.run_in_threadpool
+
+    for mode, runner in (("blocking", _run_inline), ("offload", offload)):
+        workflows.run_in_threadpool = runner
+        result = asyncio.run(run(mode, args.requests))
+        print(
+            f"{result['mode']:8s} requests={args.requests} latency={args.latency * 1000:.0f}ms "
+            f"total={result['elapsed'] * 1000:.0f}ms "
+            f"loop_lag_median={result['lag_median'] * 1000:.1f}ms "
+            f"loop_lag_max={result['lag_max'] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
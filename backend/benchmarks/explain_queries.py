@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Capture EXPLAIN ANALYZE plans for the queries behind the API endpoints.
+
+Optionally seeds a local Postgres (schema from the Alembic migrations) with
+synthetic users, workflows, graphs, BOM files and vendor tasks, then prints
+the plan of each endpoint query. Run it before and after a migration to
+compare plans. Never point --seed at a shared database.
+
+Usage (from the backend directory):
+    python -m benchmarks.explain_queries --dsn postgresql://postgres@localhost/esg --seed
+    python -m benchmarks.explain_queries --dsn ... --summary
+"""
+import argparse
+import re
+
+import psycopg2
+
+from app.services.pg_repository import (
+    PENDING_VENDOR_TASKS_SQL,
+    USER_BOM_FILES_SQL,
+    USER_WORKFLOWS_SQL,
+    WORKFLOW_BY_ID_SQL,
+)
+
+# (name, SQL with $n placeholders, parameter query). Statements are PREPAREd so
+# the plans match what PostgREST and asyncpg run with bound parameters.
+ENDPOINT_QUERIES = [
+    (
+        "GET /workflows (list with graph)",
+        USER_WORKFLOWS_SQL,
+        "SELECT user_id, 0, 100 FROM workflows LIMIT 1",
+    ),
+    (
+        "GET /workflows/{id} (detail with graph)",
+        WORKFLOW_BY_ID_SQL,
+        "SELECT id, user_id FROM workflows LIMIT 1",
+    ),
+    (
+        "GET /workflows/{id} If-None-Match (version only)",
+        "SELECT version FROM workflows WHERE id = $1 AND user_id = $2",
+        "SELECT id, user_id FROM workflows LIMIT 1",
+    ),
+    (
+        "PUT /workflows/{id} (replace nodes)",
+        "SELECT id FROM workflow_nodes WHERE workflow_id = $1",
+        "SELECT workflow_id FROM workflow_nodes LIMIT 1",
+    ),
+    (
+        "node upsert lookup (workflow_id, node_id)",
+        "SELECT id FROM workflow_nodes WHERE workflow_id = $1 AND node_id = $2",
+        "SELECT workflow_id, node_id FROM workflow_nodes LIMIT 1",
+    ),
+    (
+        "edge upsert lookup (workflow_id, edge_id)",
+        "SELECT id FROM workflow_edges WHERE workflow_id = $1 AND edge_id = $2",
+        "SELECT workflow_id, edge_id FROM workflow_edges LIMIT 1",
+    ),
+    (
+        "GET /boms",
+        USER_BOM_FILES_SQL,
+        "SELECT user_id, 0, 100 FROM bom_files LIMIT 1",
+    ),
+    (
+        "GET /vendor-tasks/pending",
+        PENDING_VENDOR_TASKS_SQL,
+        None,
+    ),
+]
+
+SEED_SQL = """
+SET session_replication_role = replica;  -- skip the auth.users foreign key
+
+INSERT INTO users (id, email)
+SELECT md5('user' || u)::uuid, 'user' || u || '@example.com'
+FROM generate_series(1, %(users)s) u;
+
+INSERT INTO workflows (id, user_id, name, data, updated_at)
+SELECT md5('wf' || u || '-' || w)::uuid, md5('user' || u)::uuid, 'Workflow ' || w, '{}'::jsonb,
+       now() - (random() * interval '365 days')
+FROM generate_series(1, %(users)s) u, generate_series(1, %(workflows)s) w;
+
+INSERT INTO workflow_nodes (workflow_id, node_id, node_type, label, position_x, position_y, data)
+SELECT w.id, 'node-' || n, 'product', 'Node ' || n, n * 40, 0, jsonb_build_object('weight', n)
+FROM workflows w, generate_series(1, %(nodes)s) n;
+
+INSERT INTO workflow_edges (workflow_id, edge_id, source, target)
+SELECT w.id, 'edge-' || n, 'node-' || n, 'node-' || (n + 1)
+FROM workflows w, generate_series(1, %(nodes)s - 1) n;
+
+INSERT INTO bom_files (user_id, title, file_path, content, file_type, updated_at)
+SELECT md5('user' || u)::uuid, 'bom-' || b || '.csv', 'bom_files/' || u || '/' || b, 'a,b,c', 'csv',
+       now() - (random() * interval '365 days')
+FROM generate_series(1, %(users)s) u, generate_series(1, %(boms)s) b;
+
+-- Most tasks are finished; only a small share stays pending
+INSERT INTO vendor_tasks (workflow_id, product_id, product_name, vendor, status, created_at)
+SELECT w.id, 'product-' || t, 'Product ' || t, 'Vendor',
+       (CASE WHEN random() < %(pending_ratio)s THEN 'pending' ELSE 'completed' END)::task_status,
+       now() - (random() * interval '365 days')
+FROM workflows w, generate_series(1, %(tasks)s) t;
+
+SET session_replication_role = DEFAULT;
+ANALYZE;
+"""
+
+
+def seed(cursor, args):
+    cursor.execute(SEED_SQL, {
+        "users": args.users,
+        "workflows": args.workflows,
+        "nodes": args.nodes,
+        "boms": args.boms,
+        "tasks": args.tasks,
+        "pending_ratio": args.pending_ratio,
+    })
+
+
+def explain(cursor, name: str, sql: str, params_sql: str, summary: bool):
+    params = ()
+    if params_sql:
+        cursor.execute(params_sql)
+        params = cursor.fetchone() or ()
+
+    cursor.execute("DEALLOCATE ALL")
+    placeholders = len(set(re.findall(r"\$\d+", sql)))
+    cursor.execute(f"PREPARE q AS {sql}")
+    args = ", ".join(["%s"] * placeholders)
+    execute = f"EXECUTE q({args})" if placeholders else "EXECUTE q"
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {execute}", params[:placeholders])
+    plan = [row[0] for row in cursor.fetchall()]
+
+    print(f"== {name}")
+    if summary:
+        timing = next((line for line in plan if line.startswith("Execution Time")), "")
+        # Top plan node plus every scan, which is where the index choice shows up
+        scans = [line.strip() for line in plan[1:] if "Scan" in line]
+        print(f"   {plan[0].strip()}")
+        for line in scans:
+            print(f"   {line}")
+        print(f"   {timing}")
+    else:
+        for line in plan:
+            print(f"   {line}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--seed", action="store_true", help="insert synthetic data first")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--workflows", type=int, default=50, help="workflows per user")
+    parser.add_argument("--nodes", type=int, default=30, help="nodes per workflow")
+    parser.add_argument("--boms", type=int, default=50, help="BOM files per user")
+    parser.add_argument("--tasks", type=int, default=10, help="vendor tasks per workflow")
+    parser.add_argument("--pending-ratio", type=float, default=0.02)
+    parser.add_argument("--summary", action="store_true", help="print scans and timing only")
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(args.dsn)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        if args.seed:
+            seed(cursor, args)
+        for name, sql, params_sql in ENDPOINT_QUERIES:
+            explain(cursor, name, sql, params_sql, args.summary)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare hot read latency of the PostgREST and asyncpg read backends.
+
+Runs the workflow list/detail, BOM list and pending vendor task queries for a
+user through both paths against the configured SUPABASE_URL and DATABASE_URL.
+
+Usage (from the backend directory):
+    python -m benchmarks.hot_reads --user-id <uuid> --repeat 50
+    python -m benchmarks.hot_reads --user-id <uuid> --skip-postgrest
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import database
+from app.core.config import settings
+from app.core.supabase import get_supabase_client
+from app.services import pg_repository, workflow_service
+
+
+def _postgrest_bom_files(user_id, skip=0, limit=100):
+    supabase = get_supabase_client()
+    return supabase.table('bom_files').select('*').eq('user_id', str(user_id)).range(skip, skip + limit).execute().data
+
+
+def _postgrest_pending_tasks():
+    supabase = get_supabase_client()
+    return supabase.table('vendor_tasks').select('*').eq('status', 'pending').execute().data
+
+
+async def _time(func, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run(user_id: str, repeat: int, skip_postgrest: bool):
+    settings.DATABASE_READ_BACKEND = "asyncpg"
+    await database.init_pool()
+    try:
+        workflows = await pg_repository.get_user_workflows(user_id, 0, 1)
+        workflow_id = workflows[0]["id"] if workflows else None
+
+        queries = {
+            "workflow_list": (
+                lambda: pg_repository.get_user_workflows(user_id),
+                lambda: run_in_threadpool(workflow_service.get_user_workflows, user_id),
+            ),
+            "bom_list": (
+                lambda: pg_repository.get_user_bom_files(user_id),
+                lambda: run_in_threadpool(_postgrest_bom_files, user_id),
+            ),
+            "pending_tasks": (
+                pg_repository.get_pending_vendor_tasks,
+                lambda: run_in_threadpool(_postgrest_pending_tasks),
+            ),
+        }
+        if workflow_id:
+            queries["workflow_detail"] = (
+                lambda: pg_repository.get_workflow_by_id(workflow_id, user_id),
+                lambda: run_in_threadpool(workflow_service.get_workflow_by_id, workflow_id, user_id),
+            )
+
+        for name, (asyncpg_query, postgrest_query) in queries.items():
+            backends = [("asyncpg", asyncpg_query)]
+            if not skip_postgrest:
+                backends.append(("postgrest", postgrest_query))
+            for backend, query in backends:
+                await query()  # warm up connections and the statement cache
+                timings = await _time(query, repeat)
+                print(
+                    f"{name:16s} {backend:9s} "
+                    f"median={statistics.median(timings) * 1000:.2f}ms "
+                    f"p95={sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.2f}ms"
+                )
+    finally:
+        await database.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--skip-postgrest", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.user_id, args.repeat, args.skip_postgrest))
+
+
+if __name__ == "__main__":
+    main()
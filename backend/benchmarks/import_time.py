@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure how long a fresh worker takes to import the application.
+
+Each run starts a new interpreter with `-X importtime`, imports app.main and
+reports the wall time. The slowest modules by cumulative import time from the
+last run are listed so regressions (a heavy library imported at module level)
+are easy to spot. Pass --startup to also time the lifespan handler.
+
+Usage (from the backend directory):
+    python -m benchmarks.import_time --runs 5
+    python -m benchmarks.import_time --top 30 --startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+print(f"IMPORT_MS {(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+STARTUP_SNIPPET = IMPORT_SNIPPET + """
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+with TestClient(app.main.app):
+    print(f"STARTUP_MS {(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def _run_once(startup: bool):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET if startup else IMPORT_SNIPPET],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(" ")
+        if key in ("IMPORT_MS", "STARTUP_MS"):
+            timings[key] = float(value)
+
+    # "import time: self [us] | cumulative | imported package"
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.rstrip()))
+    return timings, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest modules to list")
+    parser.add_argument("--startup", action="store_true", help="also time the lifespan handler")
+    args = parser.parse_args()
+
+    runs = [_run_once(args.startup) for _ in range(args.runs)]
+    for key in ("IMPORT_MS", "STARTUP_MS"):
+        values = [timings[key] for timings, _ in runs if key in timings]
+        if values:
+            label = key.split("_")[0].lower()
+            print(f"{label:8s} median={statistics.median(values):.1f}ms min={min(values):.1f}ms max={max(values):.1f}ms")
+
+    print("\nslowest modules (cumulative, last run):")
+    for cumulative, name in sorted(runs[-1][1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms {name}")
+
+
+if __name__ == "__main__":
+    main()
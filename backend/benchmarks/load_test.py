@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure throughput of the production server with increasing worker counts.
+
+For each worker count the script starts `python -m app.server` on a local
+port, hammers one path with concurrent keep-alive connections for a fixed
+duration and prints requests/second and latency percentiles. The load
+generator runs on the same machine, so leave it a core or two: scaling flattens
+once the workers and the generator compete for CPUs.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --workers 1 2 4 --duration 15
+    python -m benchmarks.load_test --path /api/v1/openapi.json --concurrency 128
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.server import default_workers
+
+
+async def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"server did not start within {timeout:.0f}s")
+
+
+async def _load(url: str, concurrency: int, duration: float) -> tuple:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def user():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.monotonic()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def run(workers: int, port: int, path: str, concurrency: int, duration: float):
+    env = dict(os.environ, SERVER_WORKERS=str(workers), SERVER_PORT=str(port), SERVER_HOST="127.0.0.1")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        asyncio.run(_wait_ready(url))
+        asyncio.run(_load(url, concurrency, 2.0))  # warm up every worker
+        latencies, errors, elapsed = asyncio.run(_load(url, concurrency, duration))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies.sort()
+    print(
+        f"workers={workers:<3d} "
+        f"rps={len(latencies) / elapsed:8.1f} "
+        f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f}ms "
+        f"errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts to try (default: 1 up to the CPU count)")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    worker_counts = args.workers
+    if not worker_counts:
+        cpus = default_workers()
+        worker_counts = sorted({1, *(n for n in (2, 4, 8, 16) if n <= cpus), cpus})
+
+    print(f"{args.concurrency} connections, GET {args.path}, {args.duration:.0f}s per run, {default_workers()} CPUs")
+    for workers in worker_counts:
+        run(workers, args.port, args.path, args.concurrency, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark workflow row normalization and response serialization.
+
+Compares the previous path (ids stringified in the service, again in the
+endpoint, then encoded with the stdlib json module) with the single-pass
+normalization in workflow_service plus orjson, on a synthetic workflow.
+
+Usage (from the backend directory):
+    python -m benchmarks.workflow_serialization --nodes 10000 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas.workflow import Workflow
+from app.services.workflow_service import _normalize_workflow
+
+workflow_adapter = TypeAdapter(Workflow)
+
+
+def build_rows(node_count: int) -> dict:
+    """Build a workflow row shaped like a PostgREST embedded select result"""
+    workflow_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    nodes = [
+        {
+            "id": str(uuid.uuid4()),
+            "workflow_id": workflow_id,
+            "node_id": f"node-{i}",
+            "node_type": "product",
+            "label": f"Component {i}",
+            "position_x": float(i % 100) * 40,
+            "position_y": float(i // 100) * 40,
+            "data": {"productName": f"Component {i}", "weight": i * 1.5, "carbonFactor": 0.8},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(node_count)
+    ]
+    edges = [
+        {
+            "id": str(uuid.uuid4()),
+            "workflow_id": workflow_id,
+            "edge_id": f"edge-{i}",
+            "source": f"node-{i}",
+            "target": f"node-{i + 1}",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(node_count - 1)
+    ]
+    return {
+        "id": workflow_id,
+        "user_id": str(uuid.uuid4()),
+        "name": "benchmark",
+        "description": None,
+        "data": {},
+        "is_public": False,
+        "total_carbon_footprint": 0.0,
+        "version": 1,
+        "created_at": now,
+        "updated_at": now,
+        "workflow_nodes": nodes,
+        "workflow_edges": edges,
+    }
+
+
+def legacy_path(row: dict) -> bytes:
+    """Service loop, endpoint loop, response model, stdlib json"""
+    row["id"] = str(row["id"])
+    row["user_id"] = str(row["user_id"])
+    nodes = []
+    for node in row.pop("workflow_nodes"):
+        node["id"] = str(node["id"])
+        node["workflow_id"] = str(node["workflow_id"])
+        nodes.append(node)
+    row["nodes"] = nodes
+    edges = []
+    for edge in row.pop("workflow_edges"):
+        edge["id"] = str(edge["id"])
+        edge["workflow_id"] = str(edge["workflow_id"])
+        edges.append(edge)
+    row["edges"] = edges
+
+    row["id"] = str(row["id"]) if row.get("id") else None
+    row["user_id"] = str(row["user_id"]) if row.get("user_id") else None
+    row["data"] = row.get("data", {})
+    row["nodes"] = row.get("nodes", [])
+    row["edges"] = row.get("edges", [])
+
+    content = workflow_adapter.dump_python(workflow_adapter.validate_python(row), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def current_path(row: dict) -> bytes:
+    """Single-pass normalization, response model, orjson"""
+    row = _normalize_workflow(row)
+    content = workflow_adapter.dump_python(workflow_adapter.validate_python(row), mode="json")
+    return orjson.dumps(content)
+
+
+def run(func, node_count: int, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        row = build_rows(node_count)
+        start = time.perf_counter()
+        func(row)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, func in (("legacy", legacy_path), ("current", current_path)):
+        timings = run(func, args.nodes, args.repeat)
+        print(
+            f"{name:8s} nodes={args.nodes} "
+            f"median={statistics.median(timings) * 1000:.1f}ms "
+            f"min={min(timings) * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Add workflow version column
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-04-02 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Monotonically increasing version, bumped on every workflow update.
+    # Used for ETag / If-Match handling in the workflows API.
+    op.execute("""
+        ALTER TABLE workflows
+        ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1
+    """)
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE workflows DROP COLUMN IF EXISTS version')
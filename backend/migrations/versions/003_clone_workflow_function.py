@@ -0,0 +1,70 @@
+"""Add clone_workflow SQL function
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-04-05 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Copy a workflow with its nodes and edges inside the database, in one
+    # transaction. Node/edge rows get new primary keys and the new workflow_id;
+    # the frontend node_id/edge_id values are scoped per workflow and kept, so
+    # edge source/target references stay valid. The source must belong to the
+    # new owner or be public. Returns NULL when the source is not accessible.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION clone_workflow(
+            source_workflow_id UUID,
+            new_owner_id UUID,
+            new_name TEXT DEFAULT NULL
+        )
+        RETURNS UUID
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            new_workflow_id UUID := uuid_generate_v4();
+        BEGIN
+            INSERT INTO workflows (id, name, description, user_id, data, is_public, total_carbon_footprint)
+            SELECT new_workflow_id,
+                   COALESCE(new_name, name || ' (copy)'),
+                   description,
+                   new_owner_id,
+                   data,
+                   FALSE,
+                   total_carbon_footprint
+            FROM workflows
+            WHERE id = source_workflow_id
+              AND (user_id = new_owner_id OR is_public);
+
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO workflow_nodes (workflow_id, node_id, node_type, label, position_x, position_y, data)
+            SELECT new_workflow_id, node_id, node_type, label, position_x, position_y, data
+            FROM workflow_nodes
+            WHERE workflow_id = source_workflow_id;
+
+            INSERT INTO workflow_edges (workflow_id, edge_id, source, target)
+            SELECT new_workflow_id, edge_id, source, target
+            FROM workflow_edges
+            WHERE workflow_id = source_workflow_id;
+
+            RETURN new_workflow_id;
+        END;
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP FUNCTION IF EXISTS clone_workflow(UUID, UUID, TEXT)')
@@ -0,0 +1,72 @@
+"""Add composite, unique and partial indexes for the API query patterns
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-04-08 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Frontend node/edge IDs are unique within a workflow. Remove existing
+    # duplicates (keeping the most recently updated row) before adding the
+    # unique keys that upserts can target.
+    op.execute("""
+        DELETE FROM workflow_nodes n
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY workflow_id, node_id ORDER BY updated_at DESC, id DESC
+            ) AS rn
+            FROM workflow_nodes
+        ) d
+        WHERE n.id = d.id AND d.rn > 1
+    """)
+    op.execute("""
+        DELETE FROM workflow_edges e
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY workflow_id, edge_id ORDER BY updated_at DESC, id DESC
+            ) AS rn
+            FROM workflow_edges
+        ) d
+        WHERE e.id = d.id AND d.rn > 1
+    """)
+
+    # The unique keys lead with workflow_id, so they also serve the
+    # "all nodes/edges of a workflow" lookups of the old single-column indexes
+    op.execute('CREATE UNIQUE INDEX ix_workflow_nodes_workflow_id_node_id ON workflow_nodes (workflow_id, node_id)')
+    op.execute('CREATE UNIQUE INDEX ix_workflow_edges_workflow_id_edge_id ON workflow_edges (workflow_id, edge_id)')
+    op.execute('DROP INDEX IF EXISTS ix_workflow_nodes_workflow_id')
+    op.execute('DROP INDEX IF EXISTS ix_workflow_edges_workflow_id')
+
+    # User listings filter by owner and return the most recently updated first
+    op.execute('CREATE INDEX ix_workflows_user_id_updated_at ON workflows (user_id, updated_at DESC)')
+    op.execute('CREATE INDEX ix_bom_files_user_id_updated_at ON bom_files (user_id, updated_at DESC)')
+    op.execute('DROP INDEX IF EXISTS ix_workflows_user_id')
+    op.execute('DROP INDEX IF EXISTS ix_bom_files_user_id')
+
+    # Pending tasks are a small, hot subset of vendor_tasks
+    op.execute("CREATE INDEX ix_vendor_tasks_pending_created_at ON vendor_tasks (created_at) WHERE status = 'pending'")
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_vendor_tasks_pending_created_at')
+
+    op.execute('CREATE INDEX IF NOT EXISTS ix_bom_files_user_id ON bom_files (user_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_workflows_user_id ON workflows (user_id)')
+    op.execute('DROP INDEX IF EXISTS ix_bom_files_user_id_updated_at')
+    op.execute('DROP INDEX IF EXISTS ix_workflows_user_id_updated_at')
+
+    op.execute('CREATE INDEX IF NOT EXISTS ix_workflow_edges_workflow_id ON workflow_edges (workflow_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_workflow_nodes_workflow_id ON workflow_nodes (workflow_id)')
+    op.execute('DROP INDEX IF EXISTS ix_workflow_edges_workflow_id_edge_id')
+    op.execute('DROP INDEX IF EXISTS ix_workflow_nodes_workflow_id_node_id')
@@ -0,0 +1,51 @@
+"""Add content hash to BOM files for per-user deduplication
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-04-10 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SHA-256 of the normalized text content (see bom_service.normalize_bom_content).
+    # Files with the same hash for the same user share their standardized output.
+    op.execute('ALTER TABLE bom_files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)')
+
+    # Backfill with the same normalization: no BOM, \n line endings, no
+    # trailing spaces/tabs on lines, no leading or trailing blank lines.
+    # Rows without text content (Excel uploads used to be stored with
+    # content = '') keep a NULL hash, so they are not duplicates of each other.
+    op.execute(r"""
+        UPDATE bom_files
+        SET content_hash = encode(sha256(convert_to(
+            btrim(
+                regexp_replace(
+                    regexp_replace(
+                        replace(ltrim(content, U&'\FEFF'), E'\r\n', E'\n'),
+                        E'\r', E'\n', 'g'
+                    ),
+                    E'[ \t]+(?=\n|$)', '', 'g'
+                ),
+                E'\n'
+            ),
+            'UTF8'
+        )), 'hex')
+        WHERE content_hash IS NULL AND btrim(content, E' \t\r\n') <> ''
+    """)
+
+    op.execute('CREATE INDEX ix_bom_files_user_id_content_hash ON bom_files (user_id, content_hash)')
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_bom_files_user_id_content_hash')
+    op.execute('ALTER TABLE bom_files DROP COLUMN IF EXISTS content_hash')
@@ -0,0 +1,39 @@
+"""Track background standardization on BOM files
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-04-12 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Status of the latest standardization job (queued/running/succeeded/failed)
+    # and its progress as {"done": chunks, "total": chunks}. Stored on the row so
+    # any API worker can answer status polls.
+    op.execute("""
+        ALTER TABLE bom_files
+        ADD COLUMN IF NOT EXISTS standardization_status VARCHAR,
+        ADD COLUMN IF NOT EXISTS standardization_job_id UUID,
+        ADD COLUMN IF NOT EXISTS standardization_progress JSONB,
+        ADD COLUMN IF NOT EXISTS standardization_error TEXT
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        ALTER TABLE bom_files
+        DROP COLUMN IF EXISTS standardization_error,
+        DROP COLUMN IF EXISTS standardization_progress,
+        DROP COLUMN IF EXISTS standardization_job_id,
+        DROP COLUMN IF EXISTS standardization_status
+    """)
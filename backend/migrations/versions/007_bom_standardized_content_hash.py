@@ -0,0 +1,27 @@
+"""Record which content a BOM file's standardized output was produced from
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-04-14 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Standardization is skipped while this equals content_hash. Not backfilled:
+    # existing standardized_content was written by the placeholder endpoint
+    # (a copy of the raw content), so those files are standardized again once.
+    op.execute('ALTER TABLE bom_files ADD COLUMN IF NOT EXISTS standardized_content_hash VARCHAR(64)')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE bom_files DROP COLUMN IF EXISTS standardized_content_hash')
@@ -0,0 +1,114 @@
+"""Store standardized BOMs as typed rows, with replace and summary functions
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-04-16 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per component of a standardized BOM, parsed once from the LLM
+    # output. Keyed by content like standardized_content, so a user's files
+    # with the same content share their rows.
+    op.execute("""
+        CREATE TABLE bom_rows (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            content_hash VARCHAR(64) NOT NULL,
+            position INTEGER NOT NULL,
+            component_id VARCHAR,
+            name VARCHAR,
+            material VARCHAR,
+            weight_g FLOAT,
+            qty FLOAT,
+            supplier VARCHAR,
+            emission_factor FLOAT,
+            ai_note TEXT,
+            PRIMARY KEY (user_id, content_hash, position)
+        )
+    """)
+
+    # Swap all rows of a BOM in one transaction, so readers never see a mix of
+    # old and new rows. Rows are a JSON array of objects with the column names.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION replace_bom_rows(
+            p_user_id UUID,
+            p_content_hash VARCHAR,
+            p_rows JSONB
+        )
+        RETURNS INTEGER
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            inserted INTEGER;
+        BEGIN
+            DELETE FROM bom_rows WHERE user_id = p_user_id AND content_hash = p_content_hash;
+
+            INSERT INTO bom_rows (user_id, content_hash, position, component_id, name, material,
+                                  weight_g, qty, supplier, emission_factor, ai_note)
+            SELECT p_user_id, p_content_hash, r.position, r.component_id, r.name, r.material,
+                   r.weight_g, r.qty, r.supplier, r.emission_factor, r.ai_note
+            FROM jsonb_to_recordset(p_rows) AS r(
+                position INTEGER, component_id VARCHAR, name VARCHAR, material VARCHAR,
+                weight_g FLOAT, qty FLOAT, supplier VARCHAR, emission_factor FLOAT, ai_note TEXT
+            );
+
+            GET DIAGNOSTICS inserted = ROW_COUNT;
+            RETURN inserted;
+        END;
+        $$
+    """)
+
+    # Totals of a BOM in one aggregation: weight, emissions (weight in kg ×
+    # factor in kgCO2e/kg), rows missing either value, and a per-material breakdown
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bom_rows_summary(
+            p_user_id UUID,
+            p_content_hash VARCHAR
+        )
+        RETURNS JSON
+        LANGUAGE sql
+        STABLE
+        AS $$
+            WITH rows AS (
+                SELECT material, weight_g, emission_factor,
+                       weight_g / 1000.0 * emission_factor AS emissions
+                FROM bom_rows
+                WHERE user_id = p_user_id AND content_hash = p_content_hash
+            ),
+            by_material AS (
+                SELECT material,
+                       count(*) AS row_count,
+                       COALESCE(sum(weight_g), 0) AS total_weight_g,
+                       COALESCE(sum(emissions), 0) AS total_emissions_kgco2e
+                FROM rows
+                GROUP BY material
+            )
+            SELECT json_build_object(
+                'row_count', (SELECT count(*) FROM rows),
+                'total_weight_g', (SELECT COALESCE(sum(weight_g), 0) FROM rows),
+                'total_emissions_kgco2e', (SELECT COALESCE(sum(emissions), 0) FROM rows),
+                'rows_missing_weight', (SELECT count(*) FROM rows WHERE weight_g IS NULL),
+                'rows_missing_factor', (SELECT count(*) FROM rows WHERE emission_factor IS NULL),
+                'by_material', COALESCE(
+                    (SELECT json_agg(b ORDER BY b.total_emissions_kgco2e DESC, b.material) FROM by_material b),
+                    '[]'::json
+                )
+            )
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP FUNCTION IF EXISTS bom_rows_summary(UUID, VARCHAR)')
+    op.execute('DROP FUNCTION IF EXISTS replace_bom_rows(UUID, VARCHAR, JSONB)')
+    op.execute('DROP TABLE IF EXISTS bom_rows')
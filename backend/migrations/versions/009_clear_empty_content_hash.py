@@ -0,0 +1,39 @@
+"""Clear the content hash of BOM files without text content
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-04-18 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SHA-256 of the empty string
+EMPTY_CONTENT_HASH = 'e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855'
+
+
+def upgrade() -> None:
+    # On databases migrated before 005 skipped empty content, its backfill
+    # hashed all of a user's old Excel uploads (stored with content = '') to
+    # the same value, so they shared one standardized output. Give them back
+    # a NULL hash; their standardized output is no longer current and is
+    # regenerated on request.
+    op.execute(f"""
+        UPDATE bom_files
+        SET content_hash = NULL, standardized_content_hash = NULL
+        WHERE content_hash = '{EMPTY_CONTENT_HASH}'
+    """)
+
+    op.execute(f"DELETE FROM bom_rows WHERE content_hash = '{EMPTY_CONTENT_HASH}'")
+
+
+def downgrade() -> None:
+    # The cleared hashes identified no content; nothing to restore
+    pass
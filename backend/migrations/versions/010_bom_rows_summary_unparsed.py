@@ -0,0 +1,66 @@
+"""Count rows that could not be parsed in the BOM summary
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-04-18 11:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_SUMMARY = """
+    CREATE OR REPLACE FUNCTION bom_rows_summary(
+        p_user_id UUID,
+        p_content_hash VARCHAR
+    )
+    RETURNS JSON
+    LANGUAGE sql
+    STABLE
+    AS $$
+        WITH rows AS (
+            SELECT material, weight_g, emission_factor, ai_note,
+                   weight_g / 1000.0 * emission_factor AS emissions
+            FROM bom_rows
+            WHERE user_id = p_user_id AND content_hash = p_content_hash
+        ),
+        by_material AS (
+            SELECT material,
+                   count(*) AS row_count,
+                   COALESCE(sum(weight_g), 0) AS total_weight_g,
+                   COALESCE(sum(emissions), 0) AS total_emissions_kgco2e
+            FROM rows
+            GROUP BY material
+        )
+        SELECT json_build_object(
+            'row_count', (SELECT count(*) FROM rows),
+            'total_weight_g', (SELECT COALESCE(sum(weight_g), 0) FROM rows),
+            'total_emissions_kgco2e', (SELECT COALESCE(sum(emissions), 0) FROM rows),
+            'rows_missing_weight', (SELECT count(*) FROM rows WHERE weight_g IS NULL),
+            'rows_missing_factor', (SELECT count(*) FROM rows WHERE emission_factor IS NULL),
+            {unparsed}
+            'by_material', COALESCE(
+                (SELECT json_agg(b ORDER BY b.total_emissions_kgco2e DESC, b.material) FROM by_material b),
+                '[]'::json
+            )
+        )
+    $$
+"""
+
+
+def upgrade() -> None:
+    # Rows kept with their raw text because neither the parser nor the LLM
+    # could fix them: ai_note starts with bom_csv_service.UNPARSED_ROW_NOTE
+    op.execute(_SUMMARY.format(
+        unparsed="'rows_unparsed', (SELECT count(*) FROM rows WHERE starts_with(ai_note, '无法解析的原始行: ')),"
+    ))
+
+
+def downgrade() -> None:
+    op.execute(_SUMMARY.format(unparsed=""))
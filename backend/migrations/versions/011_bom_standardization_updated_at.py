@@ -0,0 +1,33 @@
+"""Record when background standardization of a BOM file last made progress
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-04-19 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Set whenever the standardization status or progress changes. A queued or
+    # running status that has not changed for BOM_STANDARDIZATION_STALE_SECONDS
+    # belongs to a job that was lost (e.g. its worker was killed).
+    op.execute("""
+        ALTER TABLE bom_files
+        ADD COLUMN IF NOT EXISTS standardization_updated_at TIMESTAMPTZ
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        ALTER TABLE bom_files
+        DROP COLUMN IF EXISTS standardization_updated_at
+    """)
@@ -0,0 +1,54 @@
+"""Keep updated_at current on every update
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-04-20 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables with an updated_at column (001). Listings sort by updated_at, which
+# only defaulted on insert, so edited rows kept their creation time.
+TABLES = (
+    'users',
+    'workflows',
+    'workflow_nodes',
+    'workflow_edges',
+    'products',
+    'bom_files',
+    'vendor_tasks',
+)
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_updated_at()
+        RETURNS TRIGGER
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END
+        $$
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_updated_at
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+        """)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_set_updated_at ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS set_updated_at()')
@@ -15,11 +15,20 @@ setup(
         "python-multipart>=0.0.5",
         "httpx>=0.23.0",
         "pandas>=1.3.3",
+        "openpyxl>=3.1.0",
+        "python-calamine>=0.2.0",
         "python-dotenv>=0.19.0",
         "alembic>=1.7.1",
         "psycopg2-binary>=2.9.1",
         "email-validator>=1.1.3",
         "supabase>=2.0.0",
+        "orjson>=3.9.0",
+        "asyncpg>=0.29.0",
+        "gunicorn>=21.2.0",
+        "httptools>=0.6.0",
+        "uvloop>=0.19.0; sys_platform != 'win32'",
+        "redis>=5.0.0",
+        "tiktoken>=0.7.0",
     ],
     python_requires=">=3.10",
 ) 
\ No newline at end of file
@@ -0,0 +1,131 @@
+from app.services.bom_csv_service import (
+    STANDARD_HEADER,
+    WEIGHT_UNITS,
+    count_unparsed_rows,
+    is_unparsed_row,
+    parse_bom_csv,
+    render_bom_csv,
+    to_number,
+    unparsed_row,
+)
+
+HEADER = ",".join(STANDARD_HEADER)
+
+
+def parse(text: str):
+    return parse_bom_csv(text.splitlines())
+
+
+def test_to_number_ignores_units_and_thousands_separators():
+    assert to_number("1,250 g") == 1250.0
+    assert to_number("1.8 kgCO2e/kg") == 1.8
+    assert to_number("n/a") is None
+
+
+def test_to_number_converts_known_units():
+    assert to_number("0.5kg", WEIGHT_UNITS) == 500.0
+    assert to_number("1,250 g", WEIGHT_UNITS) == 1250.0
+    assert to_number("12", WEIGHT_UNITS) == 12.0
+    assert to_number("3 lb", WEIGHT_UNITS) is None
+
+
+def test_parse_converts_weight_to_grams():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,0.5kg,4,ACME,1.8,否\nC2,垫片,铝,3 lb,2,ACME,8.2,否")
+    assert parsed.rows[0]["weight_g"] == 500.0
+    assert parsed.failed[0].reason == "numeric column without a number"
+
+
+def test_parse_skips_fences_and_commentary():
+    parsed = parse(
+        "Here is the standardized BOM, with estimated weights:\n"
+        f"以下是标准化结果：\n```csv\n{HEADER}\nC1,螺丝,钢,12,4,ACME,1.8,否\n```\n"
+        "共1行\nNote: weights are estimates, please verify."
+    )
+    assert not parsed.failed
+    assert parsed.repaired == 0
+    assert len(parsed.rows) == 1
+    row = parsed.rows[0]
+    assert row["component_id"] == "C1"
+    assert row["weight_g"] == 12.0
+    assert row["emission_factor"] == 1.8
+    assert row["position"] == 0
+
+
+def test_parse_maps_header_aliases():
+    parsed = parse("id,名称,材质,重量,数量,供应商,排放因子,备注\nC1,螺丝,钢,12,4,ACME,1.8,")
+    assert parsed.rows[0]["material"] == "钢"
+    assert parsed.rows[0]["emission_factor"] == 1.8
+
+
+def test_parse_without_header_uses_standard_column_order():
+    parsed = parse("C1,螺丝,钢,12,4,ACME,1.8,否")
+    assert parsed.rows[0]["name"] == "螺丝"
+
+
+def test_parse_skips_header_repeated_by_later_chunk():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,12,4,ACME,1.8,否\n{HEADER}\nC2,垫片,铝,3,2,ACME,8.2,否")
+    assert [row["component_id"] for row in parsed.rows] == ["C1", "C2"]
+    assert [row["position"] for row in parsed.rows] == [0, 1]
+
+
+def test_parse_repairs_unquoted_comma_in_supplier():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,12,4,ACME, Inc.,1.8,否")
+    assert not parsed.failed
+    assert parsed.repaired == 1
+    assert parsed.rows[0]["supplier"] == "ACME, Inc."
+
+
+def test_parse_pads_missing_trailing_cells():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,12,4,ACME")
+    assert parsed.repaired == 1
+    assert parsed.rows[0]["emission_factor"] is None
+
+
+def test_parse_does_not_pad_short_rows_without_numbers():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,,不锈钢")
+    assert parsed.rows == []
+    assert parsed.failed[0].reason == "expected 8 columns, got 5"
+
+
+def test_parse_reads_headerless_rows_only_with_all_columns():
+    parsed = parse("Here is the BOM, as requested\nC1,螺丝,钢,12,4,ACME,1.8,否\nC2,垫片,铝,3")
+    assert [row["component_id"] for row in parsed.rows] == ["C1"]
+
+
+def test_parse_finds_header_after_commentary_with_commas():
+    parsed = parse(f"Sure, here it is, in CSV:\n{HEADER}\nC1,螺丝,钢,12,4,ACME,1.8,否")
+    assert not parsed.failed
+    assert parsed.rows[0]["name"] == "螺丝"
+
+
+def test_parse_reports_rows_that_cannot_be_repaired():
+    parsed = parse(f"{HEADER}\nC1,螺丝,钢,12,4,ACME,1.8,否\nC2,垫片,铝,很重,2,ACME,8.2,否")
+    assert len(parsed.rows) == 1
+    assert len(parsed.failed) == 1
+    assert parsed.failed[0].slot == 1
+    assert parsed.failed[0].reason == "numeric column without a number"
+
+
+def test_parse_empty_content():
+    parsed = parse("")
+    assert parsed.rows == []
+    assert parsed.failed == []
+
+
+def test_render_round_trips_through_parse():
+    rows = parse(f"{HEADER}\nC1,螺丝,钢,12,4,\"ACME, Inc.\",1.8,否").rows
+    rendered = render_bom_csv(rows)
+    assert rendered.splitlines()[0] == HEADER
+    assert parse(rendered).rows == rows
+
+
+def test_render_without_rows_is_the_header():
+    assert render_bom_csv([]) == HEADER
+
+
+def test_unparsed_rows_survive_render_and_parse():
+    row = unparsed_row("C2,垫片,铝,很重")
+    assert is_unparsed_row(row)
+    rendered = render_bom_csv([row])
+    assert count_unparsed_rows(rendered) == 1
+    assert parse(rendered).rows[0]["ai_note"] == row["ai_note"]
@@ -0,0 +1,193 @@
+import asyncio
+import io
+import os
+import random
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.services import ai_service, bom_service
+from app.services.bom_csv_service import parse_bom_csv
+from app.services.bom_service import bom_content_hash, normalize_bom_content, split_bom_content
+from app.services.spreadsheet_service import SHEET_MARKER, SpreadsheetParseError
+
+
+def csv_text(header: str, count: int, prefix: str = "C") -> str:
+    return "\n".join([header] + [f"{prefix}{i},part{i},steel" for i in range(count)])
+
+
+def test_normalize_strips_bom_line_endings_and_trailing_whitespace():
+    assert normalize_bom_content("\ufeffid,name  \r\nC1,bolt\r\n\r\n") == "id,name\nC1,bolt"
+
+
+def test_hash_ignores_formatting_differences():
+    assert bom_content_hash("id,name\nC1,bolt") == bom_content_hash("\ufeffid,name \r\nC1,bolt\r\n")
+    assert bom_content_hash("id,name\nC1,bolt") != bom_content_hash("id,name\nC2,bolt")
+
+
+def test_hash_of_empty_content_is_none():
+    assert bom_content_hash("") is None
+    assert bom_content_hash(" \r\n\n") is None
+
+
+def test_split_keeps_small_content_unchanged():
+    content = csv_text("id,name,material", 3)
+    assert split_bom_content(content, rows_per_chunk=10) == [content]
+
+
+def test_split_repeats_header_in_every_chunk():
+    chunks = split_bom_content(csv_text("id,name,material", 5), rows_per_chunk=2)
+    assert len(chunks) == 3
+    for chunk in chunks:
+        assert chunk.splitlines()[0] == "id,name,material"
+    rows = [line for chunk in chunks for line in chunk.splitlines()[1:]]
+    assert rows == [f"C{i},part{i},steel" for i in range(5)]
+
+
+def test_split_respects_token_budget():
+    content = csv_text("id,name,material", 20)
+    chunks = split_bom_content(content, rows_per_chunk=100, token_budget=20)
+    assert len(chunks) > 1
+    assert sum(len(chunk.splitlines()) - 1 for chunk in chunks) == 20
+
+
+def test_split_empty_content():
+    assert split_bom_content("", rows_per_chunk=10) == [""]
+
+
+def test_split_header_only_content():
+    assert split_bom_content("id,name,material", rows_per_chunk=10) == ["id,name,material"]
+
+
+def test_split_multi_sheet_content_per_sheet():
+    content = "\n\n".join([
+        f"{SHEET_MARKER}Parts\n" + csv_text("id,name,material", 3),
+        f"{SHEET_MARKER}Packaging\n" + csv_text("code,item,kind", 1, prefix="P"),
+    ])
+    chunks = split_bom_content(content, rows_per_chunk=2)
+
+    assert len(chunks) == 3
+    # Each chunk starts with its sheet's marker and that sheet's own header
+    assert chunks[0].splitlines()[:2] == [f"{SHEET_MARKER}Parts", "id,name,material"]
+    assert chunks[1].splitlines() == [f"{SHEET_MARKER}Parts", "id,name,material", "C2,part2,steel"]
+    assert chunks[2].splitlines() == [f"{SHEET_MARKER}Packaging", "code,item,kind", "P0,part0,steel"]
+
+
+def test_split_multi_sheet_keeps_header_only_sheet():
+    content = f"{SHEET_MARKER}Parts\n" + csv_text("id,name,material", 1) + f"\n\n{SHEET_MARKER}Notes\nremark"
+    chunks = split_bom_content(content, rows_per_chunk=10)
+    assert chunks[1].splitlines() == [f"{SHEET_MARKER}Notes", "remark"]
+
+
+def test_standardize_content_merges_concurrent_chunks_in_order(monkeypatch):
+    async def standardize(chunk, fallback=True):
+        # Chunks finish out of order
+        await asyncio.sleep(random.random() / 100)
+        rows = chunk.splitlines()[1:]
+        return "组件ID,组件名称,材料类型\n" + "\n".join(rows)
+
+    monkeypatch.setattr(bom_service, "standardize_bom", standardize)
+    monkeypatch.setattr(settings, "BOM_STANDARDIZE_CHUNK_ROWS", 2)
+    progress = []
+
+    async def report_progress(done, total):
+        progress.append((done, total))
+
+    content = csv_text("id,name,material", 7)
+    standardized = asyncio.run(bom_service.standardize_bom_content(content, report_progress))
+
+    rows = parse_bom_csv(standardized.splitlines()).rows
+    assert [row["component_id"] for row in rows] == [f"C{i}" for i in range(7)]
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+def test_standardize_content_cancels_remaining_chunks_on_failure(monkeypatch):
+    cancelled = []
+
+    async def standardize(chunk, fallback=True):
+        if "C0" in chunk:
+            raise ai_service.LLMUnavailableError("down")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(chunk)
+            raise
+
+    monkeypatch.setattr(bom_service, "standardize_bom", standardize)
+    monkeypatch.setattr(settings, "BOM_STANDARDIZE_CHUNK_ROWS", 2)
+
+    with pytest.raises(ai_service.LLMUnavailableError):
+        asyncio.run(bom_service.standardize_bom_content(csv_text("id,name,material", 6)))
+    assert len(cancelled) == 2
+
+
+class RecordingTable:
+    """Supabase table stub that records the values of update() calls and the filters applied"""
+    def __init__(self, client):
+        self.client = client
+
+    def update(self, values):
+        self.client.updates.append(values)
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def or_(self, filters):
+        self.client.filters.append(filters)
+        return self
+
+    def execute(self):
+        self.data = self.client.data
+        return self
+
+
+class RecordingClient:
+    def __init__(self, data=None):
+        self.updates = []
+        self.filters = []
+        # Rows an update reports as changed
+        self.data = data or []
+
+    def table(self, name):
+        return RecordingTable(self)
+
+
+@pytest.mark.parametrize("data, queued", [([{"id": "bom-1"}], True), ([], False)])
+def test_queue_standardization_only_updates_idle_files(monkeypatch, data, queued):
+    client = RecordingClient(data)
+    monkeypatch.setattr(bom_service, "get_supabase_client", lambda: client)
+
+    assert bom_service.queue_bom_standardization("bom-1", "job-1") is queued
+    assert client.updates[0]["standardization_status"] == "queued"
+    # The in-progress check is part of the update itself
+    assert "standardization_status.not.in.(queued,running)" in client.filters[0]
+
+
+def test_failed_llm_call_is_not_saved_as_result(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(bom_service, "get_supabase_client", lambda: client)
+    # No API key configured: the LLM call fails
+    monkeypatch.setattr(ai_service, "get_api_config", lambda: ("", "", ""))
+    bom_file = {"id": "bom-1", "user_id": "user-1", "content": csv_text("id,name,material", 3), "content_hash": "h"}
+
+    with pytest.raises(ai_service.LLMUnavailableError):
+        asyncio.run(bom_service.standardize_bom_file(bom_file))
+
+    assert [values.get("standardization_status") for values in client.updates] == ["running", "failed"]
+    assert not any("standardized_content" in values for values in client.updates)
+
+
+def test_unreadable_excel_upload_is_rejected_and_not_kept(monkeypatch, tmp_path):
+    async def excel_to_csv(path, file_type):
+        raise SpreadsheetParseError("Failed to read Excel file")
+
+    monkeypatch.setattr(bom_service, "excel_to_csv", excel_to_csv)
+    monkeypatch.chdir(tmp_path)
+    upload = UploadFile(io.BytesIO(b"PK\x03\x04rest"), filename="bom.xlsx")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(bom_service.upload_bom_file(None, upload, user_id=1))
+    assert error.value.status_code == 400
+    assert os.listdir(tmp_path / "uploads" / "bom_files") == []
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.services import ai_service, document_service
+from app.services.document_service import classify_by_keywords, keyword_scores, merge_stage_chunks
+
+
+def test_classifies_bom_by_header_keywords():
+    assert classify_by_keywords("parts.csv", "组件ID,组件名称,材料,供应商\nC1,螺丝,钢,ACME") == "bom"
+
+
+def test_classifies_stage_by_file_name_and_header():
+    assert classify_by_keywords("运输记录.xlsx", "起点,终点,距离(km),车辆类型\n上海,北京,1200,货车") == "distribution"
+
+
+def test_only_header_lines_are_scored():
+    content = "工序,设备,能耗(kWh)\n" + "\n".join(["a,b,c"] * 5) + "\n运输,物流,距离,车辆"
+    assert keyword_scores("data.csv", content)["distribution"] == 0
+
+
+def test_ambiguous_scores_are_not_classified():
+    # One keyword each for bom (材料) and disposal (回收)
+    assert classify_by_keywords("data.csv", "材料,回收") is None
+
+
+def test_no_keywords_are_not_classified():
+    assert classify_by_keywords("data.csv", "a,b,c\n1,2,3") is None
+
+
+def test_classify_document_asks_llm_only_when_ambiguous(monkeypatch):
+    calls = []
+
+    async def classify(filename, sample, kinds):
+        calls.append(filename)
+        return "usage"
+
+    monkeypatch.setattr(ai_service, "classify_document", classify)
+    assert asyncio.run(document_service.classify_document("parts.csv", "组件ID,材料,供应商")) == ("bom", "keywords")
+    assert asyncio.run(document_service.classify_document("data.csv", "a,b")) == ("usage", "llm")
+    assert calls == ["data.csv"]
+
+
+def test_classify_document_falls_back_to_best_keyword(monkeypatch):
+    async def classify(filename, sample, kinds):
+        return None
+
+    monkeypatch.setattr(ai_service, "classify_document", classify)
+    assert asyncio.run(document_service.classify_document("data.csv", "材料")) == ("bom", "keywords")
+    assert asyncio.run(document_service.classify_document("data.csv", "a,b")) == (None, "keywords")
+
+
+def test_merge_stage_chunks_drops_fences_and_repeated_headers():
+    merged = merge_stage_chunks(
+        "工序,能耗",
+        ["```csv\n工序,能耗\n切割,12\n```", "工序 ,能耗(kWh)\n焊接,30"],
+    )
+    assert merged == "工序,能耗\n切割,12\n焊接,30"
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from app.core import jobs
+from app.core.config import settings
+from app.core.jobs import InProcessJobQueue, JobQueue, register_handler, resolve_backend
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, *statuses: str) -> dict:
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {statuses}")
+
+
+@register_handler("test_echo")
+async def echo(job: dict, report_progress) -> dict:
+    await report_progress(1, 1)
+    return job["payload"]
+
+
+@register_handler("test_fail")
+async def fail(job: dict, report_progress):
+    raise ValueError("boom")
+
+
+def test_job_queue_is_abstract():
+    with pytest.raises(TypeError):
+        JobQueue(1)
+
+
+def test_enqueued_job_runs_and_records_result():
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        await queue.start()
+        try:
+            job = await queue.enqueue("test_echo", "tenant", {"value": 1})
+            assert job["status"] == "queued"
+            return await wait_for_status(queue, job["id"], "succeeded", "failed")
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(run())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"value": 1}
+    assert job["progress"] == {"done": 1, "total": 1}
+
+
+def test_failing_and_unknown_jobs_record_their_error():
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        await queue.start()
+        try:
+            failing = await queue.enqueue("test_fail", "tenant", {})
+            unknown = await queue.enqueue("test_unknown", "tenant", {})
+            return (
+                await wait_for_status(queue, failing["id"], "failed"),
+                await wait_for_status(queue, unknown["id"], "failed"),
+            )
+        finally:
+            await queue.stop()
+
+    failing, unknown = asyncio.run(run())
+    assert failing["error"] == "boom"
+    assert unknown["error"] == "No handler for job kind test_unknown"
+
+
+def test_enqueue_uses_given_job_id():
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        job = await queue.enqueue("test_echo", "tenant", {}, job_id="fixed-id")
+        return job, await queue.get("fixed-id")
+
+    job, stored = asyncio.run(run())
+    assert job["id"] == "fixed-id"
+    assert stored is job
+
+
+def test_worker_survives_errors_taking_a_job(monkeypatch):
+    monkeypatch.setattr(jobs, "WORKER_RETRY_SECONDS", 0)
+
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        next_job_id = queue._next_job_id
+        failures = [ConnectionError("queue unreachable")]
+
+        async def flaky_next_job_id():
+            if failures:
+                raise failures.pop()
+            return await next_job_id()
+
+        queue._next_job_id = flaky_next_job_id
+        await queue.start()
+        try:
+            job = await queue.enqueue("test_echo", "tenant", {"value": 1})
+            return await wait_for_status(queue, job["id"], "succeeded", "failed")
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(run())["status"] == "succeeded"
+
+
+def test_tenants_are_served_round_robin():
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        for tenant, job_id in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("c", "c1"), ("b", "b2")]:
+            await queue.enqueue("test_echo", tenant, {}, job_id=job_id)
+        return [await queue._next_job_id() for _ in range(6)]
+
+    assert asyncio.run(run()) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_finished_jobs_expire_after_ttl():
+    async def run():
+        queue = InProcessJobQueue(workers=1, ttl=60)
+        finished = await queue.enqueue("test_echo", "tenant", {})
+        await queue.update(finished["id"], status="succeeded")
+        finished["updated_at"] -= 120
+        queued = await queue.enqueue("test_echo", "tenant", {})
+        queued["updated_at"] -= 120
+        # Expired jobs are pruned when the next job is queued
+        await queue.enqueue("test_echo", "tenant", {})
+        return await queue.get(finished["id"]), await queue.get(queued["id"])
+
+    finished, queued = asyncio.run(run())
+    assert finished is None
+    assert queued is not None
+
+
+@pytest.mark.parametrize(
+    "backend, workers, expected",
+    [("auto", 1, "memory"), ("auto", 4, "redis"), ("memory", 1, "memory"), ("redis", 1, "redis")],
+)
+def test_resolve_backend(monkeypatch, backend, workers, expected):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", backend)
+    assert resolve_backend(workers) == expected
+
+
+def test_memory_backend_is_refused_for_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", "memory")
+    with pytest.raises(ValueError):
+        resolve_backend(2)
+
+
+def test_get_job_queue_defaults_to_in_process(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_BACKEND", "auto")
+    monkeypatch.setattr(jobs, "_queue", None)
+    assert isinstance(jobs.get_job_queue(), InProcessJobQueue)
@@ -0,0 +1,108 @@
+import pytest
+
+from app.services import prompt_service
+from app.services.prompt_service import (
+    MESSAGE_OVERHEAD_TOKENS,
+    PromptTemplate,
+    batch_by_tokens,
+    compact,
+    count_message_tokens,
+    count_tokens,
+    get_template,
+    register_template,
+)
+
+
+@pytest.fixture(autouse=True)
+def estimated_token_counts(monkeypatch):
+    # Count with the estimate, so results do not depend on tiktoken being installed
+    monkeypatch.setattr(prompt_service, "_encoding", lambda: None)
+
+
+def test_compact_removes_indentation_trailing_spaces_and_blank_lines():
+    text = """
+        第一行
+            缩进保留
+
+
+        第二段
+    """
+    assert compact(text) == "第一行\n    缩进保留\n\n第二段"
+
+
+def test_estimate_counts_cjk_characters_and_other_text():
+    assert count_tokens("") == 0
+    assert count_tokens("材料") == 2
+    assert count_tokens("abcdefgh") == 2
+    assert count_tokens("材料abcd") == 3
+
+
+def test_message_tokens_include_overhead():
+    messages = [{"role": "user", "content": "abcd"}]
+    assert count_message_tokens(messages) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_batches_keep_order_and_budget():
+    batches = batch_by_tokens([3, 3, 3, 5, 1], tokens_of=lambda item: item, budget=6)
+    assert batches == [[3, 3], [3], [5, 1]]
+
+
+def test_batches_respect_max_items():
+    assert batch_by_tokens([1] * 5, tokens_of=lambda item: item, budget=100, max_items=2) == [[1, 1], [1, 1], [1]]
+
+
+def test_oversized_item_gets_its_own_batch():
+    assert batch_by_tokens([1, 50, 1], tokens_of=lambda item: item, budget=10) == [[1], [50], [1]]
+
+
+def test_batches_of_nothing():
+    assert batch_by_tokens([], tokens_of=lambda item: item, budget=10) == []
+
+
+def test_render_fills_placeholders():
+    template = PromptTemplate("test", "系统", "阶段：$stage阶段\n内容：\n$content")
+    assert template.fields == ["stage", "content"]
+    assert template.render(stage="制造", content="a,b") == [
+        {"role": "system", "content": "系统"},
+        {"role": "user", "content": "阶段：制造阶段\n内容：\na,b"},
+    ]
+
+
+def test_render_requires_every_placeholder():
+    template = PromptTemplate("test", "系统", "$content")
+    with pytest.raises(KeyError):
+        template.render()
+
+
+def test_fixed_tokens_are_counted_on_first_use(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prompt_service, "count_tokens", lambda text: calls.append(text) or 1)
+    template = PromptTemplate("test", "系统", "内容：$content")
+    assert calls == []
+    assert template.fixed_tokens == 2 + 2 * MESSAGE_OVERHEAD_TOKENS
+    assert template.fixed_tokens == 2 + 2 * MESSAGE_OVERHEAD_TOKENS
+    assert len(calls) == 2
+
+
+def test_input_budget_is_bounded_by_context_and_completion():
+    template = PromptTemplate("test", "系统", "$content", max_tokens=1000, output_ratio=2.0)
+    # The completion can only answer 500 input tokens
+    assert template.input_budget(context_tokens=16000) == 500
+    # The context window is nearly full with the completion and the template
+    assert template.input_budget(context_tokens=1100) == 1100 - 1000 - template.fixed_tokens
+    assert template.input_budget(context_tokens=100) == 1
+
+
+def test_registered_templates_are_available_by_name():
+    template = register_template("test_registry", "系统", "$content", max_tokens=10)
+    assert get_template("test_registry") is template
+    assert template.max_tokens == 10
+
+
+def test_usage_accumulates_per_template():
+    usage = prompt_service.PromptUsage()
+    usage.record("a", prompt_tokens=10, completion_tokens=5, estimated_prompt_tokens=12)
+    usage.record("a", prompt_tokens=20, completion_tokens=5, estimated_prompt_tokens=18)
+    assert usage.stats() == {
+        "a": {"calls": 2, "prompt_tokens": 30, "completion_tokens": 10, "estimated_prompt_tokens": 30}
+    }
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.uploads import UPLOAD_CHUNK_SIZE, sniff_file_type, spool_upload
+
+
+def spool(filename: str, data: bytes, max_bytes: int = 10 * UPLOAD_CHUNK_SIZE, **options):
+    upload = UploadFile(io.BytesIO(data), filename=filename)
+    return asyncio.run(spool_upload(upload, max_bytes, **options))
+
+
+def spool_error(tmp_path, filename: str, data: bytes, **options) -> HTTPException:
+    with pytest.raises(HTTPException) as error:
+        spool(filename, data, directory=str(tmp_path), **options)
+    # A rejected upload leaves no temporary file behind
+    assert os.listdir(tmp_path) == []
+    return error.value
+
+
+def test_sniff_file_type():
+    assert sniff_file_type(b"PK\x03\x04rest") == "xlsx"
+    assert sniff_file_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1rest") == "xls"
+    assert sniff_file_type("id,名称".encode()) == "csv"
+    assert sniff_file_type(b"\x00\x01binary") is None
+
+
+def test_spools_csv_with_size_hash_and_type(tmp_path):
+    data = "\ufeffid,名称\nC1,螺丝\n".encode()
+    upload = spool("bom.csv", data, directory=str(tmp_path))
+    try:
+        assert upload.file_type == "csv"
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.read_text() == "id,名称\nC1,螺丝\n"
+    finally:
+        upload.cleanup()
+    assert not os.path.exists(upload.path)
+
+
+def test_spools_file_larger_than_one_chunk(tmp_path):
+    data = b"id,name\n" + b"C1,bolt\n" * (UPLOAD_CHUNK_SIZE // 4)
+    upload = spool("bom.csv", data, directory=str(tmp_path))
+    try:
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+    finally:
+        upload.cleanup()
+
+
+def test_excel_extensions_are_interchangeable(tmp_path):
+    upload = spool("bom.xls", b"PK\x03\x04rest", directory=str(tmp_path))
+    upload.cleanup()
+    assert upload.file_type == "xlsx"
+
+
+def test_rejects_file_over_the_limit(tmp_path):
+    error = spool_error(tmp_path, "bom.csv", b"x" * (UPLOAD_CHUNK_SIZE + 1), max_bytes=UPLOAD_CHUNK_SIZE)
+    assert error.status_code == 413
+
+
+def test_rejects_empty_file(tmp_path):
+    error = spool_error(tmp_path, "bom.csv", b"")
+    assert error.status_code == 400
+    assert error.detail == "File is empty"
+
+
+def test_rejects_content_not_matching_extension(tmp_path):
+    assert spool_error(tmp_path, "bom.csv", b"PK\x03\x04rest").status_code == 400
+    assert spool_error(tmp_path, "bom.xlsx", b"id,name").status_code == 400
+
+
+def test_rejects_disallowed_type(tmp_path):
+    assert spool_error(tmp_path, "bom.xlsx", b"PK\x03\x04rest", allowed_types=("csv",)).status_code == 400
+
+
+def test_rejects_csv_that_is_not_utf8(tmp_path):
+    error = spool_error(tmp_path, "bom.csv", "id,名称".encode("gbk"))
+    assert error.detail == "CSV files must be UTF-8 encoded"
+
+
+def test_rejects_csv_ending_in_a_truncated_character(tmp_path):
+    error = spool_error(tmp_path, "bom.csv", "id,名称".encode()[:-1])
+    assert error.detail == "CSV files must be UTF-8 encoded"